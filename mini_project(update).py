@@ -1,9 +1,37 @@
 import random
 import json
 import os
+import glob
+import mmap
+import struct
+import csv
+import hashlib
+import argparse
+import tracemalloc
+import copy
+import heapq
+import shlex
+import sys
+import time
+import contextlib
+import cProfile
+import asyncio
+import io
+import platform
+import statistics
+import tempfile
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from collections.abc import MutableSequence
 from enum import Enum
 from typing import List, Dict, Optional
-from collections import defaultdict
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:  # NumPy потрібен лише для пакетної симуляції битв
+    np = None
 
 # Переліки (Enums) для гри
 class ItemType(Enum):
@@ -43,8 +71,293 @@ class WeatherType(Enum):
     STORM = "Гроза"
     FOG = "Туман"
 
+# Подія гри: тип, шаблон повідомлення і поля. Текст форматується лише тоді, коли його читає приймач
+class GameEvent:
+    __slots__ = ("kind", "template", "fields")
+
+    def __init__(self, kind: str, template: str, fields: Dict):
+        self.kind = kind
+        self.template = template
+        self.fields = fields
+
+    @property
+    def message(self) -> str:
+        return self.template.format(**self.fields) if self.fields else self.template
+
+    def to_dict(self):
+        return {"kind": self.kind, "message": self.message, **self.fields}
+
+# Приймачі подій. Усі мають emit(event) і прапорець enabled:
+# коли він False, подія навіть не створюється
+class NullSink:
+    enabled = False
+
+    def emit(self, event: GameEvent):
+        pass
+
+class ConsoleSink:
+    enabled = True
+
+    def __init__(self, stream=None):
+        self.stream = stream  # None — поточний sys.stdout
+
+    def emit(self, event: GameEvent):
+        print(event.message, file=self.stream)
+
+class BufferedSink:
+    enabled = True
+
+    def __init__(self, limit: Optional[int] = None):
+        self.events = deque(maxlen=limit)
+
+    def emit(self, event: GameEvent):
+        self.events.append(event)
+
+    def messages(self) -> List[str]:
+        return [event.message for event in self.events]
+
+    def flush(self, sink) -> int:
+        count = len(self.events)
+        if sink.enabled:
+            for event in self.events:
+                sink.emit(event)
+        self.events.clear()
+        return count
+
+class JsonLinesSink:
+    enabled = True
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, 'a', encoding='utf-8')
+
+    def emit(self, event: GameEvent):
+        self._file.write(json.dumps(event.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+NULL_SINK = NullSink()
+CONSOLE_SINK = ConsoleSink()
+
+# Метрики: лічильники і гістограми зі значеннями міток у фіксованому порядку labelnames
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[tuple, float] = {} if labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, *labels):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, labels, value
+
+    def to_dict(self):
+        return [{"labels": dict(zip(self.labelnames, labels)), "value": value} for labels, value in self.values.items()]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = sorted(buckets)
+        self.values: Dict[tuple, list] = {}  # мітки -> [лічильники кошиків..., +Inf, сума]
+
+    def observe(self, value: float, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def samples(self):
+        for labels, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ["+Inf"], state):
+                cumulative += count
+                yield self.name + "_bucket", labels + (str(bound),), cumulative
+            yield self.name + "_sum", labels, state[-1]
+            yield self.name + "_count", labels, cumulative
+
+    def to_dict(self):
+        rows = []
+        for labels, state in self.values.items():
+            rows.append({"labels": dict(zip(self.labelnames, labels)),
+                         "buckets": {str(bound): count for bound, count in zip(self.buckets + ["+Inf"], state)},
+                         "sum": state[-1], "count": sum(state[:-1])})
+        return rows
+
+class MetricsRegistry:
+    enabled = True
+
+    def __init__(self, definitions=(), snapshot_file: Optional[str] = None, interval: float = 10.0):
+        self.metrics: Dict[str, object] = {}
+        self.snapshot_file = snapshot_file
+        self.interval = interval
+        self._written = time.monotonic()
+        for definition in definitions:
+            self.define(*definition)
+
+    def define(self, kind: str, name: str, help: str, labelnames=(), buckets=()):
+        if kind == "histogram":
+            metric = Histogram(name, help, buckets, labelnames)
+        else:
+            metric = Counter(name, help, labelnames)
+        return self.metrics.setdefault(name, metric)
+
+    def inc(self, name: str, amount: float = 1, *labels):
+        self.metrics[name].inc(amount, *labels)
+
+    def observe(self, name: str, value: float, *labels):
+        self.metrics[name].observe(value, *labels)
+
+    def snapshot(self) -> Dict:
+        return {"timestamp": time.time(),
+                "metrics": {name: {"type": metric.kind, "help": metric.help, "values": metric.to_dict()}
+                            for name, metric in self.metrics.items()}}
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            labelnames = metric.labelnames + ("le",) if metric.kind == "histogram" else metric.labelnames
+            for sample, labels, value in metric.samples():
+                pairs = ",".join(f'{label}="{value_}"' for label, value_ in zip(labelnames, labels))
+                lines.append(f"{sample}{{{pairs}}} {value}" if pairs else f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Формат за розширенням: .json — знімок JSON, інакше текстовий формат Prometheus
+    def write(self, filename: Optional[str] = None):
+        filename = filename or self.snapshot_file
+        with open(filename + ".tmp", 'w', encoding='utf-8') as f:
+            if filename.endswith(".json"):
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        os.replace(filename + ".tmp", filename)
+        self._written = time.monotonic()
+
+    # Періодичний знімок для довгих сесій: пише файл не частіше, ніж раз на interval секунд
+    def tick(self):
+        if self.snapshot_file is not None and time.monotonic() - self._written >= self.interval:
+            self.write()
+
+class NullMetrics:
+    enabled = False
+
+    def inc(self, name: str, amount: float = 1, *labels):
+        pass
+
+    def observe(self, name: str, value: float, *labels):
+        pass
+
+    def tick(self):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+GAME_METRICS = [
+    ("counter", "rpg_battles_total", "Проведені битви за результатом", ("outcome",)),
+    ("histogram", "rpg_battle_rounds", "Кількість раундів у битві", (), (1, 2, 5, 10, 20, 50, 100, 200, 500)),
+    ("counter", "rpg_damage_total", "Завдана шкода за типом шкоди", ("damage_type",)),
+    ("counter", "rpg_effect_ticks_total", "Такти активних ефектів за типом", ("effect",)),
+    ("counter", "rpg_loot_drops_total", "Згенеровані предмети за якістю", ("quality",)),
+    ("counter", "rpg_gold_minted_total", "Золото, що з'явилося в грі, за джерелом", ("source",)),
+    ("counter", "rpg_gold_spent_total", "Золото, витрачене в магазині", ()),
+    ("histogram", "rpg_save_seconds", "Тривалість збереження гри", ("format",), (0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30)),
+    ("histogram", "rpg_load_seconds", "Тривалість завантаження гри", ("format",), (0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30)),
+    ("counter", "rpg_save_bytes_total", "Записані байти збережень", ("format",)),
+    ("counter", "rpg_load_bytes_total", "Прочитані байти збережень", ("format",))
+]
+
+# Повідомлення про подію: до переданого приймача чи бойового журналу, а без нього — у консоль
+def _report(log, kind: str, template: str, **fields):
+    if log is None:
+        log = CONSOLE_SINK
+    if log.enabled:
+        log.emit(GameEvent(kind, template, fields))
+
+# Структурований запис шкоди; його збирає лише бойовий журнал, навіть коли повідомлення вимкнені
+def _record_damage(log, actor: Optional[str], action: str, target: str, damage):
+    if isinstance(log, BattleLog):
+        log.record(actor=actor, action=action, target=target, damage=damage)
+
+# Відстеження змін: сутність повідомляє трекер, а той позначає її в кожному підписаному каналі
+class ChangeTracker:
+    def __init__(self):
+        self._channels: Dict[str, Dict[object, None]] = {}
+
+    def channel(self, name: str) -> Dict[object, None]:
+        return self._channels.setdefault(name, {})
+
+    def mark(self, entity):
+        for changed in self._channels.values():
+            changed[entity] = None
+
+    def drain(self, name: str) -> List[object]:
+        changed = self.channel(name)
+        entities = list(changed)
+        changed.clear()
+        return entities
+
+    def close(self, name: str):
+        self._channels.pop(name, None)
+
+# TRANSIENT — поля, запис яких не позначає сутність; хто їх змінює, викликає mark_dirty сам
+class Tracked:
+    _tracker: Optional[ChangeTracker] = None
+    TRANSIENT: frozenset = frozenset()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if self._tracker is not None and name[0] != "_" and name not in self.TRANSIENT:
+            self._tracker.mark(self)
+
+    def mark_dirty(self):
+        if self._tracker is not None:
+            self._tracker.mark(self)
+
+    def attach_tracker(self, tracker: Optional[ChangeTracker], mark: bool = True):
+        object.__setattr__(self, "_tracker", tracker)
+        if mark:
+            self.mark_dirty()
+
+# Список із лічильником змін: кожна зміна на місці (заміна, видалення, додавання) збільшує version,
+# тож кеш, побудований за списком, перевіряє одне число замість довжини чи вмісту
+class VersionedList(list):
+    version = 0
+
+def _versioned(name: str):
+    method = getattr(list, name)
+
+    def mutate(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    mutate.__name__ = name
+    return mutate
+
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert",
+              "pop", "remove", "clear", "sort", "reverse"):
+    setattr(VersionedList, _name, _versioned(_name))
+
 # Клас ефектів
 class Effect:
+    __slots__ = ("effect_type", "duration", "power")
+
     def __init__(self, effect_type: EffectType, duration: int, power: float):
         self.effect_type = effect_type
         self.duration = duration
@@ -65,8 +378,13 @@ class Effect:
             power=data["power"]
         )
 
+    def copy(self) -> 'Effect':
+        return Effect(self.effect_type, self.duration, self.power)
+
 # Клас зачарувань
 class Enchantment:
+    __slots__ = ("name", "effect_type", "power")
+
     def __init__(self, name: str, effect_type: EffectType, power: float):
         self.name = name
         self.effect_type = effect_type
@@ -87,19 +405,99 @@ class Enchantment:
             power=data["power"]
         )
 
-# Клас предметів
+    def copy(self) -> 'Enchantment':
+        return Enchantment(self.name, self.effect_type, self.power)
+
+# Набір предметів: на кожну назву існує один спільний об'єкт.
+# bonuses: кількість екіпірованих частин -> множники характеристик
+class ItemSet:
+    __slots__ = ("name", "bonuses")
+    _interned: Dict[str, 'ItemSet'] = {}
+
+    def __init__(self, name: str, bonuses: Optional[Dict[int, Dict[str, float]]] = None):
+        self.name = name
+        self.bonuses = bonuses or {}
+
+    @classmethod
+    def get(cls, name: str, bonuses: Optional[Dict[int, Dict[str, float]]] = None) -> 'ItemSet':
+        item_set = cls._interned.get(name)
+        if item_set is None:
+            item_set = cls._interned[name] = cls(name)
+        if bonuses is not None:
+            item_set.bonuses = bonuses
+        return item_set
+
+    def __reduce__(self):
+        return ItemSet.get, (self.name, self.bonuses)
+
+# Незмінний шаблон предмета, спільний для всіх предметів з однаковими назвою, типом, якістю, набором і стихією
+class ItemTemplate:
+    __slots__ = ("name", "item_type", "quality", "item_set", "damage_type")
+    _interned: Dict[tuple, 'ItemTemplate'] = {}
+
+    @classmethod
+    def get(cls, name: str, item_type: ItemType, quality: ItemQuality, item_set=None,
+            damage_type: Optional[DamageType] = None) -> 'ItemTemplate':
+        key = (name, item_type, quality, item_set, damage_type)
+        template = cls._interned.get(key)
+        if template is None:
+            template = cls._interned[key] = object.__new__(cls)
+            template.name = name
+            template.item_type = item_type
+            template.quality = quality
+            template.item_set = item_set
+            template.damage_type = damage_type
+        return template
+
+    def __reduce__(self):
+        return ItemTemplate.get, (self.name, self.item_type, self.quality, self.item_set, self.damage_type)
+
+# Клас предметів: у самому предметі лише те, що відрізняється між екземплярами
 class Item:
+    __slots__ = ("template", "power", "value", "enchantment")
+
     def __init__(self, name: str, item_type: ItemType, power: float, value: int,
                  quality: ItemQuality, item_set=None, enchantment: Optional[Enchantment] = None,
                  damage_type: Optional[DamageType] = None):
-        self.name = name
-        self.item_type = item_type
+        self.template = ItemTemplate.get(name, item_type, quality, item_set, damage_type)
         self.power = power
         self.value = value
-        self.quality = quality
-        self.item_set = item_set
         self.enchantment = enchantment
-        self.damage_type = damage_type
+
+    @classmethod
+    def from_template(cls, template: ItemTemplate, power: float, value: int,
+                      enchantment: Optional[Enchantment] = None) -> 'Item':
+        item = object.__new__(cls)
+        item.template = template
+        item.power = power
+        item.value = value
+        item.enchantment = enchantment
+        return item
+
+    # Окремий екземпляр з тим самим шаблоном: зміни копії не зачіпають оригінал
+    def copy(self) -> 'Item':
+        return Item.from_template(self.template, self.power, self.value,
+                                  self.enchantment.copy() if self.enchantment else None)
+
+    @property
+    def name(self) -> str:
+        return self.template.name
+
+    @property
+    def item_type(self) -> ItemType:
+        return self.template.item_type
+
+    @property
+    def quality(self) -> ItemQuality:
+        return self.template.quality
+
+    @property
+    def item_set(self):
+        return self.template.item_set
+
+    @property
+    def damage_type(self) -> Optional[DamageType]:
+        return self.template.damage_type
 
     def __str__(self):
         return f"{self.name} ({self.item_type.value}, {self.quality.value}, Сила: {self.power}, Вартість: {self.value})"
@@ -122,10 +520,7 @@ class Item:
 
     @classmethod
     def from_dict(cls, data):
-        item_set = None
-        if data["item_set"]:
-            item_set = type("ItemSet", (), {"name": data["item_set"]})()
-
+        item_set = ItemSet.get(data["item_set"]) if data["item_set"] else None
         enchantment = Enchantment.from_dict(data["enchantment"]) if data["enchantment"] else None
         damage_type = DamageType[data["damage_type"]] if data["damage_type"] else None
 
@@ -140,8 +535,245 @@ class Item:
             damage_type=damage_type
         )
 
+# Клас інвентаря: індекси за назвою, типом і самим предметом, порядок додавання зберігається
+class Inventory:
+    def __init__(self, items: Optional[List[Item]] = None, owner: Optional[Tracked] = None):
+        self._owner = owner
+        self._slots: Dict[int, Item] = {}
+        self._by_name: Dict[str, Dict[int, None]] = {}
+        self._by_type: Dict[ItemType, Dict[int, None]] = {}
+        self._by_item: Dict[int, Dict[int, None]] = {}
+        self._next_slot = 0
+        if items:
+            self.extend(items)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(list(self._slots.values()))
+
+    def __contains__(self, item):
+        return id(item) in self._by_item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._slots.values())[index]
+        return self._slots[self._slot_at(index)]
+
+    def _slot_at(self, index: int) -> int:
+        size = len(self._slots)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("індекс інвентаря поза межами")
+        if index == size - 1:
+            return next(reversed(self._slots))
+        return next(islice(self._slots, index, None))
+
+    def append(self, item: Item):
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slots[slot] = item
+        self._by_name.setdefault(item.name, {})[slot] = None
+        self._by_type.setdefault(item.item_type, {})[slot] = None
+        self._by_item.setdefault(id(item), {})[slot] = None
+        if self._owner is not None:
+            self._owner.mark_dirty()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def remove(self, item: Item):
+        slots = self._by_item.get(id(item))
+        if not slots:
+            raise ValueError(f"{item.name} немає в інвентарі")
+        self._discard(next(iter(slots)))
+
+    def pop(self, index: int = -1) -> Item:
+        if not self._slots:
+            raise IndexError("інвентар порожній")
+        slot = self._slot_at(index)
+        item = self._slots[slot]
+        self._discard(slot)
+        return item
+
+    def take(self, name: str, count: int = 1) -> List[Item]:
+        slots = self._by_name.get(name, {})
+        if len(slots) < count:
+            raise ValueError(f"Недостатньо предметів {name}")
+        taken = []
+        for slot in list(islice(slots, count)):
+            taken.append(self._slots[slot])
+            self._discard(slot)
+        return taken
+
+    def quantity(self, name: str) -> int:
+        return len(self._by_name.get(name, ()))
+
+    def counts(self) -> Dict[str, int]:
+        return {name: len(slots) for name, slots in self._by_name.items()}
+
+    def of_type(self, item_type: ItemType) -> List[Item]:
+        return [self._slots[slot] for slot in self._by_type.get(item_type, ())]
+
+    def clear(self):
+        self.__init__(owner=self._owner)
+        if self._owner is not None:
+            self._owner.mark_dirty()
+
+    def _discard(self, slot: int):
+        item = self._slots.pop(slot)
+        for index, key in ((self._by_name, item.name), (self._by_type, item.item_type), (self._by_item, id(item))):
+            slots = index[key]
+            del slots[slot]
+            if not slots:
+                del index[key]
+        if self._owner is not None:
+            self._owner.mark_dirty()
+
+# Розклад ефектів персонажа: купа за тактом завершення, лічильники за типом і кешована сума шкоди/лікування за такт
+class EffectScheduler:
+    __slots__ = ("tick", "_effects", "_expiry", "_counts", "_damage", "_regen", "_hp_delta", "_next")
+
+    def __init__(self, effects=()):
+        self.tick = 0
+        self._effects: Dict[int, tuple] = {}
+        self._expiry: List[tuple] = []
+        self._counts: Dict[EffectType, int] = dict.fromkeys(EffectType, 0)
+        self._damage: Dict[int, Effect] = {}
+        self._regen: Dict[int, Effect] = {}
+        self._hp_delta = None
+        self._next = 0
+        for effect in effects:
+            self.add(effect)
+
+    def __len__(self):
+        return len(self._effects)
+
+    def __iter__(self):
+        for effect, expires in self._effects.values():
+            effect.duration = expires - self.tick
+            yield effect
+
+    def add(self, effect: Effect):
+        key = self._next
+        self._next += 1
+        expires = self.tick + effect.duration
+        self._effects[key] = (effect, expires)
+        heapq.heappush(self._expiry, (expires, key))
+        self._counts[effect.effect_type] += 1
+        if effect.effect_type in (EffectType.BURN, EffectType.POISON):
+            self._damage[key] = effect
+            self._hp_delta = None
+        elif effect.effect_type == EffectType.REGEN:
+            self._regen[key] = effect
+            self._hp_delta = None
+
+    def has(self, effect_type: EffectType) -> bool:
+        return self._counts[effect_type] > 0
+
+    def counts(self) -> Dict[EffectType, int]:
+        return {effect_type: count for effect_type, count in self._counts.items() if count}
+
+    def damage_effects(self):
+        return self._damage.values()
+
+    def affects_hp(self) -> bool:
+        return bool(self._damage or self._regen)
+
+    def hp_delta(self):
+        if self._hp_delta is None:
+            delta = 0
+            for effect in self._damage.values():
+                delta -= effect.power
+            for effect in self._regen.values():
+                delta += effect.power
+            self._hp_delta = delta
+        return self._hp_delta
+
+    def advance(self):
+        # Ефекти з тактом завершення не пізніше поточного знімаються після застосування
+        self.tick += 1
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= self.tick:
+            _, key = heapq.heappop(expiry)
+            effect, _ = self._effects.pop(key)
+            effect.duration = 0
+            self._counts[effect.effect_type] -= 1
+            if self._damage.pop(key, None) is not None or self._regen.pop(key, None) is not None:
+                self._hp_delta = None
+
+# Характеристики: базові значення та модифікатори з мітками (локація, погода, фракція, навички).
+# Ефективне значення = (база + сума додатків) * добуток (1 + множник), кешується до зміни модифікаторів
+class StatBlock:
+    __slots__ = ("_base", "_modifiers", "_cache")
+
+    def __init__(self, **base):
+        self._base: Dict[str, float] = base
+        self._modifiers: Dict[str, List[tuple]] = {}
+        self._cache: Dict[str, float] = {}
+
+    def base(self, stat: str):
+        return self._base.get(stat, 0)
+
+    def set_base(self, stat: str, value):
+        self._base[stat] = value
+        self._cache.pop(stat, None)
+
+    def add_base(self, stat: str, delta):
+        self.set_base(stat, self.base(stat) + delta)
+
+    def add(self, tag: str, stat: str, flat=0, mult: float = 0.0):
+        self._modifiers.setdefault(tag, []).append((stat, flat, mult))
+        self._cache.pop(stat, None)
+
+    def remove(self, tag: str):
+        for stat, _, _ in self._modifiers.pop(tag, ()):
+            self._cache.pop(stat, None)
+
+    def has(self, tag: str) -> bool:
+        return tag in self._modifiers
+
+    def scale(self, stat: str) -> float:
+        scale = 1.0
+        for modifiers in self._modifiers.values():
+            for modified, _, mult in modifiers:
+                if modified == stat and mult:
+                    scale *= 1 + mult
+        return scale
+
+    def value(self, stat: str):
+        try:
+            return self._cache[stat]
+        except KeyError:
+            pass
+        value = self._base.get(stat, 0)
+        multipliers = []
+        for modifiers in self._modifiers.values():
+            for modified, flat, mult in modifiers:
+                if modified == stat:
+                    value += flat
+                    if mult:
+                        multipliers.append(mult)
+        for mult in multipliers:
+            value *= 1 + mult
+        self._cache[stat] = value
+        return value
+
+# Характеристика, яку підсилює сила екіпірованого предмета кожного типу
+EQUIPMENT_STATS = {ItemType.WEAPON: "attack_power", ItemType.ARMOR: "defense", ItemType.ACCESSORY: "defense"}
+# Ефект, який накладає зачарування зброї при спрацюванні під час атаки (шанс дорівнює силі зачарування)
+ENCHANT_PROC_DURATION = 2
+ENCHANT_PROC_POWER = 5
+
 # Клас персонажа
-class Character:
+class Character(Tracked):
+    STATE_SECTION = "characters"
+    # HP і мана змінюються на кожному ударі; бій позначає учасників один раз наприкінці
+    TRANSIENT = frozenset(("hp", "mana"))
+
     def __init__(self, nickname: str, char_class: CharacterClass):
         self.nickname = nickname
         self.char_class = char_class
@@ -152,11 +784,11 @@ class Character:
         self.level = 1
         self.exp = 0
         self.gold = 100
-        self.attack_power = 10
-        self.defense = 5
-        self.inventory: List[Item] = []
+        self.stats = StatBlock(attack_power=10, defense=5, mana_cost_multiplier=1.0)
+        self.inventory = Inventory(owner=self)
         self.equipped_items: Dict[ItemType, Item] = {}
-        self.active_effects: List[Effect] = []
+        self._proc: Optional[Enchantment] = None
+        self.effects = EffectScheduler()
         self.skills = ["Сильний удар", "Захист"] if char_class == CharacterClass.WARRIOR else \
                       ["Вогняна куля", "Магічний щит"] if char_class == CharacterClass.MAGE else \
                       ["Постріл у спину", "Отруєне лезо"]
@@ -178,8 +810,8 @@ class Character:
             "level": self.level,
             "exp": self.exp,
             "gold": self.gold,
-            "attack_power": self.attack_power,
-            "defense": self.defense,
+            "attack_power": self.stats.base("attack_power"),
+            "defense": self.stats.base("defense"),
             "inventory": [item.to_dict() for item in self.inventory],
             "equipped_items": {k.name: v.to_dict() for k, v in self.equipped_items.items()},
             "active_effects": [effect.to_dict() for effect in self.active_effects],
@@ -201,109 +833,245 @@ class Character:
         character.gold = data["gold"]
         character.attack_power = data["attack_power"]
         character.defense = data["defense"]
-        character.inventory = [Item.from_dict(item) for item in data["inventory"]]
+        character.inventory = Inventory([Item.from_dict(item) for item in data["inventory"]], owner=character)
         character.equipped_items = {ItemType[k]: Item.from_dict(v) for k, v in data["equipped_items"].items()}
+        character.refresh_equipment()
         character.active_effects = [Effect.from_dict(effect) for effect in data["active_effects"]]
         character.skills = data["skills"]
         character.skill_levels = data["skill_levels"]
         character.reputation = data["reputation"]
         return character
 
+    @property
+    def attack_power(self):
+        return self.stats.value("attack_power")
+
+    @attack_power.setter
+    def attack_power(self, value):
+        self.stats.set_base("attack_power", value)
+
+    @property
+    def defense(self):
+        return self.stats.value("defense")
+
+    @defense.setter
+    def defense(self, value):
+        self.stats.set_base("defense", value)
+
+    @property
+    def mana_cost_multiplier(self) -> float:
+        return self.stats.value("mana_cost_multiplier")
+
+    @property
+    def active_effects(self) -> List[Effect]:
+        return list(self.effects)
+
+    @active_effects.setter
+    def active_effects(self, effects: List[Effect]):
+        self.effects = EffectScheduler(effects)
+
     def apply_effect(self, effect: Effect):
-        self.active_effects.append(effect)
-
-    def update_effects(self):
-        for effect in self.active_effects[:]:
-            effect.duration -= 1
-            if effect.effect_type == EffectType.BURN:
-                self.hp -= effect.power
-            elif effect.effect_type == EffectType.POISON:
-                self.hp -= effect.power
-            elif effect.effect_type == EffectType.REGEN:
-                self.hp += effect.power
-            if effect.duration <= 0:
-                self.active_effects.remove(effect)
-
-    def add_exp(self, exp: int):
+        self.effects.add(effect)
+        self.mark_dirty()
+
+    def update_effects(self, log=None):
+        effects = self.effects
+        if not effects:
+            return
+        self.mark_dirty()
+        if effects.affects_hp():
+            self.hp += effects.hp_delta()
+        if log is not None:
+            for effect in effects.damage_effects():
+                _record_damage(log, None, effect.effect_type.name, self.nickname, effect.power)
+        effects.advance()
+
+    def add_exp(self, exp: int, log=None):
         self.exp += exp
         while self.exp >= self.level * 100:
             self.exp -= self.level * 100
-            self.level += 1
-            self.max_hp += 20
-            self.max_mana += 10
-            self.attack_power += 5
-            self.defense += 2
-            print(f"{self.nickname} підвищив рівень до {self.level}!")
-
-    def attack(self, target: 'Character'):
+            self.level_up()
+            _report(log, "level_up", "{actor} підвищив рівень до {level}!", actor=self.nickname, level=self.level)
+
+    def level_up(self):
+        self.level += 1
+        self.max_hp += 20
+        self.max_mana += 10
+        self.stats.add_base("attack_power", 5)
+        self.stats.add_base("defense", 2)
+
+    def attack(self, target: 'Character', log=None, rng=random):
         damage = self.attack_power - target.defense
         if damage > 0:
             target.hp -= damage
-            print(f"{self.nickname} атакує {target.nickname} і завдає {damage} шкоди!")
-        else:
-            print(f"{self.nickname} атакує {target.nickname}, але не завдає шкоди!")
-
-    def use_skill(self, skill: str, targets: List['Character'], game: 'Game'):
+            _record_damage(log, self.nickname, "attack", target.nickname, damage)
+            _report(log, "attack", "{actor} атакує {target} і завдає {damage} шкоди!",
+                    actor=self.nickname, target=target.nickname, damage=damage)
+            enchantment = self._proc
+            if enchantment is not None and rng.random() < enchantment.power:
+                target.apply_effect(Effect(enchantment.effect_type, ENCHANT_PROC_DURATION, ENCHANT_PROC_POWER))
+                _report(log, "enchantment", "{enchantment} спрацьовують на {target}!",
+                        enchantment=enchantment.name, target=target.nickname)
+            return damage
+        _record_damage(log, self.nickname, "attack", target.nickname, 0)
+        _report(log, "attack", "{actor} атакує {target}, але не завдає шкоди!",
+                actor=self.nickname, target=target.nickname, damage=0)
+        return 0
+
+    def use_skill(self, skill: str, targets: List['Character'], game: 'Game', log=None):
         if skill not in self.skills:
-            print(f"{self.nickname} не має навички {skill}!")
+            _report(log, "skill_missing", "{actor} не має навички {skill}!", actor=self.nickname, skill=skill)
             return
-        if self.mana < 10:
-            print(f"{self.nickname} не має достатньо мани для використання навички!")
+        handler = game.skill_registry.get(skill)
+        if handler is None:
+            _report(log, "skill_unknown", "Навичка {skill} не описана в реєстрі навичок!", skill=skill)
             return
-        self.mana -= 10
-        if skill == "Сильний удар":
-            for target in targets:
-                damage = self.attack_power * 1.5 - target.defense
-                if damage > 0:
-                    target.hp -= damage
-                    print(f"{self.nickname} використовує {skill} на {target.nickname} і завдає {damage} шкоди!")
-        elif skill == "Вогняна куля":
-            for target in targets:
-                damage = self.attack_power * 2 - target.defense
-                if damage > 0:
-                    target.hp -= damage
-                    target.apply_effect(Effect(EffectType.BURN, 3, 5))
-                    print(f"{self.nickname} використовує {skill} на {target.nickname}, завдає {damage} шкоди і підпалює!")
-        elif skill == "Постріл у спину":
-            for target in targets:
-                damage = self.attack_power * 2.5 - target.defense
-                if damage > 0:
-                    target.hp -= damage
-                    print(f"{self.nickname} використовує {skill} на {target.nickname} і завдає {damage} шкоди!")
-        elif skill == "Отруєне лезо":
-            for target in targets:
-                damage = self.attack_power * 1.2 - target.defense
-                if damage > 0:
-                    target.hp -= damage
-                    target.apply_effect(Effect(EffectType.POISON, 3, 5))
-                    print(f"{self.nickname} використовує {skill} на {target.nickname}, завдає {damage} шкоди і отруює!")
-        elif skill == "Захист":
-            self.defense += 10
-            print(f"{self.nickname} використовує {skill} і підвищує захист!")
-        elif skill == "Магічний щит":
-            self.defense += 15
-            print(f"{self.nickname} використовує {skill} і підвищує захист!")
-        game.apply_elemental_combo(self, targets, [self.equipped_items[ItemType.WEAPON].damage_type] if ItemType.WEAPON in self.equipped_items else [])
-
-    def use_item(self, item: Item):
+        cost = handler.cost_for(self)
+        if self.mana < cost:
+            _report(log, "no_mana", "{actor} не має достатньо мани для використання навички!", actor=self.nickname)
+            return
+        self.mana -= cost
+        handler.apply(self, targets, self.skill_levels.get(skill, 1), log)
+        game.apply_elemental_combo(self, targets, [self.equipped_items[ItemType.WEAPON].damage_type] if ItemType.WEAPON in self.equipped_items else [], log)
+
+    def use_item(self, item: Item, log=None):
         if item.item_type == ItemType.POTION:
+            self.mark_dirty()
             if "здоров'я" in item.name.lower():
                 self.hp = min(self.max_hp, self.hp + item.power)
-                print(f"{self.nickname} використовує {item.name} і відновлює {item.power} HP!")
+                _report(log, "item", "{actor} використовує {item} і відновлює {amount} HP!",
+                        actor=self.nickname, item=item.name, amount=item.power)
             elif "мани" in item.name.lower():
                 self.mana = min(self.max_mana, self.mana + item.power)
-                print(f"{self.nickname} використовує {item.name} і відновлює {item.power} мани!")
+                _report(log, "item", "{actor} використовує {item} і відновлює {amount} мани!",
+                        actor=self.nickname, item=item.name, amount=item.power)
             self.inventory.remove(item)
 
-    def equip_item(self, item: Item):
+    def equip_item(self, item: Item, log=None):
         if item.item_type in self.equipped_items:
             self.inventory.append(self.equipped_items[item.item_type])
         self.equipped_items[item.item_type] = item
         self.inventory.remove(item)
-        print(f"{self.nickname} екіпірує {item.name}")
+        self.refresh_equipment()
+        self.mark_dirty()
+        _report(log, "equip", "{actor} екіпірує {item}", actor=self.nickname, item=item.name)
+
+    def unequip_item(self, item_type: ItemType, log=None) -> Optional[Item]:
+        item = self.equipped_items.pop(item_type, None)
+        if item is None:
+            return None
+        self.inventory.append(item)
+        self.refresh_equipment()
+        self.mark_dirty()
+        _report(log, "unequip", "{actor} знімає {item}", actor=self.nickname, item=item.name)
+        return item
+
+    # Перерахунок внеску екіпірування лише при зміні спорядження: сила предметів, бонуси наборів і зачарування зброї
+    def refresh_equipment(self):
+        stats = self.stats
+        stats.remove("equipment")
+        stats.remove("set")
+        pieces: Dict[ItemSet, int] = {}
+        for item in self.equipped_items.values():
+            stat = EQUIPMENT_STATS.get(item.item_type)
+            if stat is not None:
+                stats.add("equipment", stat, flat=item.power)
+            if item.item_set is not None:
+                pieces[item.item_set] = pieces.get(item.item_set, 0) + 1
+        for item_set, count in pieces.items():
+            for needed, bonuses in getattr(item_set, "bonuses", {}).items():
+                if count >= needed:
+                    for stat, value in bonuses.items():
+                        stats.add("set", stat, mult=value)
+        weapon = self.equipped_items.get(ItemType.WEAPON)
+        self._proc = weapon.enchantment if weapon is not None else None
+
+# Опис навичок: множник шкоди від сили атаки, ефект на ціль, баф характеристики, вартість мани,
+# цілі ("enemy" — обрані вороги, "self" — сам персонаж) і приріст сили за кожен рівень навички понад перший
+SKILL_DEFINITIONS = [
+    {"name": "Сильний удар", "cost": 10, "targeting": "enemy", "multiplier": 1.5, "scaling": 0.1},
+    {"name": "Вогняна куля", "cost": 10, "targeting": "enemy", "multiplier": 2, "scaling": 0.1,
+     "effect": ["BURN", 3, 5], "verb": "підпалює"},
+    {"name": "Постріл у спину", "cost": 10, "targeting": "enemy", "multiplier": 2.5, "scaling": 0.1},
+    {"name": "Отруєне лезо", "cost": 10, "targeting": "enemy", "multiplier": 1.2, "scaling": 0.1,
+     "effect": ["POISON", 3, 5], "verb": "отруює"},
+    {"name": "Захист", "cost": 10, "targeting": "self", "buff": ["defense", 10], "scaling": 0.1},
+    {"name": "Магічний щит", "cost": 10, "targeting": "self", "buff": ["defense", 15], "scaling": 0.1}
+]
+
+# Скомпільована навичка: усі поля розібрані один раз, виклик не порівнює рядків
+class SkillHandler:
+    __slots__ = ("name", "cost", "targeting", "multiplier", "scaling", "effect", "verb", "buff_stat", "buff_amount")
+
+    def __init__(self, definition: Dict):
+        self.name = definition["name"]
+        self.cost = definition.get("cost", 10)
+        self.targeting = definition.get("targeting", "enemy")
+        self.multiplier = definition.get("multiplier")
+        self.scaling = definition.get("scaling", 0.0)
+        effect = definition.get("effect")
+        self.effect = (EffectType[effect[0]], effect[1], effect[2]) if effect else None
+        self.verb = definition.get("verb")
+        self.buff_stat, self.buff_amount = definition.get("buff", (None, 0))
+
+    def level_factor(self, level: int) -> float:
+        return 1 if level <= 1 else 1 + self.scaling * (level - 1)
+
+    def cost_for(self, character: Character) -> int:
+        return round(self.cost * character.mana_cost_multiplier)
+
+    def apply(self, caster: Character, targets: List[Character], level: int = 1, log=None):
+        factor = self.level_factor(level)
+        if self.multiplier is not None and self.targeting == "enemy":
+            multiplier = self.multiplier * factor
+            for target in targets:
+                damage = caster.attack_power * multiplier - target.defense
+                if damage <= 0:
+                    continue
+                target.hp -= damage
+                _record_damage(log, caster.nickname, self.name, target.nickname, damage)
+                if self.effect is not None:
+                    target.apply_effect(Effect(*self.effect))
+                    _report(log, "skill", "{actor} використовує {action} на {target}, завдає {damage} шкоди і {verb}!",
+                            actor=caster.nickname, action=self.name, target=target.nickname, damage=damage, verb=self.verb)
+                else:
+                    _report(log, "skill", "{actor} використовує {action} на {target} і завдає {damage} шкоди!",
+                            actor=caster.nickname, action=self.name, target=target.nickname, damage=damage)
+        if self.buff_stat is not None:
+            caster.stats.add("skill", self.buff_stat, flat=self.buff_amount * factor)
+            _report(log, "buff", "{actor} використовує {action} і підвищує захист!", actor=caster.nickname, action=self.name)
+
+    # Пакетний шлях: одна навичка одночасно в усіх рядках cast_rows масивів BatchBattleSimulator
+    def apply_batch(self, caster: Character, me: '_BatchSide', foe: '_BatchSide', j: int, rows, targets, level: int = 1):
+        factor = self.level_factor(level)
+        if self.multiplier is not None and self.targeting == "enemy":
+            damage = me.attack_power[rows, j] * (self.multiplier * factor) - foe.defense[rows, targets]
+            hit = damage > 0
+            foe.hp[rows[hit], targets[hit]] -= damage[hit]
+            if self.effect is not None:
+                foe.add_effect(rows[hit], targets[hit], *self.effect)
+        if self.buff_stat is not None and hasattr(me, self.buff_stat):
+            getattr(me, self.buff_stat)[rows, j] += self.buff_amount * factor * caster.stats.scale(self.buff_stat)
+
+class SkillRegistry:
+    def __init__(self, definitions: List[Dict]):
+        self.handlers: Dict[str, SkillHandler] = {d["name"]: SkillHandler(d) for d in definitions}
+
+    @classmethod
+    def from_json(cls, filename: str) -> 'SkillRegistry':
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def get(self, name: str) -> Optional[SkillHandler]:
+        return self.handlers.get(name)
+
+    def register(self, definition: Dict):
+        self.handlers[definition["name"]] = SkillHandler(definition)
 
 # Клас квестів
-class Quest:
+class Quest(Tracked):
+    STATE_SECTION = "quests"
+
     def __init__(self, id: str, title: str, description: str, objectives: Dict[str, int], rewards: Dict):
         self.id = id
         self.title = title
@@ -334,18 +1102,22 @@ class Quest:
         }
         if data["rewards"]["item"]:
             rewards["item"] = Item.from_dict(data["rewards"]["item"])
-        return cls(
+        quest = cls(
             id=data["id"],
             title=data["title"],
             description=data["description"],
             objectives=data["objectives"],
             rewards=rewards
         )
+        quest.progress.update(data.get("progress", {}))
+        return quest
 
-    def update_progress(self, objective: str):
+    def update_progress(self, objective: str, amount: int = 1, log=None):
         if objective in self.progress:
-            self.progress[objective] += 1
-            print(f"Прогрес квесту '{self.title}': {objective} - {self.progress[objective]}/{self.objectives[objective]}")
+            self.progress[objective] += amount
+            self.mark_dirty()
+            _report(log, "quest_progress", "Прогрес квесту '{quest}': {objective} - {progress}/{goal}",
+                    quest=self.title, objective=objective, progress=self.progress[objective], goal=self.objectives[objective])
 
     def is_completed(self):
         return all(self.progress[obj] >= goal for obj, goal in self.objectives.items())
@@ -399,12 +1171,59 @@ class Location:
             description=data["description"]
         )
 
+# Шина подій квестів: квести підписані на свої цілі окремо для кожного персонажа, який їх узяв,
+# тому подія доходить лише до зацікавлених квестів, скільки б їх не було активно
+class QuestEventBus:
+    def __init__(self):
+        self._subscriptions: Dict[Character, Dict[str, Dict[Quest, None]]] = {}
+        self._holders: Dict[Quest, Dict[Character, None]] = {}
+        self._by_objective: Dict[str, Dict[Character, None]] = {}
+
+    def subscribe(self, character: Character, quest: Quest):
+        by_objective = self._subscriptions.setdefault(character, {})
+        for objective in quest.objectives:
+            by_objective.setdefault(objective, {})[quest] = None
+            self._by_objective.setdefault(objective, {})[character] = None
+        self._holders.setdefault(quest, {})[character] = None
+
+    def unsubscribe(self, character: Character, quest: Quest):
+        by_objective = self._subscriptions.get(character, {})
+        for objective in quest.objectives:
+            quests = by_objective.get(objective)
+            if quests is not None:
+                quests.pop(quest, None)
+                if not quests:
+                    del by_objective[objective]
+                    self._by_objective.get(objective, {}).pop(character, None)
+        self._holders.get(quest, {}).pop(character, None)
+
+    def holders(self, quest: Quest) -> List[Character]:
+        return list(self._holders.get(quest, ()))
+
+    def subscribers(self, objective: str) -> List[Character]:
+        return list(self._by_objective.get(objective, ()))
+
+    # Повертає квести, які ця подія щойно завершила
+    def emit(self, character: Character, objective: str, amount: int = 1, log=None) -> List[Quest]:
+        quests = self._subscriptions.get(character, {}).get(objective)
+        if not quests:
+            return []
+        completed = []
+        for quest in list(quests):
+            quest.update_progress(objective, amount, log)
+            if quest.is_completed():
+                completed.append(quest)
+        return completed
+
 # Клас гільдій
-class Guild:
+class Guild(Tracked):
+    STATE_SECTION = "guilds"
+
     def __init__(self, name: str, members: List[Character] = None):
         self.name = name
         self.members = members or []
         self.reputation = 0
+        self.registry: Optional['GameRegistry'] = None
 
     def to_dict(self):
         return {
@@ -417,19 +1236,33 @@ class Guild:
     def from_dict(cls, data):
         return cls(name=data["name"], members=[])
 
-    def add_member(self, character: Character):
+    def has_member(self, character: Character) -> bool:
+        if self.registry is not None:
+            return self.registry.is_member(self, character)
+        return character in self.members
+
+    def add_member(self, character: Character, log=None):
         self.members.append(character)
-        print(f"{character.nickname} приєднався до гільдії {self.name}")
+        self.mark_dirty()
+        if self.registry is not None:
+            self.registry.join(self, character)
+        _report(log, "guild_join", "{actor} приєднався до гільдії {guild}", actor=character.nickname, guild=self.name)
 
-    def remove_member(self, character: Character):
-        if character in self.members:
+    def remove_member(self, character: Character, log=None):
+        if self.has_member(character):
             self.members.remove(character)
-            print(f"{character.nickname} покинув гільдію {self.name}")
+            self.mark_dirty()
+            if self.registry is not None:
+                self.registry.leave(self, character)
+            _report(log, "guild_leave", "{actor} покинув гільдію {guild}", actor=character.nickname, guild=self.name)
         else:
-            print(f"{character.nickname} не є членом гільдії {self.name}")
+            _report(log, "guild_not_member", "{actor} не є членом гільдії {guild}",
+                    actor=character.nickname, guild=self.name)
 
 # Клас фракцій
-class Faction:
+class Faction(Tracked):
+    STATE_SECTION = "factions"
+
     def __init__(self, name: str, relations: Dict[str, float], bonuses: Dict[str, float]):
         self.name = name
         self.relations = relations
@@ -450,10 +1283,12 @@ class Faction:
             bonuses=data["bonuses"]
         )
 
-    def update_relations(self, other_faction: str, change: float):
+    def update_relations(self, other_faction: str, change: float, log=None):
         if other_faction in self.relations:
             self.relations[other_faction] = max(0.0, min(1.0, self.relations[other_faction] + change))
-            print(f"Відносини з {other_faction} оновлено до {self.relations[other_faction]:.2f}")
+            self.mark_dirty()
+            _report(log, "relations", "Відносини з {faction} оновлено до {value:.2f}",
+                    faction=other_faction, value=self.relations[other_faction])
 
 # Клас гільдійських воєн
 class GuildWar:
@@ -479,36 +1314,50 @@ class GuildWar:
         war.winner = next((g for g in guilds if g.name == data["winner"]), None)
         return war
 
-    def resolve_war(self, game: 'Game'):
-        print(f"\nВійна між {self.guild1.name} і {self.guild2.name}!")
-        team1 = self.guild1.members
-        team2 = self.guild2.members
-        while team1 and team2:
+    def resolve_war(self, game: 'Game', max_rounds: int = 100):
+        log = game.event_sink
+        _report(log, "war_start", "\nВійна між {guild1} і {guild2}!", guild1=self.guild1.name, guild2=self.guild2.name)
+        # Воюють лише живі; ліміт раундів не дає війні зациклитися, коли ніхто не може завдати шкоди
+        team1 = [c for c in self.guild1.members if c.hp > 0]
+        team2 = [c for c in self.guild2.members if c.hp > 0]
+        rng = game.rng.combat
+        for character in team1 + team2:
+            character.mark_dirty()
+        rounds = 0
+        while team1 and team2 and rounds < max_rounds:
+            rounds += 1
             for character in team1:
+                if not team2:
+                    break
                 if character.hp > 0:
-                    target = random.choice(team2)
-                    character.attack(target)
+                    target = rng.choice(team2)
+                    character.attack(target, log, rng)
                     if target.hp <= 0:
                         team2.remove(target)
             for character in team2:
+                if not team1:
+                    break
                 if character.hp > 0:
-                    target = random.choice(team1)
-                    character.attack(target)
+                    target = rng.choice(team1)
+                    character.attack(target, log, rng)
                     if target.hp <= 0:
                         team1.remove(target)
-        if team1:
-            self.winner = self.guild1
-        elif team2:
-            self.winner = self.guild2
+        if team1 and not team2:
+            self.winner, survivors = self.guild1, team1
+        elif team2 and not team1:
+            self.winner, survivors = self.guild2, team2
         else:
-            print("Нічия!")
+            _report(log, "war_draw", "Нічия!")
             return
-        print(f"Переможець: {self.winner.name}")
-        for member in self.winner.members:
+        _report(log, "war_winner", "Переможець: {guild}", guild=self.winner.name)
+        for member in survivors:
             member.gold += self.stakes["gold"]
-            member.add_exp(self.stakes["exp"])
+            game.metrics.inc("rpg_gold_minted_total", self.stakes["gold"], "war")
+            member.add_exp(self.stakes["exp"], log)
             member.reputation["Лицарі"] += self.stakes["reputation"]
-            print(f"{member.nickname} отримує {self.stakes['gold']} золота, {self.stakes['exp']} досвіду і {self.stakes['reputation']} репутації!")
+            member.mark_dirty()
+            _report(log, "war_reward", "{actor} отримує {gold} золота, {exp} досвіду і {reputation} репутації!",
+                    actor=member.nickname, **self.stakes)
 
 # Клас стихійних ефектів
 class ElementalEffect:
@@ -532,44 +1381,158 @@ class ElementalEffect:
             effect=Effect.from_dict(data["effect"])
         )
 
-# Клас динамічних подій
+_DAMAGE_BITS = {damage_type: 1 << i for i, damage_type in enumerate(DamageType)}
+
+def _element_mask(elements) -> int:
+    mask = 0
+    for element in elements:
+        if element is not None:
+            mask |= _DAMAGE_BITS[element]
+    return mask
+
+# Індекс комбінацій стихій: для кожної маски використаних стихій заздалегідь зібрано комбінації,
+# усі стихії яких входять у маску, тож пошук під час навички — одне звернення до списку
+class ElementalComboIndex:
+    def __init__(self, combos: List[ElementalEffect]):
+        self.combos = combos
+        self.version = getattr(combos, "version", 0)
+        self._by_mask: List[List[ElementalEffect]] = [[] for _ in range(1 << len(DamageType))]
+        for combo in combos:
+            needed = _element_mask(combo.elements)
+            for mask in range(len(self._by_mask)):
+                if mask & needed == needed:
+                    self._by_mask[mask].append(combo)
+
+    def matching(self, used_elements) -> List[ElementalEffect]:
+        return self._by_mask[_element_mask(used_elements)]
+
+# Умова події як набір пунктів, що мають виконуватися одночасно:
+# day_gte — день не менший за N, day_mod — день ділиться на N, weather — погода, location — локація
+class EventCondition:
+    __slots__ = ("day_gte", "day_mod", "weather", "location")
+
+    def __init__(self, day_gte: Optional[int] = None, day_mod: Optional[int] = None,
+                 weather: Optional[WeatherType] = None, location: Optional[str] = None):
+        self.day_gte = day_gte
+        self.day_mod = day_mod
+        self.weather = weather
+        self.location = location
+
+    def matches_place(self, weather: WeatherType, location: Optional[str]) -> bool:
+        return (self.weather is None or self.weather == weather) and (self.location is None or self.location == location)
+
+    def matches_day(self, day: int) -> bool:
+        return (self.day_gte is None or day >= self.day_gte) and (self.day_mod is None or day % self.day_mod == 0)
+
+    def to_dict(self):
+        data = {"day_gte": self.day_gte, "day_mod": self.day_mod,
+                "weather": self.weather.name if self.weather else None, "location": self.location}
+        return {k: v for k, v in data.items() if v is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            day_gte=data.get("day_gte"),
+            day_mod=data.get("day_mod"),
+            weather=WeatherType[data["weather"]] if data.get("weather") else None,
+            location=data.get("location")
+        )
+
+# Наслідок події для всіх персонажів (або лише для класів із classes):
+# apply_effect — [тип, тривалість, сила], exp — досвід, gold — зміна золота (не нижче нуля)
+def _compile_event_effect(spec: Dict):
+    applied = spec.get("apply_effect")
+    effect_type = EffectType[applied[0]] if applied else None
+    classes = {CharacterClass[name] for name in spec.get("classes", [])}
+    exp = spec.get("exp", 0)
+    gold = spec.get("gold", 0)
+
+    def run(game: 'Game'):
+        for character in game.characters:
+            if classes and character.char_class not in classes:
+                continue
+            if effect_type is not None:
+                character.apply_effect(Effect(effect_type, applied[1], applied[2]))
+            if exp:
+                character.add_exp(exp, game.event_sink)
+            if gold:
+                character.gold = max(0, character.gold + gold)
+                if gold > 0:
+                    game.metrics.inc("rpg_gold_minted_total", gold, "event")
+    return run
+
+# Типові динамічні події; використовуються при створенні гри і для старих збережень без умов
+DEFAULT_DYNAMIC_EVENTS = [
+    {"name": "Напад дракона", "description": "Дракон атакує вашу команду!", "location": "Гори",
+     "condition": {"day_gte": 5}, "effect": {"apply_effect": ["BURN", 3, 10]}},
+    {"name": "Свято врожаю", "description": "Ви берете участь у святі, отримуючи бонуси!", "location": "Ліс",
+     "condition": {"day_mod": 7}, "effect": {"exp": 100, "gold": 200}},
+    {"name": "Магічний шторм", "description": "Гроза викликає магічні перешкоди!", "location": "Пустеля",
+     "condition": {"weather": "STORM"}, "effect": {"apply_effect": ["STUN", 1, 0], "classes": ["MAGE"]}}
+]
+
+# Клас динамічних подій: умова й наслідок описані даними, тому зберігаються разом із грою
 class DynamicEvent:
-    def __init__(self, name: str, description: str, condition: callable, effect: callable, location: str = None):
+    def __init__(self, name: str, description: str, condition: Dict, effect, location: str = None):
         self.name = name
         self.description = description
-        self.condition = condition
-        self.effect = effect
         self.location = location
+        self.condition = EventCondition.from_dict({**condition, "location": location or condition.get("location")})
+        # effect — опис наслідку або довільна функція від гри (таку подію не можна зберегти)
+        self.effect_spec = effect if isinstance(effect, dict) else None
+        self.effect = _compile_event_effect(effect) if isinstance(effect, dict) else effect
 
     def to_dict(self):
+        if self.effect_spec is None:
+            raise ValueError(f"Подію {self.name} з довільною функцією-наслідком не можна зберегти; "
+                             f"опишіть наслідок словником (apply_effect, exp, gold, classes)")
         return {
             "name": self.name,
             "description": self.description,
-            "location": self.location
+            "location": self.location,
+            "condition": self.condition.to_dict(),
+            "effect": self.effect_spec
         }
 
     @classmethod
     def from_dict(cls, data):
-        conditions = {
-            "Напад дракона": lambda g: g.day >= 5,
-            "Свято врожаю": lambda g: g.day % 7 == 0,
-            "Магічний шторм": lambda g: g.weather_system.current_weather == WeatherType.STORM
-        }
-        effects = {
-            "Напад дракона": lambda g: [c.apply_effect(Effect(EffectType.BURN, 3, 10)) for c in g.characters],
-            "Свято врожаю": lambda g: [c.add_exp(100) or setattr(c, 'gold', c.gold + 200) for c in g.characters],
-            "Магічний шторм": lambda g: [c.apply_effect(Effect(EffectType.STUN, 1, 0)) for c in g.characters if c.char_class == CharacterClass.MAGE]
-        }
+        default = next((event for event in DEFAULT_DYNAMIC_EVENTS if event["name"] == data["name"]), {})
         return cls(
             name=data["name"],
             description=data["description"],
-            condition=conditions[data["name"]],
-            effect=effects[data["name"]],
+            condition=data.get("condition") or default.get("condition", {}),
+            effect=data.get("effect") or default.get("effect", {}),
             location=data["location"]
         )
 
     def can_trigger(self, game: 'Game'):
-        return self.condition(game) and (self.location is None or game.current_location.name == self.location)
+        location = game.current_location.name if game.current_location else None
+        return self.condition.matches_place(game.weather_system.current_weather, location) and \
+            self.condition.matches_day(game.day)
+
+# Планувальник динамічних подій: кандидати за (погода, локація) обчислюються один раз,
+# а список доступних подій перераховується лише при зміні дня, погоди чи локації.
+# Зміну виявляє порівняння (день, погода, локація) при кожному виклику, а не сповіщення від гри
+class DynamicEventScheduler:
+    def __init__(self, events: List[DynamicEvent]):
+        self.events = events
+        self.version = getattr(events, "version", 0)
+        self._by_place: Dict[tuple, List[DynamicEvent]] = {}
+        self._state = None
+        self._valid: List[DynamicEvent] = []
+
+    def valid(self, game: 'Game') -> List[DynamicEvent]:
+        weather = game.weather_system.current_weather
+        location = game.current_location.name if game.current_location else None
+        state = (game.day, weather, location)
+        if state != self._state:
+            candidates = self._by_place.get(state[1:])
+            if candidates is None:
+                candidates = self._by_place[state[1:]] = [
+                    event for event in self.events if event.condition.matches_place(weather, location)]
+            self._valid = [event for event in candidates if event.condition.matches_day(game.day)]
+            self._state = state
+        return self._valid
 
 # Клас рецептів крафту
 class CraftingRecipe:
@@ -593,28 +1556,1183 @@ class CraftingRecipe:
             result=Item.from_dict(data["result"])
         )
 
-    def can_craft(self, inventory: List[Item]):
-        item_counts = defaultdict(int)
-        for item in inventory:
-            item_counts[item.name] += 1
+    def can_craft(self, inventory: Inventory):
+        if not isinstance(inventory, Inventory):
+            inventory = Inventory(inventory)
         for item_name, count in self.required_items.items():
-            if item_counts[item_name] < count:
+            if inventory.quantity(item_name) < count:
                 return False
         return True
 
-    def craft(self, character: Character):
+    def craft(self, character: Character, log=None):
         for item_name, count in self.required_items.items():
-            for _ in range(count):
-                for item in character.inventory:
-                    if item.name == item_name:
-                        character.inventory.remove(item)
+            character.inventory.take(item_name, count)
+        character.inventory.append(self.result.copy())
+        _report(log, "craft", "{actor} створив {item}!", actor=character.nickname, item=self.result.name)
+
+# Бойовий журнал: структуровані записи шкоди без обов'язкового виводу в консоль
+class BattleLog:
+    def __init__(self, verbose: bool = False, sink=None):
+        self.sink = (CONSOLE_SINK if sink is None else sink) if verbose else NULL_SINK
+        self.enabled = self.sink.enabled
+        self.round = 0
+        self.entries: List[Dict] = []
+
+    def record(self, **entry):
+        entry["round"] = self.round
+        self.entries.append(entry)
+
+    def emit(self, event: GameEvent):
+        self.sink.emit(event)
+
+# Таймер фаз битви: lap(фаза) додає до фази час від попередньої позначки.
+# Вмикається через Game.enable_profiling; вимкнений таймер — це None і лише перевірка на None
+class PhaseTimer:
+    PHASES = ("modifiers", "player_turns", "enemy_turns", "sweeps", "effects", "rewards")
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = dict.fromkeys(self.PHASES, 0.0)
+        self.calls: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+        self.battles = 0
+        self._last = 0.0
+
+    def mark(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + now - self._last
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self._last = now
+
+    def report(self) -> Dict:
+        total = sum(self.seconds.values())
+        return {
+            "battles": self.battles,
+            "total_s": round(total, 6),
+            "phases": {phase: {"seconds": round(seconds, 6), "calls": self.calls[phase],
+                               "share": round(seconds / total, 4) if total else 0.0}
+                       for phase, seconds in self.seconds.items()}
+        }
+
+# Результат битви
+class BattleResult:
+    def __init__(self, winner: Optional[int], rounds: int, damage_log: List[Dict],
+                 survivors: List[List[Character]], defeated: List[tuple]):
+        self.winner = winner  # 1, 2 або None (нічия через ліміт раундів)
+        self.rounds = rounds
+        self.damage_log = damage_log
+        self.survivors = survivors
+        self.defeated = defeated  # пари (хто переміг, кого переможено)
+
+    def to_dict(self):
+        return {
+            "winner": self.winner,
+            "rounds": self.rounds,
+            "damage_log": self.damage_log,
+            "survivors": [[c.nickname for c in team] for team in self.survivors],
+            "defeated": [[killer.nickname if killer else None, victim.nickname] for killer, victim in self.defeated]
+        }
+
+# Стратегія ходу за замовчуванням: та сама логіка, що й у ворогів в інтерактивній битві.
+# Стратегія отримує (персонаж, союзники, вороги, гра) і повертає дію:
+# ("attack", ціль), ("skill", навичка, цілі), ("item", предмет), ("equip", предмет), ("skip", повідомлення)
+def random_policy(character: Character, allies: List[Character], enemies: List[Character], game: 'Game'):
+    if character.effects.has(EffectType.STUN):
+        return ("skip", f"{character.nickname} оглушений і пропускає хід!")
+    if character.effects.has(EffectType.FREEZE):
+        return ("skip", f"{character.nickname} заморожений і пропускає хід!")
+    if not enemies:
+        return ("skip", None)
+    rng = game.rng.ai if game is not None else random
+    target = rng.choice(enemies)
+    if rng.random() < 0.5 and character.skills:
+        return ("skill", rng.choice(character.skills), [target])
+    return ("attack", target)
+
+# Безголовий бойовий рушій: не використовує input() і друкує лише у режимі verbose
+class BattleEngine:
+    def __init__(self, game: 'Game', team1: List[Character], team2: List[Character],
+                 policy1=random_policy, policy2=random_policy,
+                 max_rounds: Optional[int] = 100, verbose: bool = False):
+        self.game = game
+        self.team1 = team1
+        self.team2 = team2
+        self.policy1 = policy1
+        self.policy2 = policy2
+        self.max_rounds = max_rounds
+        self.log = BattleLog(verbose, game.event_sink)
+        self.defeated: List[tuple] = []
+        self.timer: Optional[PhaseTimer] = game.battle_timer
+
+    def run(self) -> BattleResult:
+        team1 = [c for c in self.team1 if c.hp > 0]
+        team2 = [c for c in self.team2 if c.hp > 0]
+        timer = self.timer
+        metrics = self.game.metrics
+        rounds = 0
+        while team1 and team2 and (self.max_rounds is None or rounds < self.max_rounds):
+            rounds += 1
+            self.game.current_round = rounds
+            self.log.round = rounds
+            _report(self.log, "round", "\nРаунд {round}", round=rounds)
+            if timer is not None:
+                timer.mark()
+            for character in team1[:]:
+                if not team2:
+                    break
+                if character.hp > 0:
+                    self._act(character, self.policy1(character, team1, team2, self.game))
+                    if timer is not None:
+                        timer.lap("player_turns")
+                    self._sweep(team2, character)
+                    if timer is not None:
+                        timer.lap("sweeps")
+            for enemy in team2[:]:
+                if not team1:
+                    break
+                if enemy.hp > 0:
+                    self._act(enemy, self.policy2(enemy, team2, team1, self.game))
+                    if timer is not None:
+                        timer.lap("enemy_turns")
+                    self._sweep(team1, enemy)
+                    if timer is not None:
+                        timer.lap("sweeps")
+            if metrics.enabled:
+                for character in team1 + team2:
+                    for effect_type, count in character.effects.counts().items():
+                        metrics.inc("rpg_effect_ticks_total", count, effect_type.name)
+            for character in team1 + team2:
+                character.update_effects(self.log)
+            if timer is not None:
+                timer.lap("effects")
+            self._sweep(team1, None)
+            self._sweep(team2, None)
+            if timer is not None:
+                timer.lap("sweeps")
+
+        winner = None
+        if team1 and not team2:
+            winner = 1
+        elif team2 and not team1:
+            winner = 2
+        # Бафи навичок діють лише до кінця битви
+        for character in self.team1 + self.team2:
+            character.stats.remove("skill")
+            character.mark_dirty()
+        if metrics.enabled:
+            self._collect_metrics(metrics, winner, rounds)
+        return BattleResult(winner, rounds, self.log.entries, [team1, team2], self.defeated)
+
+    # Шкода атак і навичок рахується за типом шкоди зброї нападника, шкода ефектів — за типом ефекту
+    def _collect_metrics(self, metrics, winner: Optional[int], rounds: int):
+        metrics.inc("rpg_battles_total", 1, {1: "team1", 2: "team2"}.get(winner, "draw"))
+        metrics.observe("rpg_battle_rounds", rounds)
+        damage_types = {}
+        for character in self.team1 + self.team2:
+            weapon = character.equipped_items.get(ItemType.WEAPON)
+            damage_type = weapon.damage_type if weapon is not None and weapon.damage_type is not None else DamageType.PHYSICAL
+            damage_types[character.nickname] = damage_type.name
+        for entry in self.log.entries:
+            if entry["damage"] > 0:
+                damage_type = damage_types.get(entry["actor"]) if entry["actor"] is not None \
+                    else _EFFECT_DAMAGE_TYPES.get(entry["action"])
+                metrics.inc("rpg_damage_total", entry["damage"], damage_type or DamageType.PHYSICAL.name)
+
+    def _act(self, character: Character, action):
+        kind = action[0]
+        if kind == "attack":
+            character.attack(action[1], self.log, self.game.rng.combat)
+        elif kind == "skill":
+            character.use_skill(action[1], action[2], self.game, self.log)
+        elif kind == "item":
+            character.use_item(action[1], self.log)
+        elif kind == "equip":
+            character.equip_item(action[1], self.log)
+        elif kind == "skip" and action[1]:
+            _report(self.log, "skip", action[1])
+
+    def _sweep(self, team: List[Character], killer: Optional[Character]):
+        for c in team[:]:
+            if c.hp <= 0:
+                team.remove(c)
+                self.defeated.append((killer, c))
+                _report(self.log, "defeated", "{target} переможений!", target=c.nickname)
+
+_EFFECT_CODES = {effect_type: code for code, effect_type in enumerate(EffectType)}
+_EFFECT_DAMAGE_TYPES = {EffectType.BURN.name: DamageType.FIRE.name, EffectType.POISON.name: DamageType.POISON.name}
+
+# Стан однієї сторони у N незалежних битвах: масиви форми (N, розмір_команди)
+class _BatchSide:
+    def __init__(self, team: List[Character], n: int):
+        size = len(team)
+        self.hp = np.tile(np.array([c.hp for c in team], dtype=float), (n, 1))
+        self.attack_power = np.tile(np.array([c.attack_power for c in team], dtype=float), (n, 1))
+        self.defense = np.tile(np.array([c.defense for c in team], dtype=float), (n, 1))
+        self.mana = np.tile(np.array([c.mana for c in team], dtype=float), (n, 1))
+        self.alive = self.hp > 0
+        slots = max([len(c.active_effects) for c in team] + [1])
+        # active_effects: код типу (-1 — порожній слот), тривалість і сила, форма (N, розмір, слоти)
+        self.effect_type = np.full((n, size, slots), -1, dtype=np.int8)
+        self.effect_duration = np.zeros((n, size, slots), dtype=np.int32)
+        self.effect_power = np.zeros((n, size, slots), dtype=float)
+        for j, c in enumerate(team):
+            for k, effect in enumerate(c.active_effects):
+                self.effect_type[:, j, k] = _EFFECT_CODES[effect.effect_type]
+                self.effect_duration[:, j, k] = effect.duration
+                self.effect_power[:, j, k] = effect.power
+
+    def add_effect(self, rows, cols, effect_type: EffectType, duration: int, power: float):
+        if len(rows) == 0:
+            return
+        free = self.effect_type[rows, cols] < 0
+        if not free.any(axis=1).all():
+            n, size, _ = self.effect_type.shape
+            self.effect_type = np.concatenate([self.effect_type, np.full((n, size, 1), -1, dtype=np.int8)], axis=2)
+            self.effect_duration = np.concatenate([self.effect_duration, np.zeros((n, size, 1), dtype=np.int32)], axis=2)
+            self.effect_power = np.concatenate([self.effect_power, np.zeros((n, size, 1))], axis=2)
+            free = self.effect_type[rows, cols] < 0
+        slot = free.argmax(axis=1)
+        self.effect_type[rows, cols, slot] = _EFFECT_CODES[effect_type]
+        self.effect_duration[rows, cols, slot] = duration
+        self.effect_power[rows, cols, slot] = power
+
+    def is_disabled(self, rows, j) -> 'np.ndarray':
+        codes = self.effect_type[rows, j]
+        return ((codes == _EFFECT_CODES[EffectType.STUN]) | (codes == _EFFECT_CODES[EffectType.FREEZE])).any(axis=1)
+
+    def tick(self):
+        live = (self.effect_type >= 0) & self.alive[:, :, None]
+        if not live.any():
+            return
+        self.effect_duration[live] -= 1
+        damaging = live & ((self.effect_type == _EFFECT_CODES[EffectType.BURN]) | (self.effect_type == _EFFECT_CODES[EffectType.POISON]))
+        healing = live & (self.effect_type == _EFFECT_CODES[EffectType.REGEN])
+        self.hp -= np.where(damaging, self.effect_power, 0.0).sum(axis=2)
+        self.hp += np.where(healing, self.effect_power, 0.0).sum(axis=2)
+        self.effect_type[live & (self.effect_duration <= 0)] = -1
+
+    def keep(self, rows):
+        for name in ("hp", "attack_power", "defense", "mana", "alive", "effect_type", "effect_duration", "effect_power"):
+            setattr(self, name, getattr(self, name)[rows])
+
+# Результат пакетної симуляції
+class BatchResult:
+    def __init__(self, winners: 'np.ndarray', rounds: 'np.ndarray'):
+        self.winners = winners  # 1, 2 або 0 (нічия)
+        self.rounds = rounds
+
+    def summary(self) -> Dict[str, float]:
+        n = len(self.winners)
+        return {
+            "samples": n,
+            "team1_win_rate": float((self.winners == 1).sum() / n) if n else 0.0,
+            "team2_win_rate": float((self.winners == 2).sum() / n) if n else 0.0,
+            "draw_rate": float((self.winners == 0).sum() / n) if n else 0.0,
+            "avg_rounds": float(self.rounds.mean()) if n else 0.0
+        }
+
+# Векторизований симулятор: N копій однієї битви зі стратегією random_policy для обох сторін
+class BatchBattleSimulator:
+    def __init__(self, game: 'Game', team1: List[Character], team2: List[Character], max_rounds: int = 100):
+        if np is None:
+            raise RuntimeError("Пакетна симуляція потребує встановленого NumPy")
+        self.game = game
+        self.teams = [team1, team2]
+        self.max_rounds = max_rounds
+        self.skills = [[[game.skill_registry.get(skill) for skill in c.skills] for c in team] for team in self.teams]
+        # Комбінації стихій, які спрацьовують від зброї кожного бійця при використанні навички
+        self.combos = [[self._combos_for(c) for c in team] for team in self.teams]
+        self.procs = [[c._proc for c in team] for team in self.teams]
+
+    def _combos_for(self, character: Character) -> List[Effect]:
+        weapon = character.equipped_items.get(ItemType.WEAPON)
+        used = [weapon.damage_type] if weapon else []
+        return [combo.effect for combo in self.game.elemental_combos().matching(used)]
+
+    def run(self, n: int, seed: Optional[int] = None) -> BatchResult:
+        rng = np.random.default_rng(seed)
+        sides = [_BatchSide(self.teams[0], n), _BatchSide(self.teams[1], n)]
+        winners = np.zeros(n, dtype=np.int8)
+        rounds = np.zeros(n, dtype=np.int32)
+        # Індекси ще незавершених битв; завершені вилучаються з масивів після кожного раунду
+        fights = np.arange(n)
+        current_round = 0
+        recorded = np.zeros(n, dtype=bool)
+        while len(fights):
+            alive1 = sides[0].alive.any(axis=1)
+            alive2 = sides[1].alive.any(axis=1)
+            done = ~(alive1 & alive2) | (current_round >= self.max_rounds)
+            fresh = done & ~recorded
+            if fresh.any():
+                finished = fights[fresh]
+                winners[finished] = np.where(alive1[fresh] & ~alive2[fresh], 1, np.where(alive2[fresh] & ~alive1[fresh], 2, 0))
+                rounds[finished] = current_round
+                recorded |= fresh
+            # Стискаємо масиви, лише коли завершених битв накопичилося достатньо
+            if done.all() or done.sum() * 8 >= len(fights):
+                keep = ~done
+                fights = fights[keep]
+                recorded = recorded[keep]
+                for state in sides:
+                    state.keep(keep)
+                if not len(fights):
+                    break
+            current_round += 1
+            for side in (0, 1):
+                me, foe = sides[side], sides[1 - side]
+                for j in range(len(self.teams[side])):
+                    rows = np.nonzero(me.alive[:, j] & foe.alive.any(axis=1))[0]
+                    if len(rows):
+                        self._act(rng, side, j, me, foe, rows)
+                        foe.alive &= foe.hp > 0
+            for state in sides:
+                state.tick()
+                state.alive &= state.hp > 0
+        return BatchResult(winners, rounds)
+
+    def _act(self, rng, side: int, j: int, me: _BatchSide, foe: _BatchSide, rows):
+        rows = rows[~me.is_disabled(rows, j)]
+        if not len(rows):
+            return
+        alive = foe.alive[rows]
+        pick = (rng.random(len(rows)) * alive.sum(axis=1)).astype(np.int64)
+        targets = (np.cumsum(alive, axis=1) > pick[:, None]).argmax(axis=1)
+
+        skills = self.skills[side][j]
+        use_skill = rng.random(len(rows)) < 0.5 if skills else np.zeros(len(rows), dtype=bool)
+
+        attack_rows, attack_targets = rows[~use_skill], targets[~use_skill]
+        damage = me.attack_power[attack_rows, j] - foe.defense[attack_rows, attack_targets]
+        hit = damage > 0
+        foe.hp[attack_rows[hit], attack_targets[hit]] -= damage[hit]
+        proc = self.procs[side][j]
+        if proc is not None and hit.any():
+            hit_rows, hit_targets = attack_rows[hit], attack_targets[hit]
+            fired = rng.random(len(hit_rows)) < proc.power
+            foe.add_effect(hit_rows[fired], hit_targets[fired], proc.effect_type, ENCHANT_PROC_DURATION, ENCHANT_PROC_POWER)
+
+        if not use_skill.any():
+            return
+        skill_rows, skill_targets = rows[use_skill], targets[use_skill]
+        choice = rng.integers(len(skills), size=len(skill_rows))
+        caster = self.teams[side][j]
+        for code, handler in enumerate(skills):
+            if handler is None:
+                continue
+            chosen = choice == code
+            cast_rows, cast_targets = skill_rows[chosen], skill_targets[chosen]
+            cost = handler.cost_for(caster)
+            enough_mana = me.mana[cast_rows, j] >= cost
+            cast_rows, cast_targets = cast_rows[enough_mana], cast_targets[enough_mana]
+            if not len(cast_rows):
+                continue
+            me.mana[cast_rows, j] -= cost
+            handler.apply_batch(caster, me, foe, j, cast_rows, cast_targets, caster.skill_levels.get(handler.name, 1))
+            for effect in self.combos[side][j]:
+                foe.add_effect(cast_rows, cast_targets, effect.effect_type, effect.duration, effect.power)
+
+# Планувальник крафту: вимоги рецептів скомпільовані в індекс матеріал → рецепти
+class CraftingPlanner:
+    MAX_PLAN = 1_000_000
+    CHAINS_CACHE_SIZE = 256
+
+    def __init__(self, recipes: List[CraftingRecipe]):
+        self.recipes = list(recipes)
+        self._by_name = {recipe.name: i for i, recipe in enumerate(self.recipes)}
+        # Нульові вимоги (можливі у збереженнях) нічого не обмежують, тому відкидаються
+        self._requirements = [tuple((material, count) for material, count in recipe.required_items.items()
+                                    if count > 0) for recipe in self.recipes]
+        self._by_material: Dict[str, List[tuple]] = {}
+        self._producers: Dict[str, int] = {}
+        for i, requirements in enumerate(self._requirements):
+            for material, count in requirements:
+                self._by_material.setdefault(material, []).append((i, count))
+            self._producers.setdefault(self.recipes[i].result.name, i)
+        self._order = self._topological_order()
+        self._position = {item: i for i, item in enumerate(self._order)}
+        self._closures: Dict[int, List[str]] = {}
+        self._chains: Dict[frozenset, Dict[str, int]] = {}
+
+    def _topological_order(self) -> List[str]:
+        # Предмет іде раніше за свої матеріали; рецепти в циклах не розгортаються
+        order, state = [], {}
+
+        def visit(item):
+            state[item] = 1
+            producer = self._producers.get(item)
+            if producer is not None:
+                for material, _ in self._requirements[producer]:
+                    if state.get(material) == 1:
+                        self._producers.pop(item, None)
+                    elif material not in state:
+                        visit(material)
+            state[item] = 2
+            order.append(item)
+
+        for item in list(self._producers):
+            if item not in state:
+                visit(item)
+        for requirements in self._requirements:
+            for material, _ in requirements:
+                if material not in state:
+                    visit(material)
+        order.reverse()
+        return order
+
+    def _closure(self, target: int) -> List[str]:
+        # Усі предмети, від яких залежить рецепт, у топологічному порядку
+        closure = self._closures.get(target)
+        if closure is None:
+            seen = set()
+            stack = [material for material, _ in self._requirements[target]]
+            while stack:
+                item = stack.pop()
+                if item in seen:
+                    continue
+                seen.add(item)
+                producer = self._producers.get(item)
+                if producer is not None and producer != target:
+                    stack.extend(material for material, _ in self._requirements[producer])
+            closure = self._closures[target] = sorted(seen, key=self._position.__getitem__)
+        return closure
+
+    def craftable(self, inventory: Inventory) -> Dict[str, int]:
+        # Один прохід по різних назвах в інвентарі: рахуємо, скільки вимог кожного рецепта виконано
+        counts = inventory.counts()
+        satisfied = [0] * len(self.recipes)
+        for name, have in counts.items():
+            for i, need in self._by_material.get(name, ()):
+                if have >= need:
+                    satisfied[i] += 1
+        result = {}
+        for i, requirements in enumerate(self._requirements):
+            if requirements and satisfied[i] == len(requirements):
+                result[self.recipes[i].name] = min(counts[material] // count for material, count in requirements)
+        return result
+
+    def plan(self, inventory: Inventory, recipe_name: str, count: int = 1, counts: Optional[Dict[str, int]] = None):
+        # Повертає кроки [(рецепт, кількість), ...] у порядку виконання або None, якщо матеріалів не вистачає
+        counts = inventory.counts() if counts is None else counts
+        target = self._by_name[recipe_name]
+        crafts = {target: count}
+        demand: Dict[str, int] = {}
+        for material, need in self._requirements[target]:
+            demand[material] = demand.get(material, 0) + need * count
+        closure = self._closure(target)
+        for item in closure:
+            deficit = demand.get(item, 0) - counts.get(item, 0)
+            if deficit <= 0:
+                continue
+            producer = self._producers.get(item)
+            if producer is None or producer == target:
+                return None
+            crafts[producer] = crafts.get(producer, 0) + deficit
+            for material, need in self._requirements[producer]:
+                demand[material] = demand.get(material, 0) + need * deficit
+        steps = [(self.recipes[self._producers[item]].name, crafts.pop(self._producers[item]))
+                 for item in reversed(closure)
+                 if self._producers.get(item) in crafts and self._producers[item] != target]
+        steps.append((recipe_name, count))
+        return steps
+
+    def max_craftable(self, inventory: Inventory, recipe_name: str, counts: Optional[Dict[str, int]] = None) -> int:
+        counts = inventory.counts() if counts is None else counts
+        if not self._requirements[self._by_name[recipe_name]]:
+            return self.MAX_PLAN
+        low, high = 0, 1
+        while high <= self.MAX_PLAN and self.plan(inventory, recipe_name, high, counts) is not None:
+            low, high = high, high * 2
+        high = min(high, self.MAX_PLAN + 1)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.plan(inventory, recipe_name, middle, counts) is not None:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    # Результат залежить лише від кількостей предметів, тому кешується за ними
+    def craftable_with_chains(self, inventory: Inventory) -> Dict[str, int]:
+        counts = inventory.counts()
+        key = frozenset(counts.items())
+        result = self._chains.get(key)
+        if result is None:
+            result = {}
+            for recipe in self.recipes:
+                amount = self.max_craftable(inventory, recipe.name, counts)
+                if amount:
+                    result[recipe.name] = amount
+            if len(self._chains) >= self.CHAINS_CACHE_SIZE:
+                self._chains.clear()
+            self._chains[key] = result
+        return dict(result)
+
+# Реєстр гри: індекси персонажів за нікнеймом, квестів за id і членства в гільдіях
+class GameRegistry:
+    def __init__(self):
+        self.characters: Dict[str, Character] = {}
+        self.quests: Dict[str, Quest] = {}
+        self._memberships: Dict[Character, Dict[Guild, None]] = {}
+        self.lazy_characters: Optional['LazyCharacterList'] = None
+
+    def add_character(self, character: Character) -> bool:
+        if self.character(character.nickname) is not None:
+            return False
+        self.characters[character.nickname] = character
+        return True
+
+    def character(self, nickname: str) -> Optional[Character]:
+        character = self.characters.get(nickname)
+        if character is None and self.lazy_characters is not None:
+            character = self.lazy_characters.by_nickname(nickname)
+        return character
+
+    def add_quest(self, quest: Quest):
+        self.quests.setdefault(quest.id, quest)
+
+    def quest(self, quest_id: str) -> Optional[Quest]:
+        return self.quests.get(quest_id)
+
+    def join(self, guild: Guild, character: Character):
+        self._memberships.setdefault(character, {})[guild] = None
+
+    def leave(self, guild: Guild, character: Character):
+        guilds = self._memberships.get(character)
+        if guilds is not None:
+            guilds.pop(guild, None)
+            if not guilds:
+                del self._memberships[character]
+
+    def is_member(self, guild: Guild, character: Character) -> bool:
+        return guild in self._memberships.get(character, ())
+
+    def guilds_of(self, character: Character) -> List[Guild]:
+        return list(self._memberships.get(character, ()))
+
+    def rebuild(self, characters: List[Character], quests: List[Quest], guilds: List[Guild]):
+        self.__init__()
+        for character in characters:
+            self.add_character(character)
+        for quest in quests:
+            self.add_quest(quest)
+        for guild in guilds:
+            guild.registry = self
+            for member in guild.members:
+                self.join(guild, member)
+
+# Двійковий формат збереження: заголовок, таблиця зміщень, хеш-індекс нікнеймів і записи персонажів
+class _BinaryWriter:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def byte(self, value: int):
+        self.buffer.append(value)
+
+    def int32(self, value: int):
+        self.buffer += struct.pack("<i", value)
+
+    def number(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            self.buffer += b"i" + struct.pack("<q", value)
+        else:
+            self.buffer += b"d" + struct.pack("<d", value)
+
+    def text(self, value: str):
+        data = value.encode("utf-8")
+        self.buffer += struct.pack("<I", len(data)) + data
+
+    def enum(self, value: Optional[Enum], enum_type):
+        self.byte(255 if value is None else list(enum_type).index(value))
+
+    def item(self, item: Item):
+        self.text(item.name)
+        self.enum(item.item_type, ItemType)
+        self.enum(item.quality, ItemQuality)
+        self.enum(item.damage_type, DamageType)
+        self.number(item.power)
+        self.number(item.value)
+        set_name = getattr(item.item_set, "name", None)
+        self.byte(set_name is not None)
+        if set_name is not None:
+            self.text(set_name)
+        self.byte(item.enchantment is not None)
+        if item.enchantment is not None:
+            self.text(item.enchantment.name)
+            self.enum(item.enchantment.effect_type, EffectType)
+            self.number(item.enchantment.power)
+
+    def character(self, character: Character):
+        self.text(character.nickname)
+        self.enum(character.char_class, CharacterClass)
+        for value in (character.hp, character.max_hp, character.mana, character.max_mana, character.level,
+                      character.exp, character.gold, character.stats.base("attack_power"), character.stats.base("defense")):
+            self.number(value)
+        self.int32(len(character.inventory))
+        for item in character.inventory:
+            self.item(item)
+        self.byte(len(character.equipped_items))
+        for item_type, item in character.equipped_items.items():
+            self.enum(item_type, ItemType)
+            self.item(item)
+        self.int32(len(character.active_effects))
+        for effect in character.active_effects:
+            self.enum(effect.effect_type, EffectType)
+            self.number(effect.duration)
+            self.number(effect.power)
+        self.text(json.dumps({
+            "skills": character.skills,
+            "skill_levels": character.skill_levels,
+            "reputation": character.reputation,
+            "active_quests": [quest.id for quest in character.active_quests]
+        }, ensure_ascii=False, separators=(",", ":")))
+
+class _BinaryReader:
+    _ITEM_TYPES = list(ItemType)
+    _QUALITIES = list(ItemQuality)
+    _DAMAGE_TYPES = list(DamageType)
+    _EFFECT_TYPES = list(EffectType)
+    _CLASSES = list(CharacterClass)
+
+    def __init__(self, buffer, offset: int):
+        self.buffer = buffer
+        self.offset = offset
+
+    def byte(self) -> int:
+        value = self.buffer[self.offset]
+        self.offset += 1
+        return value
+
+    def int32(self) -> int:
+        value, = struct.unpack_from("<i", self.buffer, self.offset)
+        self.offset += 4
+        return value
+
+    def number(self):
+        kind = self.buffer[self.offset]
+        value, = struct.unpack_from("<q" if kind == ord("i") else "<d", self.buffer, self.offset + 1)
+        self.offset += 9
+        return value
+
+    def text(self) -> str:
+        size, = struct.unpack_from("<I", self.buffer, self.offset)
+        start = self.offset + 4
+        self.offset = start + size
+        return bytes(self.buffer[start:self.offset]).decode("utf-8")
+
+    def enum(self, values):
+        code = self.byte()
+        return None if code == 255 else values[code]
+
+    def item(self) -> Item:
+        name = self.text()
+        item_type = self.enum(self._ITEM_TYPES)
+        quality = self.enum(self._QUALITIES)
+        damage_type = self.enum(self._DAMAGE_TYPES)
+        power = self.number()
+        value = self.number()
+        item_set = ItemSet.get(self.text()) if self.byte() else None
+        enchantment = None
+        if self.byte():
+            enchantment = Enchantment(self.text(), self.enum(self._EFFECT_TYPES), self.number())
+        return Item(name, item_type, power, value, quality, item_set, enchantment, damage_type)
+
+    def character(self):
+        character = Character(self.text(), self.enum(self._CLASSES))
+        (character.hp, character.max_hp, character.mana, character.max_mana, character.level,
+         character.exp, character.gold, character.attack_power, character.defense) = [self.number() for _ in range(9)]
+        character.inventory = Inventory([self.item() for _ in range(self.int32())], owner=character)
+        equipped = {}
+        for _ in range(self.byte()):
+            item_type = self.enum(self._ITEM_TYPES)
+            equipped[item_type] = self.item()
+        character.equipped_items = equipped
+        character.refresh_equipment()
+        character.active_effects = [Effect(self.enum(self._EFFECT_TYPES), self.number(), self.number())
+                                    for _ in range(self.int32())]
+        extra = json.loads(self.text())
+        character.skills = extra["skills"]
+        character.skill_levels = extra["skill_levels"]
+        character.reputation = extra["reputation"]
+        return character, extra["active_quests"]
+
+class BinarySaveFile:
+    MAGIC = b"RPGB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIQQQQ")
+    INDEX_ENTRY = struct.Struct("<QI")
+    HASH_ENTRY = struct.Struct("<QI")
+
+    def __init__(self, filename: str):
+        self.filename = os.path.abspath(filename)
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _, self.count, self._index_offset, self._hash_offset, world_offset, world_length = \
+                self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f"{filename} не є двійковим збереженням цієї версії")
+        except Exception:
+            self.close()
+            raise
+        self._world = (world_offset, world_length)
+
+    @staticmethod
+    def nickname_hash(nickname: str) -> int:
+        return int.from_bytes(hashlib.blake2b(nickname.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def world(self) -> Dict:
+        offset, length = self._world
+        return json.loads(bytes(self._map[offset:offset + length]).decode("utf-8"))
+
+    def record(self, index: int):
+        offset, length = self.INDEX_ENTRY.unpack_from(self._map, self._index_offset + index * self.INDEX_ENTRY.size)
+        return self._map[offset:offset + length]
+
+    def decode(self, index: int):
+        offset, _ = self.INDEX_ENTRY.unpack_from(self._map, self._index_offset + index * self.INDEX_ENTRY.size)
+        return _BinaryReader(self._map, offset).character()
+
+    def nickname_at(self, index: int) -> str:
+        offset, _ = self.INDEX_ENTRY.unpack_from(self._map, self._index_offset + index * self.INDEX_ENTRY.size)
+        return _BinaryReader(self._map, offset).text()
+
+    def find(self, nickname: str) -> Optional[int]:
+        # Двійковий пошук у відсортованій хеш-таблиці прямо у відображеній пам'яті
+        target = self.nickname_hash(nickname)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value, _ = self.HASH_ENTRY.unpack_from(self._map, self._hash_offset + middle * self.HASH_ENTRY.size)
+            if value < target:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self.count:
+            value, index = self.HASH_ENTRY.unpack_from(self._map, self._hash_offset + low * self.HASH_ENTRY.size)
+            if value != target:
+                return None
+            if self.nickname_at(index) == nickname:
+                return index
+            low += 1
+        return None
+
+    # Файл закриває власник: load_game передає його LazyCharacterList, решта коду відкриває через with
+    def close(self):
+        if getattr(self, "_map", None) is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def write(cls, filename: str, characters, world: Dict):
+        records = bytearray()
+        index = []
+        hashes = []
+        lazy = characters if isinstance(characters, LazyCharacterList) else None
+        for i in range(len(characters)):
+            raw = lazy.raw(i) if lazy is not None else None
+            if raw is None:
+                writer = _BinaryWriter()
+                writer.character(characters[i])
+                raw = writer.buffer
+                nickname = characters[i].nickname
+            else:
+                nickname = lazy.nickname(i)
+            index.append((cls.HEADER.size + len(records), len(raw)))
+            hashes.append((cls.nickname_hash(nickname), i))
+            records += raw
+        # Файл, відображений у пам'ять, не можна замінити (Windows): відображення закривається на час заміни,
+        # а потім список переходить на новий файл, де запис i відповідає позиції i
+        remap = lazy is not None and lazy.source_path() == os.path.abspath(filename)
+        hashes.sort()
+        world_blob = json.dumps(world, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index_offset = cls.HEADER.size + len(records)
+        hash_offset = index_offset + len(index) * cls.INDEX_ENTRY.size
+        world_offset = hash_offset + len(hashes) * cls.HASH_ENTRY.size
+        with open(filename + ".tmp", 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(index), index_offset, hash_offset,
+                                    world_offset, len(world_blob)))
+            f.write(records)
+            f.write(b"".join(cls.INDEX_ENTRY.pack(*entry) for entry in index))
+            f.write(b"".join(cls.HASH_ENTRY.pack(*entry) for entry in hashes))
+            f.write(world_blob)
+        if not remap:
+            os.replace(filename + ".tmp", filename)
+            return
+        source_index = lazy.detach()
+        try:
+            os.replace(filename + ".tmp", filename)
+        except OSError:
+            lazy.attach(cls(filename), source_index)
+            raise
+        lazy.attach(cls(filename), list(range(len(index))))
+
+# Список персонажів, що декодує запис із двійкового файлу лише при першому зверненні
+class LazyCharacterList(MutableSequence):
+    def __init__(self, source: BinarySaveFile, on_load):
+        self._source = source
+        self._on_load = on_load
+        self._items: List[Optional[Character]] = [None] * source.count
+        self._source_index: List[Optional[int]] = list(range(source.count))
+        # Позиція кожного запису у списку; після вставки чи видалення перебудовується при наступному пошуку
+        self._positions: Optional[Dict[int, int]] = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def _load(self, index: int) -> Character:
+        character = self._items[index]
+        if character is None:
+            character, quest_ids = self._source.decode(self._source_index[index])
+            self._items[index] = character
+            self._on_load(character, quest_ids)
+        return character
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(i) for i in range(*index.indices(len(self._items)))]
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError("індекс персонажа поза межами")
+        return self._load(index)
+
+    def __setitem__(self, index, character):
+        self._items[index] = character
+        if self._positions is not None and self._source_index[index] is not None:
+            del self._positions[self._source_index[index]]
+        self._source_index[index] = None
+
+    def __delitem__(self, index):
+        del self._items[index]
+        del self._source_index[index]
+        self._positions = None
+
+    def insert(self, index, character):
+        self._items.insert(index, character)
+        self._source_index.insert(index, None)
+        self._positions = None
+
+    def copy(self) -> List[Character]:
+        return list(self)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def loaded(self) -> List[Character]:
+        return [character for character in self._items if character is not None]
+
+    def by_nickname(self, nickname: str) -> Optional[Character]:
+        source_index = self._source.find(nickname)
+        if source_index is None:
+            return None
+        if self._positions is None:
+            self._positions = {source: position for position, source in enumerate(self._source_index)
+                               if source is not None}
+        position = self._positions.get(source_index)
+        return None if position is None else self._load(position)
+
+    def source_path(self) -> str:
+        return self._source.filename
+
+    # Закрити файл-джерело; повертає відповідність позицій записам, щоб можна було приєднатися знову
+    def detach(self) -> List[Optional[int]]:
+        self._source.close()
+        return self._source_index
+
+    def attach(self, source: BinarySaveFile, source_index: List[Optional[int]]):
+        self._source = source
+        self._source_index = source_index
+        self._positions = None
+
+    def close(self):
+        self._source.close()
+
+    def raw(self, index: int):
+        if self._items[index] is None and self._source_index[index] is not None:
+            return self._source.record(self._source_index[index])
+        return None
+
+    def nickname(self, index: int) -> str:
+        if self._items[index] is not None:
+            return self._items[index].nickname
+        return self._source.nickname_at(self._source_index[index])
+
+# Розділи стану гри зі списками сутностей та поле, за яким їх індексують
+STATE_SECTIONS = {"characters": "nickname", "quests": "id", "guilds": "name", "factions": "name"}
+
+def _keyed_sections(state: Dict) -> Dict:
+    for section, key in STATE_SECTIONS.items():
+        state[section] = {data[key]: data for data in state[section]}
+    return state
+
+def _listed_sections(state: Dict) -> Dict:
+    for section in STATE_SECTIONS:
+        state[section] = list(state[section].values())
+    return state
+
+def _changed_sections(entities) -> Dict:
+    sections = {}
+    for entity in entities:
+        section = entity.STATE_SECTION
+        sections.setdefault(section, {})[getattr(entity, STATE_SECTIONS[section])] = entity.to_dict()
+    return sections
+
+# Журнал дій: після кожної дії дописується рядок JSON зі зміненими сутностями, поруч лежить повний знімок
+class GameJournal:
+    JOURNAL_FILE = "journal.jsonl"
+    SNAPSHOT_FILE = "snapshot.json"
+
+    def __init__(self, directory: str, snapshot_every: int = 100, fsync: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.seq = 0
+        self._since_snapshot = 0
+        self._file = None
+
+    def append(self, game, op: str, details: Dict):
+        self.seq += 1
+        entry = {"seq": self.seq, "op": op}
+        if details:
+            entry["details"] = details
+        entry.update(_changed_sections(game.changes.drain("journal")))
+        entry["world"] = game._world_state(include_static=False)
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot(game)
+
+    def snapshot(self, game):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"seq": self.seq, **game._game_state()}, f, ensure_ascii=False, separators=(",", ":"))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        # Записи до знімка більше не потрібні, тому журнал починається заново
+        self.close()
+        self._file = open(os.path.join(self.directory, self.JOURNAL_FILE), 'w', encoding='utf-8')
+        game.changes.drain("journal")
+        self._since_snapshot = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @classmethod
+    def read(cls, directory: str):
+        with open(os.path.join(directory, cls.SNAPSHOT_FILE), 'r', encoding='utf-8') as f:
+            state = _keyed_sections(json.load(f))
+        seq = state.pop("seq")
+        replayed = 0
+        journal_path = os.path.join(directory, cls.JOURNAL_FILE)
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Обірваний останній запис після збою пропускаємо
                         break
-        character.inventory.append(self.result)
-        print(f"{character.nickname} створив {self.result.name}!")
+                    if entry["seq"] <= seq:
+                        continue
+                    for section in STATE_SECTIONS:
+                        state[section].update(entry.get(section, {}))
+                    state.update(entry["world"])
+                    seq = entry["seq"]
+                    replayed += 1
+        return _listed_sections(state), seq, replayed
+
+# Таблиці луту для однієї складності: пороги якості та шаблони для кожного поєднання типу, стихії,
+# якості й набору обчислюються один раз; кидки йдуть у тому ж порядку, що й раніше у generate_loot
+class LootTable:
+    QUALITIES = [ItemQuality.COMMON, ItemQuality.RARE, ItemQuality.EPIC, ItemQuality.LEGENDARY]
+    ITEM_TYPES = list(ItemType)
+    DAMAGE_TYPES = [DamageType.PHYSICAL, DamageType.FIRE, DamageType.ICE, DamageType.POISON, DamageType.MAGICAL]
+    PREFIXES = {
+        DamageType.FIRE: "Вогняний",
+        DamageType.ICE: "Крижаний",
+        DamageType.POISON: "Отруйний",
+        DamageType.MAGICAL: "Магічний",
+        DamageType.PHYSICAL: ""
+    }
+    ENCHANT_NAMES = ["Чари вогню", "Чари льоду", "Чари отрути"]
+    ENCHANT_TYPES = [EffectType.BURN, EffectType.FREEZE, EffectType.POISON]
+
+    def __init__(self, difficulty: int, item_sets: List[ItemSet]):
+        self.difficulty = difficulty
+        self.item_sets = item_sets
+        # Якість — кількість порогів, строго менших за кидок
+        self.quality_thresholds = [0.5 - 0.05 * difficulty, 0.8 - 0.05 * difficulty, 0.95 - 0.05 * difficulty]
+        # Шаблони за індексами [тип][стихія][якість][набір + 1]
+        self.templates = [[[[ItemTemplate.get((self.PREFIXES[damage_type] + " " + item_type.value.lower()).strip(),
+                                              item_type, quality, item_set, damage_type)
+                             for item_set in [None] + item_sets]
+                            for quality in self.QUALITIES]
+                           for damage_type in self.DAMAGE_TYPES]
+                          for item_type in self.ITEM_TYPES]
+
+    def roll(self, rng) -> Item:
+        quality = bisect_left(self.quality_thresholds, rng.random())
+        item_type = rng.randrange(len(self.ITEM_TYPES))
+        power = rng.randint(5, 15) * self.difficulty
+        enchantment = None
+        if rng.random() > 0.7:
+            enchantment = Enchantment(rng.choice(self.ENCHANT_NAMES), rng.choice(self.ENCHANT_TYPES), rng.uniform(0.1, 0.3))
+        item_set = 0
+        if rng.random() > 0.9:
+            item_set = rng.randrange(len(self.item_sets)) + 1
+        damage_type = rng.randrange(len(self.DAMAGE_TYPES))
+        return Item.from_template(self.templates[item_type][damage_type][quality][item_set], power, power * 10, enchantment)
+
+    # Усі кидки пакета одразу масивами NumPy; без NumPy — послідовні кидки roll()
+    def generate_batch(self, n: int, rng=None) -> List[Item]:
+        if np is None:
+            if not isinstance(rng, random.Random):
+                rng = random.Random(rng)
+            return [self.roll(rng) for _ in range(n)]
+        if not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(rng)
+        qualities = np.searchsorted(self.quality_thresholds, rng.random(n), side="left").tolist()
+        item_types = rng.integers(len(self.ITEM_TYPES), size=n).tolist()
+        powers = (rng.integers(5, 16, size=n) * self.difficulty).tolist()
+        enchanted = (rng.random(n) > 0.7).tolist()
+        enchant_names = rng.integers(len(self.ENCHANT_NAMES), size=n).tolist()
+        enchant_types = rng.integers(len(self.ENCHANT_TYPES), size=n).tolist()
+        enchant_powers = rng.uniform(0.1, 0.3, size=n).tolist()
+        item_sets = np.where(rng.random(n) > 0.9, rng.integers(len(self.item_sets), size=n) + 1, 0).tolist()
+        damage_types = rng.integers(len(self.DAMAGE_TYPES), size=n).tolist()
+        templates = self.templates
+        names, types = self.ENCHANT_NAMES, self.ENCHANT_TYPES
+        from_template = Item.from_template
+        return [from_template(templates[item_types[i]][damage_types[i]][qualities[i]][item_sets[i]], powers[i], powers[i] * 10,
+                              Enchantment(names[enchant_names[i]], types[enchant_types[i]], enchant_powers[i]) if enchanted[i] else None)
+                for i in range(n)]
+
+class LootGenerator:
+    def __init__(self, item_sets: List[ItemSet]):
+        self.item_sets = item_sets
+        self._tables: Dict[int, LootTable] = {}
+
+    def table(self, difficulty: int) -> LootTable:
+        table = self._tables.get(difficulty)
+        if table is None:
+            table = self._tables[difficulty] = LootTable(difficulty, self.item_sets)
+        return table
+
+    def roll(self, difficulty: int, rng=random) -> Item:
+        return self.table(difficulty).roll(rng)
+
+    def generate_batch(self, n: int, difficulty: int, rng=None) -> List[Item]:
+        return self.table(difficulty).generate_batch(n, rng)
+
+def _derive_seed(base_seed: int, *key) -> int:
+    digest = hashlib.sha256(":".join(str(part) for part in (base_seed,) + key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+RNG_STREAMS = ("loot", "combat", "ai", "events")
+
+# Незалежні потоки випадкових чисел для підсистем гри.
+# Без зерна всі потоки — глобальний модуль random, як і раніше;
+# із зерном кожен потік має власне зерно, виведене з (зерно, шлях, назва потоку)
+class RandomStreams:
+    def __init__(self, seed: Optional[int] = None, path: tuple = ()):
+        self.seed = seed
+        self.path = path
+        for name in RNG_STREAMS:
+            setattr(self, name, random if seed is None else random.Random(self.derive(name)))
+
+    def derive(self, *key) -> int:
+        return _derive_seed(self.seed, *self.path, *key)
+
+    def spawn(self, index) -> 'RandomStreams':
+        # Потоки для паралельного працівника: інший шлях дає інші зерна, тож послідовності не перетинаються
+        if self.seed is None:
+            return RandomStreams(random.getrandbits(64))
+        return RandomStreams(self.seed, self.path + (index,))
+
+    def stream(self, name: str):
+        return getattr(self, name)
+
+# Команди сценаріїв (--script і пункт меню «Виконати кілька команд»).
+# Персонажів, локації, гільдії, фракції, рецепти і квести можна вказувати номером (з 1) або назвою;
+# назви з пробілами беруться в лапки
+SCRIPT_COMMANDS = [
+    "create <ім'я> <клас>",
+    "status <персонаж>",
+    "shop <персонаж> <номер товару 1-3, 0 — нічого не купувати>",
+    "teams <персонаж,персонаж> <персонаж,...> [...]",
+    "battle [auto]",
+    "trade <персонаж1> <предмет1> <персонаж2> <предмет2>",
+    "difficulty <1-10>",
+    "location <локація>",
+    "guild create <назва> | guild join <гільдія> <персонаж> | guild leave <гільдія> <персонаж>",
+    "reputation <персонаж>",
+    "faction ally <фракція> <фракція> | faction war <фракція> <фракція>",
+    "war <гільдія1> <гільдія2> <золото> <досвід> <репутація>",
+    "event",
+    "craft <персонаж> <рецепт> [кількість]",
+    "quest <персонаж> <квест>",
+    "simulate <кількість битв>",
+    "save [файл] [формат] | load [файл] [формат]",
+    "exit"
+]
+
+# Автоматична битва у сценарії обмежена, щоб рівні команди не крутилися нескінченно
+SCRIPT_BATTLE_ROUNDS = 100
+
+# Команди, які без аргументів відкривають інтерактивне меню
+INTERACTIVE_COMMANDS = {
+    "create": "create_character",
+    "teams": "team_selection",
+    "trade": "trade",
+    "difficulty": "set_difficulty",
+    "location": "set_location",
+    "guild": "manage_guilds",
+    "reputation": "show_reputation",
+    "faction": "manage_factions",
+    "war": "start_guild_war",
+    "craft": "craft_item",
+    "quest": "manage_quests"
+}
+
+def _script_summary(timings: List[Dict]) -> List[Dict]:
+    summary: Dict[str, Dict] = {}
+    for row in timings:
+        entry = summary.setdefault(row["command"].split()[0].lower(),
+                                   {"command": row["command"].split()[0].lower(), "count": 0, "errors": 0,
+                                    "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["errors"] += row["status"] == "error"
+        entry["total_ms"] += row["ms"]
+        entry["max_ms"] = max(entry["max_ms"], row["ms"])
+    for entry in summary.values():
+        entry["total_ms"] = round(entry["total_ms"], 3)
+        entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 3)
+    return sorted(summary.values(), key=lambda entry: -entry["total_ms"])
 
 # Основний клас гри
 class Game:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, sink=None):
+        self.rng = RandomStreams(seed)
+        self.event_sink = CONSOLE_SINK if sink is None else sink
+        self.battle_timer: Optional[PhaseTimer] = None
+        self.metrics = NULL_METRICS
+        self.profile_dir: Optional[str] = None
+        self._profile_seq = 0
         self.characters: List[Character] = []
         self.teams: Dict[str, List[Character]] = {}
         self.quests: List[Quest] = []
@@ -629,19 +2747,19 @@ class Game:
         self.elemental_effects: List[ElementalEffect] = []
         self.dynamic_events: List[DynamicEvent] = []
         self.crafting_recipes: List[CraftingRecipe] = []
-        self.warrior_set = type("ItemSet", (), {"name": "Набір воїна"})()
-        self.mage_set = type("ItemSet", (), {"name": "Набір мага"})()
+        self.skill_registry = SkillRegistry(SKILL_DEFINITIONS)
+        self._crafting_planner = None
+        self._combo_index: Optional[ElementalComboIndex] = None
+        self._event_scheduler: Optional[DynamicEventScheduler] = None
+        self.quest_bus = QuestEventBus()
+        self.registry = GameRegistry()
+        # Канал "segments" існує, лише поки гра синхронізована з каталогом сегментів, "journal" — поки ввімкнено журнал
+        self.changes = ChangeTracker()
+        self._segments: Optional[Dict] = None
+        self._journal: Optional[GameJournal] = None
         self.events = [
-            type("Event", (), {
-                "name": "Зустріч із мудрецем",
-                "description": "Мудрець ділиться знаннями, підвищуючи досвід.",
-                "effect": lambda g: [c.add_exp(50) for c in g.characters]
-            })(),
-            type("Event", (), {
-                "name": "Грабіжники",
-                "description": "Банда грабіжників атакує, зменшуючи золото.",
-                "effect": lambda g: [setattr(c, 'gold', max(0, c.gold - 20)) for c in g.characters]
-            })()
+            DynamicEvent("Зустріч із мудрецем", "Мудрець ділиться знаннями, підвищуючи досвід.", {}, {"exp": 50}),
+            DynamicEvent("Грабіжники", "Банда грабіжників атакує, зменшуючи золото.", {}, {"gold": -20})
         ]
         # Ініціалізація всіх компонентів гри
         self._init_quests()
@@ -652,6 +2770,50 @@ class Game:
         self._init_elemental_effects()
         self._init_dynamic_events()
         self._init_crafting_recipes()
+        self.registry.rebuild(self.characters, self.quests, self.guilds)
+        self._track_entities()
+
+    # Списки комбінацій і динамічних подій завжди VersionedList: індекс комбінацій і планувальник подій
+    # перебудовуються після будь-якої зміни свого списку
+    @property
+    def elemental_effects(self) -> List[ElementalEffect]:
+        return self._elemental_effects
+
+    @elemental_effects.setter
+    def elemental_effects(self, combos: List[ElementalEffect]):
+        self._elemental_effects = VersionedList(combos)
+
+    @property
+    def dynamic_events(self) -> List[DynamicEvent]:
+        return self._dynamic_events
+
+    @dynamic_events.setter
+    def dynamic_events(self, events: List[DynamicEvent]):
+        self._dynamic_events = VersionedList(events)
+
+    def enable_metrics(self, snapshot_file: Optional[str] = None, interval: float = 10.0) -> MetricsRegistry:
+        self.metrics = MetricsRegistry(GAME_METRICS, snapshot_file, interval)
+        return self.metrics
+
+    # Інструментування: таймери фаз битви і/або дамп cProfile для кожної дії меню чи команди сценарію
+    def enable_profiling(self, battle_timers: bool = True, profile_dir: Optional[str] = None):
+        self.battle_timer = PhaseTimer() if battle_timers else None
+        self.profile_dir = profile_dir
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def profiled(self, label: str, func, *args):
+        if self.profile_dir is None:
+            return func(*args)
+        self._profile_seq += 1
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            profiler.dump_stats(os.path.join(self.profile_dir, f"{self._profile_seq:05d}_{label}.prof"))
+
+    def report(self, kind: str, template: str, **fields):
+        _report(self.event_sink, kind, template, **fields)
 
     def _init_quests(self):
         self.quests.append(Quest(
@@ -691,7 +2853,15 @@ class Game:
         ))
 
     def _init_item_sets(self):
-        pass  # Можна додати логіку для наборів предметів
+        self.warrior_set = ItemSet.get("Набір воїна", {
+            2: {"defense": 0.1},
+            3: {"attack_power": 0.1, "defense": 0.1}
+        })
+        self.mage_set = ItemSet.get("Набір мага", {
+            2: {"mana_cost_multiplier": -0.1},
+            3: {"attack_power": 0.15}
+        })
+        self.loot = LootGenerator([self.warrior_set, self.mage_set])
 
     def _init_locations(self):
         self.locations = [
@@ -723,29 +2893,7 @@ class Game:
         ]
 
     def _init_dynamic_events(self):
-        self.dynamic_events = [
-            DynamicEvent(
-                "Напад дракона",
-                "Дракон атакує вашу команду!",
-                lambda game: game.day >= 5,
-                lambda game: [c.apply_effect(Effect(EffectType.BURN, 3, 10)) for c in game.characters],
-                "Гори"
-            ),
-            DynamicEvent(
-                "Свято врожаю",
-                "Ви берете участь у святі, отримуючи бонуси!",
-                lambda game: game.day % 7 == 0,
-                lambda game: [c.add_exp(100) or setattr(c, 'gold', c.gold + 200) for c in game.characters],
-                "Ліс"
-            ),
-            DynamicEvent(
-                "Магічний шторм",
-                "Гроза викликає магічні перешкоди!",
-                lambda game: game.weather_system.current_weather == WeatherType.STORM,
-                lambda game: [c.apply_effect(Effect(EffectType.STUN, 1, 0)) for c in game.characters if c.char_class == CharacterClass.MAGE],
-                "Пустеля"
-            )
-        ]
+        self.dynamic_events = [DynamicEvent.from_dict(event) for event in DEFAULT_DYNAMIC_EVENTS]
 
     def _init_crafting_recipes(self):
         self.crafting_recipes = [
@@ -761,25 +2909,114 @@ class Game:
             )
         ]
 
-    def save_game(self, filename="game_save.json"):
+    def _loaded_characters(self) -> List[Character]:
+        if isinstance(self.characters, LazyCharacterList):
+            return self.characters.loaded()
+        return list(self.characters)
+
+    def _track_entities(self):
+        for entity in self._loaded_characters() + self.quests + self.guilds + self.factions:
+            entity.attach_tracker(self.changes)
+
+    def _subscribe_quests(self):
+        self.quest_bus = QuestEventBus()
+        for character in self._loaded_characters():
+            for quest in character.active_quests:
+                self.quest_bus.subscribe(character, quest)
+
+    def accept_quest(self, character: Character, quest: Quest) -> bool:
+        if quest in character.active_quests or quest.is_completed():
+            return False
+        character.active_quests.append(quest)
+        character.mark_dirty()
+        self.quest_bus.subscribe(character, quest)
+        return True
+
+    def quest_event(self, character: Character, objective: str, amount: int = 1):
+        for quest in self.quest_bus.emit(character, objective, amount, self.event_sink):
+            self._complete_quest(character, quest)
+
+    def broadcast_quest_event(self, objective: str, amount: int = 1):
+        for character in self.quest_bus.subscribers(objective):
+            self.quest_event(character, objective, amount)
+
+    # Прогрес квесту спільний для всіх, хто його взяв; нагороду отримує той, хто завершив
+    def _complete_quest(self, character: Character, quest: Quest):
+        for holder in self.quest_bus.holders(quest):
+            self.quest_bus.unsubscribe(holder, quest)
+            if quest in holder.active_quests:
+                holder.active_quests.remove(quest)
+                holder.mark_dirty()
+        character.gold += quest.rewards.get("gold", 0)
+        self.metrics.inc("rpg_gold_minted_total", quest.rewards.get("gold", 0), "quest")
+        character.add_exp(quest.rewards.get("exp", 0), self.event_sink)
+        reward = f"{quest.rewards.get('gold', 0)} золота і {quest.rewards.get('exp', 0)} досвіду"
+        if quest.rewards.get("item") is not None:
+            item = Item.from_dict(quest.rewards["item"].to_dict())
+            character.inventory.append(item)
+            reward += f", {item.name}"
+        self.report("quest_complete", "Квест '{quest}' виконано! {actor} отримує {reward}!",
+                    quest=quest.title, actor=character.nickname, reward=reward)
+
+    def _on_character_loaded(self, character: Character, quest_ids: List[str]):
+        character.active_quests = [self.registry.quests[qid] for qid in quest_ids]
+        for quest in character.active_quests:
+            self.quest_bus.subscribe(character, quest)
+        self.registry.characters.setdefault(character.nickname, character)
+        character.attach_tracker(self.changes, mark=False)
+
+    def _world_state(self, include_static: bool = True) -> Dict:
+        state = {
+            "teams": {k: [char.nickname for char in team] for k, team in self.teams.items()},
+            "weather_system": self.weather_system.to_dict(),
+            "current_round": self.current_round,
+            "day": self.day,
+            "difficulty": self.difficulty,
+            "current_location": self.current_location.to_dict() if self.current_location else None,
+            "guild_wars": [war.to_dict() for war in self.guild_wars]
+        }
+        if include_static:
+            state["elemental_effects"] = [effect.to_dict() for effect in self.elemental_effects]
+            state["dynamic_events"] = [event.to_dict() for event in self.dynamic_events]
+            state["crafting_recipes"] = [recipe.to_dict() for recipe in self.crafting_recipes]
+            state["locations"] = [loc.to_dict() for loc in getattr(self, 'locations', [])]
+        return state
+
+    def _game_state(self) -> Dict:
+        game_state = {
+            "characters": [char.to_dict() for char in self.characters],
+            "quests": [quest.to_dict() for quest in self.quests],
+            "guilds": [guild.to_dict() for guild in self.guilds],
+            "factions": [faction.to_dict() for faction in self.factions]
+        }
+        game_state.update(self._world_state())
+        return game_state
+
+    # size — байти, реально записані чи прочитані цією операцією (для сегментів — лише їхні файли)
+    def _observe_io(self, operation: str, save_format: str, size: int, started: float):
+        if self.metrics.enabled:
+            self.metrics.observe(f"rpg_{operation}_seconds", time.perf_counter() - started, save_format)
+            self.metrics.inc(f"rpg_{operation}_bytes_total", size, save_format)
+
+    def save_game(self, filename="game_save.json", save_format="json"):
+        started = time.perf_counter()
         try:
-            game_state = {
-                "characters": [char.to_dict() for char in self.characters],
-                "teams": {k: [char.nickname for char in team] for k, team in self.teams.items()},
-                "quests": [quest.to_dict() for quest in self.quests],
-                "weather_system": self.weather_system.to_dict(),
-                "current_round": self.current_round,
-                "day": self.day,
-                "difficulty": self.difficulty,
-                "current_location": self.current_location.to_dict() if self.current_location else None,
-                "guilds": [guild.to_dict() for guild in self.guilds],
-                "factions": [faction.to_dict() for faction in self.factions],
-                "guild_wars": [war.to_dict() for war in self.guild_wars],
-                "elemental_effects": [effect.to_dict() for effect in self.elemental_effects],
-                "dynamic_events": [event.to_dict() for event in self.dynamic_events],
-                "crafting_recipes": [recipe.to_dict() for recipe in self.crafting_recipes],
-                "locations": [loc.to_dict() for loc in getattr(self, 'locations', [])]
-            }
+            if save_format == "segments":
+                written, size = self._save_segments(filename)
+                self._observe_io("save", save_format, size, started)
+                self.report("save", "Гру збережено у каталог {filename} ({written})!", filename=filename, written=written)
+                return True
+            if save_format == "binary":
+                world = self._world_state()
+                world["quests"] = [quest.to_dict() for quest in self.quests]
+                world["guilds"] = [guild.to_dict() for guild in self.guilds]
+                world["factions"] = [faction.to_dict() for faction in self.factions]
+                BinarySaveFile.write(filename, self.characters, world)
+                self._observe_io("save", save_format, os.path.getsize(filename), started)
+                self.report("save", "Гру збережено у файл {filename}!", filename=filename)
+                return True
+
+            game_state = self._game_state()
 
             def default_serializer(obj):
                 if isinstance(obj, Enum):
@@ -793,61 +3030,190 @@ class Game:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(game_state, f, ensure_ascii=False, indent=2, default=default_serializer)
 
-            print(f"Гру збережено у файл {filename}!")
+            self._observe_io("save", save_format, os.path.getsize(filename), started)
+            self.report("save", "Гру збережено у файл {filename}!", filename=filename)
             return True
         except Exception as e:
-            print(f"Помилка при збереженні гри: {e}")
+            self.report("save_error", "Помилка при збереженні гри: {error}", error=str(e))
             return False
 
-    def load_game(self, filename="game_save.json"):
+    def load_game(self, filename="game_save.json", save_format="json"):
+        started = time.perf_counter()
+        source = characters = None
         try:
             if not os.path.exists(filename):
-                print(f"Файл збереження {filename} не знайдено!")
+                self.report("load_missing", "Файл збереження {filename} не знайдено!", filename=filename)
                 return False
 
-            with open(filename, 'r', encoding='utf-8') as f:
-                game_state = json.load(f)
-
-            self.characters = [Character.from_dict(char) for char in game_state["characters"]]
-            self.teams = {
-                k: [next(c for c in self.characters if c.nickname == nick) for nick in team]
-                for k, team in game_state["teams"].items()
-            }
-            self.quests = [Quest.from_dict(quest) for quest in game_state["quests"]]
-
-            for char in self.characters:
-                char.active_quests = [next(q for q in self.quests if q.id == qid) for qid in char.to_dict()["active_quests"]]
-
-            self.weather_system.from_dict(game_state["weather_system"])
-            self.current_round = game_state["current_round"]
-            self.day = game_state["day"]
-            self.difficulty = game_state["difficulty"]
-
-            if game_state["current_location"]:
-                self.current_location = next(
-                    (loc for loc in self.locations if loc.name == game_state["current_location"]["name"]),
-                    None
-                )
-
-            self.guilds = [Guild.from_dict(guild) for guild in game_state["guilds"]]
-            for guild, guild_data in zip(self.guilds, game_state["guilds"]):
-                guild.members = [next(c for c in self.characters if c.nickname == nick) for nick in guild_data["members"]]
+            if save_format == "segments":
+                game_state, last_seq, deltas, size = self._read_segments(filename)
+            elif save_format == "binary":
+                size = os.path.getsize(filename)
+                source = BinarySaveFile(filename)
+                game_state = source.world()
+                characters = LazyCharacterList(source, self._on_character_loaded)
+            else:
+                size = os.path.getsize(filename)
+                with open(filename, 'r', encoding='utf-8') as f:
+                    game_state = json.load(f)
+
+            self._restore_state(game_state, characters)
+            if save_format == "segments":
+                self.changes.drain("segments")
+                self._segments = {"directory": os.path.abspath(filename), "seq": last_seq,
+                                  "deltas": deltas, "static": self._static_fingerprint()}
+            else:
+                self.changes.close("segments")
+                self._segments = None
+            if self._journal is not None:
+                self._journal.snapshot(self)
 
-            self.factions = [Faction.from_dict(faction) for faction in game_state["factions"]]
-            self.guild_wars = [GuildWar.from_dict(war, self.guilds) for war in game_state["guild_wars"]]
-            self.elemental_effects = [ElementalEffect.from_dict(effect) for effect in game_state["elemental_effects"]]
-            self.dynamic_events = [DynamicEvent.from_dict(event) for event in game_state["dynamic_events"]]
-            self.crafting_recipes = [CraftingRecipe.from_dict(recipe) for recipe in game_state["crafting_recipes"]]
+            self._observe_io("load", save_format, size, started)
+            self.report("load", "Гру завантажено з файлу {filename}!", filename=filename)
+            return True
+        except Exception as e:
+            if source is not None and self.characters is not characters:
+                source.close()
+            self.report("load_error", "Помилка при завантаженні гри: {error}", error=str(e))
+            return False
 
-            if "locations" in game_state:
-                self.locations = [Location.from_dict(loc) for loc in game_state["locations"]]
+    def _restore_state(self, game_state: Dict, characters: Optional[LazyCharacterList] = None):
+        for entity in self._loaded_characters() + self.quests + self.guilds + self.factions:
+            entity.attach_tracker(None)
+        if isinstance(self.characters, LazyCharacterList) and self.characters is not characters:
+            self.characters.close()
+        self.quests = [Quest.from_dict(quest) for quest in game_state["quests"]]
+        if characters is None:
+            self.characters = [Character.from_dict(char) for char in game_state["characters"]]
+            self.registry.rebuild(self.characters, self.quests, [])
+            for char, char_data in zip(self.characters, game_state["characters"]):
+                char.active_quests = [self.registry.quests[qid] for qid in char_data.get("active_quests", [])]
+        else:
+            self.characters = characters
+            self.registry.rebuild([], self.quests, [])
+            self.registry.lazy_characters = characters
+        by_nickname = self.registry.character
+        self.teams = {k: [by_nickname(nick) for nick in team] for k, team in game_state["teams"].items()}
+
+        self.weather_system.from_dict(game_state["weather_system"])
+        self.current_round = game_state["current_round"]
+        self.day = game_state["day"]
+        self.difficulty = game_state["difficulty"]
+
+        if "locations" in game_state:
+            self.locations = [Location.from_dict(loc) for loc in game_state["locations"]]
+        if game_state["current_location"]:
+            self.current_location = next(
+                (loc for loc in self.locations if loc.name == game_state["current_location"]["name"]),
+                None
+            )
 
-            print(f"Гру завантажено з файлу {filename}!")
+        self.guilds = [Guild.from_dict(guild) for guild in game_state["guilds"]]
+        for guild, guild_data in zip(self.guilds, game_state["guilds"]):
+            guild.members = [by_nickname(nick) for nick in guild_data["members"]]
+            guild.reputation = guild_data.get("reputation", 0)
+            guild.registry = self.registry
+            for member in guild.members:
+                self.registry.join(guild, member)
+
+        self.factions = [Faction.from_dict(faction) for faction in game_state["factions"]]
+        self.guild_wars = [GuildWar.from_dict(war, self.guilds) for war in game_state["guild_wars"]]
+        self.elemental_effects = [ElementalEffect.from_dict(effect) for effect in game_state["elemental_effects"]]
+        self.dynamic_events = [DynamicEvent.from_dict(event) for event in game_state["dynamic_events"]]
+        self.crafting_recipes = [CraftingRecipe.from_dict(recipe) for recipe in game_state["crafting_recipes"]]
+        self._subscribe_quests()
+        self._track_entities()
+
+    def enable_journal(self, directory: str, snapshot_every: int = 100, fsync: bool = False, seq: int = 0):
+        if self._journal is not None:
+            self._journal.close()
+        self.changes.channel("journal")
+        self._journal = GameJournal(directory, snapshot_every, fsync)
+        self._journal.seq = seq
+        self._journal.snapshot(self)
+
+    def journal(self, op: str, **details):
+        if self._journal is not None:
+            self._journal.append(self, op, details)
+
+    def recover(self, directory: str, snapshot_every: int = 100, fsync: bool = False) -> bool:
+        try:
+            game_state, seq, replayed = GameJournal.read(directory)
+            self._restore_state(game_state)
+            self.changes.close("segments")
+            self._segments = None
+            self.enable_journal(directory, snapshot_every, fsync, seq)
+            self.report("recover", "Гру відновлено з каталогу {directory} (відтворено записів журналу: {replayed})!",
+                        directory=directory, replayed=replayed)
             return True
         except Exception as e:
-            print(f"Помилка при завантаженні гри: {e}")
+            self.report("recover_error", "Помилка при відновленні гри: {error}", error=str(e))
             return False
 
+    # Інкрементальне збереження: у каталог дописуються сегменти лише зі зміненими сутностями
+    SEGMENT_COMPACT_EVERY = 32
+
+    def _static_fingerprint(self):
+        return tuple((id(items), len(items)) for items in
+                     (self.elemental_effects, self.dynamic_events, self.crafting_recipes, getattr(self, 'locations', [])))
+
+    def _save_segments(self, directory: str, compact: bool = False):
+        directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+        synced = self._segments if self._segments and self._segments["directory"] == directory else None
+        if synced is not None and not glob.glob(os.path.join(directory, "segment-*.json")):
+            synced = None
+        full = compact or synced is None or synced["deltas"] + 1 >= self.SEGMENT_COMPACT_EVERY
+        seq = synced["seq"] + 1 if synced else self._last_segment_seq(directory) + 1
+        changed = self.changes.drain("segments")
+        fingerprint = self._static_fingerprint()
+
+        if full:
+            segment = {"seq": seq, "full": True, **_keyed_sections(self._game_state())}
+        else:
+            segment = {"seq": seq, "full": False, **{section: {} for section in STATE_SECTIONS}}
+            segment.update(_changed_sections(changed))
+            segment.update(self._world_state(include_static=fingerprint != synced["static"]))
+
+        path = os.path.join(directory, f"segment-{seq:08d}.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(segment, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+        if full:
+            for old in glob.glob(os.path.join(directory, "segment-*.json")):
+                if old != path:
+                    os.remove(old)
+        self._segments = {"directory": directory, "seq": seq, "deltas": 0 if full else synced["deltas"] + 1,
+                          "static": fingerprint}
+        return "повний знімок" if full else f"змінено сутностей: {len(changed)}", os.path.getsize(path)
+
+    @staticmethod
+    def _last_segment_seq(directory: str) -> int:
+        names = sorted(glob.glob(os.path.join(directory, "segment-*.json")))
+        return int(os.path.basename(names[-1])[8:16]) if names else 0
+
+    @staticmethod
+    def _read_segments(directory: str):
+        names = sorted(glob.glob(os.path.join(directory, "segment-*.json")))
+        segments = []
+        size = 0
+        for name in names:
+            size += os.path.getsize(name)
+            with open(name, 'r', encoding='utf-8') as f:
+                segments.append(json.load(f))
+        base = max((i for i, segment in enumerate(segments) if segment["full"]), default=None)
+        if base is None:
+            raise ValueError(f"У каталозі {directory} немає повного знімка")
+        state = segments[base]
+        deltas = 0
+        for segment in segments[base + 1:]:
+            for section in STATE_SECTIONS:
+                state[section].update(segment.pop(section))
+            state.update({k: v for k, v in segment.items() if k not in ("seq", "full")})
+            deltas += 1
+        return _listed_sections(state), segments[-1]["seq"], deltas, size
+
     def create_character(self):
         try:
             nickname = input("Введіть ім'я персонажа: ")
@@ -861,50 +3227,89 @@ class Game:
             if class_choice not in range(len(CharacterClass)):
                 print("Некоректний вибір!")
                 return
-            char_class = list(CharacterClass)[class_choice]
-            character = Character(nickname, char_class)
-            self.characters.append(character)
-            print(f"Персонаж {nickname} ({char_class.value}) створений!")
+            self.new_character(nickname, list(CharacterClass)[class_choice])
         except (ValueError, EOFError):
             print("Помилка введення. Створення персонажа скасовано.")
 
-    def show_character_status(self, character: Character):
-        print(f"\nСтатус персонажа {character.nickname}:")
-        print(f"Клас: {character.char_class.value}")
-        print(f"Рівень: {character.level}")
-        print(f"HP: {character.hp}/{character.max_hp}")
-        print(f"Мана: {character.mana}/{character.max_mana}")
-        print(f"Досвід: {character.exp}/{character.level * 100}")
-        print(f"Золото: {character.gold}")
-        print(f"Сила атаки: {character.attack_power}")
-        print(f"Захист: {character.defense}")
-        print("Екіпіровані предмети:")
+    def new_character(self, nickname: str, char_class: CharacterClass) -> bool:
+        if not self.add_character(Character(nickname, char_class)):
+            self.report("character_exists", "Персонаж з ім'ям {actor} уже існує!", actor=nickname)
+            return False
+        self.report("character_create", "Персонаж {actor} ({char_class}) створений!", actor=nickname,
+                    char_class=char_class.value)
+        self.journal("character_create", character=nickname)
+        return True
+
+    def add_character(self, character: Character) -> bool:
+        if not self.registry.add_character(character):
+            return False
+        self.characters.append(character)
+        character.attach_tracker(self.changes)
+        for quest in character.active_quests:
+            self.quest_bus.subscribe(character, quest)
+        return True
+
+    def add_guild(self, guild: Guild):
+        guild.registry = self.registry
+        for member in guild.members:
+            self.registry.join(guild, member)
+        self.guilds.append(guild)
+        guild.attach_tracker(self.changes)
+
+    def show_character_status(self, character: Character, out=None):
+        print(f"\nСтатус персонажа {character.nickname}:", file=out)
+        print(f"Клас: {character.char_class.value}", file=out)
+        print(f"Рівень: {character.level}", file=out)
+        print(f"HP: {character.hp}/{character.max_hp}", file=out)
+        print(f"Мана: {character.mana}/{character.max_mana}", file=out)
+        print(f"Досвід: {character.exp}/{character.level * 100}", file=out)
+        print(f"Золото: {character.gold}", file=out)
+        print(f"Сила атаки: {character.attack_power}", file=out)
+        print(f"Захист: {character.defense}", file=out)
+        print("Екіпіровані предмети:", file=out)
         for item_type, item in character.equipped_items.items():
-            print(f"  {item_type.value}: {item}")
-        print("Інвентар:")
+            print(f"  {item_type.value}: {item}", file=out)
+        print("Інвентар:", file=out)
         for item in character.inventory:
-            print(f"  {item}")
-        print("Активні ефекти:")
+            print(f"  {item}", file=out)
+        print("Активні ефекти:", file=out)
         for effect in character.active_effects:
-            print(f"  {effect.effect_type.value} (Тривалість: {effect.duration}, Сила: {effect.power})")
-        print("Навички:")
+            print(f"  {effect.effect_type.value} (Тривалість: {effect.duration}, Сила: {effect.power})", file=out)
+        print("Навички:", file=out)
         for skill in character.skills:
-            print(f"  {skill} (Рівень {character.skill_levels[skill]})")
-        print("Репутація:")
+            print(f"  {skill} (Рівень {character.skill_levels[skill]})", file=out)
+        print("Репутація:", file=out)
         for faction, value in character.reputation.items():
-            print(f"  {faction}: {value}")
+            print(f"  {faction}: {value}", file=out)
 
-    def shop(self, character: Character):
-        print("\n🏪 Магазин:")
+    def shop_offer(self, character: Character):
         discount = 0.1 if character.reputation["Торговці"] >= 50 else 0.0
         for faction in self.factions:
             if faction.name == "Торговці" and faction.relations.get("Лицарі", 0.5) >= 0.8:
                 discount += faction.bonuses.get("discount", 0.0)
-        print(f"Ваше золото: {character.gold} (Знижка: {discount * 100:.0f}%)")
         items = [self.generate_loot(self.difficulty) for _ in range(3)]
+        return items, [int(item.value * (1 - discount)) for item in items], discount
+
+    def buy_item(self, character: Character, item: Item, price: int) -> bool:
+        if character.gold < price:
+            self.report("shop_no_gold", "Недостатньо золота!")
+            return False
+        character.gold -= price
+        self.metrics.inc("rpg_gold_spent_total", price)
+        character.inventory.append(item)
+        self.report("shop_buy", "{actor} купив {item} за {price} золота!", actor=character.nickname, item=item.name,
+                    price=price)
+        if item.quality in [ItemQuality.RARE, ItemQuality.EPIC, ItemQuality.LEGENDARY]:
+            self.quest_event(character, "rare_items")
+        self.journal("shop", character=character.nickname, item=item.name, price=price)
+        return True
+
+    def shop(self, character: Character):
+        print("\n🏪 Магазин:")
+        items, prices, discount = self.shop_offer(character)
+        print(f"Ваше золото: {character.gold} (Знижка: {discount * 100:.0f}%)")
         print("Доступні товари:")
-        for i, item in enumerate(items, 1):
-            price = int(item.value * (1 - discount))
+        for i, (item, price) in enumerate(zip(items, prices), 1):
             print(f"{i}. {item} (Ціна: {price})")
         try:
             choice = int(input("Виберіть предмет для покупки (0 для скасування): ")) - 1
@@ -913,72 +3318,23 @@ class Game:
             if not (0 <= choice < len(items)):
                 print("Некоректний вибір!")
                 return
-            item = items[choice]
-            price = int(item.value * (1 - discount))
-            if character.gold >= price:
-                character.gold -= price
-                character.inventory.append(item)
-                print(f"{character.nickname} купив {item.name} за {price} золота!")
-                if item.quality in [ItemQuality.RARE, ItemQuality.EPIC, ItemQuality.LEGENDARY]:
-                    for quest in character.active_quests:
-                        if "rare_items" in quest.objectives:
-                            quest.update_progress("rare_items")
-            else:
-                print("Недостатньо золота!")
+            self.buy_item(character, items[choice], prices[choice])
         except (ValueError, EOFError):
             print("Помилка введення. Покупка скасована.")
 
     def generate_loot(self, difficulty: int = 1) -> Item:
-        quality_roll = random.random()
-        if quality_roll > 0.95 - 0.05 * self.difficulty:
-            quality = ItemQuality.LEGENDARY
-        elif quality_roll > 0.8 - 0.05 * self.difficulty:
-            quality = ItemQuality.EPIC
-        elif quality_roll > 0.5 - 0.05 * self.difficulty:
-            quality = ItemQuality.RARE
-        else:
-            quality = ItemQuality.COMMON
-
-        item_type = random.choice(list(ItemType))
-        base_power = random.randint(5, 15) * self.difficulty
-        value = base_power * 10
-
-        enchantment = None
-        if random.random() > 0.7:
-            enchant_types = [EffectType.BURN, EffectType.FREEZE, EffectType.POISON]
-            enchantment = Enchantment(
-                name="Чари " + random.choice(["вогню", "льоду", "отрути"]),
-                effect_type=random.choice(enchant_types),
-                power=random.uniform(0.1, 0.3)
-            )
-
-        item_set = None
-        if random.random() > 0.9:
-            item_set = random.choice([self.warrior_set, self.mage_set])
-
-        damage_type = random.choice([DamageType.PHYSICAL, DamageType.FIRE, DamageType.ICE, DamageType.POISON, DamageType.MAGICAL])
-
-        prefixes = {
-            DamageType.FIRE: "Вогняний",
-            DamageType.ICE: "Крижаний",
-            DamageType.POISON: "Отруйний",
-            DamageType.MAGICAL: "Магічний",
-            DamageType.PHYSICAL: ""
-        }
-
-        name = prefixes.get(damage_type, "") + " " + item_type.value.lower()
-        name = name.strip()
-
-        return Item(
-            name=name,
-            item_type=item_type,
-            power=base_power,
-            value=value,
-            quality=quality,
-            item_set=item_set,
-            enchantment=enchantment,
-            damage_type=damage_type
-        )
+        item = self.loot.roll(difficulty, self.rng.loot)
+        self.metrics.inc("rpg_loot_drops_total", 1, item.quality.name)
+        return item
+
+    def generate_loot_batch(self, n: int, difficulty: Optional[int] = None, rng=None) -> List[Item]:
+        if rng is None:
+            rng = self.rng.loot.getrandbits(64)
+        items = self.loot.generate_batch(n, self.difficulty if difficulty is None else difficulty, rng)
+        if self.metrics.enabled:
+            for item in items:
+                self.metrics.inc("rpg_loot_drops_total", 1, item.quality.name)
+        return items
 
     def team_selection(self):
         self.teams = {}
@@ -1010,14 +3366,43 @@ class Game:
                     print("Некоректний вибір!")
             except (ValueError, EOFError):
                 print("Помилка введення. Продовжуємо формування.")
-
-    def apply_weather_effects(self):
+        self.journal("teams")
+
+    def set_teams(self, teams: List[List[Character]]):
+        seen = set()
+        for team in teams:
+            if not team:
+                raise ValueError("Команда не може бути порожньою")
+            for character in team:
+                if id(character) in seen:
+                    raise ValueError(f"{character.nickname} не може бути в кількох командах чи двічі в одній")
+                seen.add(id(character))
+        self.teams = {f"Команда {team_id}": list(team) for team_id, team in enumerate(teams, 1)}
+        self.journal("teams")
+
+    def apply_weather_effects(self, characters: Optional[List[Character]] = None, verbose: bool = True):
         effects = self.weather_system.weather_effects[self.weather_system.current_weather]
-        for character in self.characters:
+        for character in self.characters if characters is None else characters:
+            character.stats.remove("weather")
             for stat, value in effects.items():
-                current_value = getattr(character, stat, 0)
-                setattr(character, stat, current_value * (1 + value))
-            print(f"Погода впливає на {character.nickname}: {self.weather_system.current_weather.value}")
+                character.stats.add("weather", stat, mult=value)
+            if verbose:
+                self.report("weather", "Погода впливає на {actor}: {weather}",
+                            actor=character.nickname, weather=self.weather_system.current_weather.value)
+
+    def apply_battle_modifiers(self, characters: List[Character], undo: bool = False):
+        for character in characters:
+            for tag in ("location", "faction", "weather") if undo else ("location", "faction"):
+                character.stats.remove(tag)
+            if undo:
+                continue
+            for stat, value in self.current_location.battle_modifiers.items():
+                character.stats.add("location", stat, mult=value)
+            for faction in self.factions:
+                if character.reputation[faction.name] >= 50 and faction.relations.get("Лицарі", 0.5) >= 0.8:
+                    for stat, value in faction.bonuses.items():
+                        if stat != "discount":
+                            character.stats.add("faction", stat, mult=value)
 
     def player_turn(self, character: Character, enemies: List[Character]):
         print(f"\nХід гравця {character.nickname}")
@@ -1036,7 +3421,7 @@ class Game:
                         print(f"{i}. {enemy.nickname} ({enemy.hp:.1f} HP)")
                     target_choice = int(input("Виберіть ціль: ")) - 1
                     if 0 <= target_choice < len(enemies):
-                        return character.attack(enemies[target_choice])
+                        return ("attack", enemies[target_choice])
                     print("Некоректний номер!")
                 elif choice == 2:
                     if not character.skills:
@@ -1057,7 +3442,7 @@ class Game:
                             if 0 <= idx < len(enemies):
                                 targets.append(enemies[idx])
                         if targets:
-                            return character.use_skill(character.skills[skill_choice], targets, self)
+                            return ("skill", character.skills[skill_choice], targets)
                         print("Некоректні цілі!")
                     print("Некоректний номер!")
                 elif choice == 3:
@@ -1071,119 +3456,124 @@ class Game:
                     if 0 <= item_choice < len(character.inventory):
                         item = character.inventory[item_choice]
                         if item.item_type == ItemType.POTION:
-                            return character.use_item(item)
-                        else:
-                            character.equip_item(item)
-                            return False
+                            return ("item", item)
+                        return ("equip", item)
                     print("Некоректний номер!")
                 elif choice == 4:
                     self.show_character_status(character)
                 elif choice == 5:
-                    print(f"{character.nickname} пропускає хід.")
-                    return False
+                    return ("skip", f"{character.nickname} пропускає хід.")
                 else:
                     print("Некоректний вибір!")
             except (ValueError, EOFError):
                 print("Помилка введення. Пропуск ходу.")
-                return False
+                return ("skip", None)
 
     def enemy_turn(self, enemy: Character, targets: List[Character]):
-        if any(e.effect_type == EffectType.STUN for e in enemy.active_effects):
-            print(f"{enemy.nickname} оглушений і пропускає хід!")
-            return
-        if any(e.effect_type == EffectType.FREEZE for e in enemy.active_effects):
-            print(f"{enemy.nickname} заморожений і пропускає хід!")
-            return
-        if not targets:
-            return
-        target = random.choice(targets)
-        if random.random() < 0.5 and enemy.skills:
-            skill = random.choice(enemy.skills)
-            enemy.use_skill(skill, [target], self)
-        else:
-            enemy.attack(target)
-
-    def battle(self):
-        print(f"\n⚔️ Початок битви в локації {self.current_location.name}!")
-        self.weather_system.update_weather(self.current_location)
-        self.apply_weather_effects()
-
-        for character in self.characters:
-            for stat, value in self.current_location.battle_modifiers.items():
-                current_value = getattr(character, stat, 0)
-                setattr(character, stat, current_value * (1 + value))
-            for faction in self.factions:
-                if character.reputation[faction.name] >= 50 and faction.relations.get("Лицарі", 0.5) >= 0.8:
-                    for stat, value in faction.bonuses.items():
-                        if stat != "discount":
-                            current_value = getattr(character, stat, 0)
-                            setattr(character, stat, current_value * (1 + value))
-
-        self.current_round = 1
+        return random_policy(enemy, [], targets, self)
+
+    # Стратегії BattleEngine за замовчуванням: першою командою керує гравець, другою — enemy_turn
+    def player_policy(self, character: Character, allies: List[Character], enemies: List[Character], game: 'Game'):
+        return self.player_turn(character, enemies)
+
+    def enemy_policy(self, enemy: Character, allies: List[Character], enemies: List[Character], game: 'Game'):
+        return self.enemy_turn(enemy, enemies)
+
+    def battle(self, policy1=None, policy2=None, max_rounds: Optional[int] = None):
+        if policy1 is None:
+            policy1 = self.player_policy
+        if policy2 is None:
+            policy2 = self.enemy_policy
+        timer = self.battle_timer
+        if timer is not None:
+            timer.battles += 1
+            timer.mark()
         teams = list(self.teams.values())
         team1, team2 = teams[0], teams[1]
-        while team1 and team2:
-            print(f"\nРаунд {self.current_round}")
-            # Player turns
-            for character in team1[:]:
-                if not team2:
-                    break
-                if character.hp > 0:
-                    self.player_turn(character, team2)
-                    for c in team2[:]:
-                        if c.hp <= 0:
-                            team2.remove(c)
-                            print(f"{c.nickname} переможений!")
-                            for quest in character.active_quests:
-                                if "enemies_defeated" in quest.objectives:
-                                    quest.update_progress("enemies_defeated")
-            # Enemy turns
-            for enemy in team2[:]:
-                if not team1:
-                    break
-                if enemy.hp > 0:
-                    self.enemy_turn(enemy, team1)
-                    for c in team1[:]:
-                        if c.hp <= 0:
-                            team1.remove(c)
-                            print(f"{c.nickname} переможений!")
-            # Update effects and increment round
-            for character in team1 + team2:
-                character.update_effects()
-            self.current_round += 1
-            if not team1 or not team2:
-                break
-
-        winner = team1 if team1 else team2
-        print(f"\nБитва завершена! Переможець: {'Команда 1' if team1 else 'Команда 2'}")
+        initial_enemies = list(team2)
+        # Погода і модифікатори лише для учасників: решта ростера (і ліниві записи) не зачіпається
+        fighters = team1 + team2
+        self.report("battle_start", "\n⚔️ Початок битви в локації {location}!", location=self.current_location.name)
+        self.weather_system.update_weather(self.current_location)
+        self.apply_weather_effects(fighters)
+        self.apply_battle_modifiers(fighters)
+        if timer is not None:
+            timer.lap("modifiers")
+
+        engine = BattleEngine(
+            self, team1, team2,
+            policy1=policy1,
+            policy2=policy2,
+            max_rounds=max_rounds,
+            verbose=True
+        )
+        result = engine.run()
+        if timer is not None:
+            timer.mark()
+        team1[:], team2[:] = result.survivors
+        self.current_round = result.rounds + 1
+
+        for killer, victim in result.defeated:
+            if killer is not None and victim in initial_enemies:
+                self.quest_event(killer, "enemies_defeated")
+
+        if result.winner is None:
+            winner = []
+            self.report("battle_end", "\nБитва завершена нічиєю після {rounds} раундів!", rounds=result.rounds)
+        else:
+            winner = team1 if result.winner == 1 else team2
+            self.report("battle_end", "\nБитва завершена! Переможець: Команда {winner}", winner=result.winner)
         for char in winner:
             loot = self.generate_loot(self.difficulty)
             char.inventory.append(loot)
-            char.add_exp(50 * self.difficulty)
+            char.add_exp(50 * self.difficulty, self.event_sink)
             char.gold += 100 * self.difficulty
+            self.metrics.inc("rpg_gold_minted_total", 100 * self.difficulty, "battle")
             char.reputation["Лицарі"] += 5
-            print(f"{char.nickname} отримує {loot}, 50 досвіду і 100 золота!")
-            for guild in self.guilds:
-                if char in guild.members:
-                    guild.reputation += 10
-                    for quest in char.active_quests:
-                        if "guild_victory" in quest.objectives:
-                            quest.update_progress("guild_victory")
-
-        for character in self.characters:
-            for stat, value in self.current_location.battle_modifiers.items():
-                current_value = getattr(character, stat, 0)
-                setattr(character, stat, current_value / (1 + value))
-            for faction in self.factions:
-                if character.reputation[faction.name] >= 50 and faction.relations.get("Лицарі", 0.5) >= 0.8:
-                    for stat, value in faction.bonuses.items():
-                        if stat != "discount":
-                            current_value = getattr(character, stat, 0)
-                            setattr(character, stat, current_value / (1 + value))
+            char.mark_dirty()
+            self.report("battle_reward", "{actor} отримує {item}, 50 досвіду і 100 золота!", actor=char.nickname, item=loot)
+            for guild in self.registry.guilds_of(char):
+                guild.reputation += 10
+                self.quest_event(char, "guild_victory")
+
+        self.apply_battle_modifiers(fighters, undo=True)
+        if timer is not None:
+            timer.lap("rewards")
 
         self.day += 1
+        self.journal("battle", winner=result.winner, rounds=result.rounds)
         self.trigger_event()
 
+    def simulate_battle(self, team1: List[Character], team2: List[Character],
+                        policy1=random_policy, policy2=random_policy, max_rounds: int = 100) -> BattleResult:
+        return BattleEngine(self, team1, team2, policy1, policy2, max_rounds=max_rounds).run()
+
+    def simulate_battles(self, team1: List[Character], team2: List[Character], n: int,
+                         seed: Optional[int] = None, max_rounds: int = 100) -> BatchResult:
+        if seed is None:
+            seed = self.rng.combat.getrandbits(64)
+        return BatchBattleSimulator(self, team1, team2, max_rounds).run(n, seed)
+
+    # Зведення N симульованих битв; команди не змінюються. Без NumPy — послідовно на копіях команд
+    def simulate_summary(self, team1: List[Character], team2: List[Character], n: int,
+                         seed: Optional[int] = None, max_rounds: int = 100) -> Dict[str, float]:
+        if np is not None:
+            return self.simulate_battles(team1, team2, n, seed=seed, max_rounds=max_rounds).summary()
+        wins = losses = draws = rounds = 0
+        for _ in range(n):
+            result = self.simulate_battle(copy.deepcopy(team1), copy.deepcopy(team2), max_rounds=max_rounds)
+            wins += result.winner == 1
+            losses += result.winner == 2
+            draws += result.winner is None
+            rounds += result.rounds
+        return {
+            "samples": n,
+            "team1_win_rate": wins / n if n else 0.0,
+            "team2_win_rate": losses / n if n else 0.0,
+            "draw_rate": draws / n if n else 0.0,
+            "avg_rounds": rounds / n if n else 0.0
+        }
+
     def trade(self):
         if len(self.characters) < 2:
             print("Потрібно щонайменше 2 персонажа для торгівлі!")
@@ -1224,25 +3614,34 @@ class Game:
             if not (0 <= item2_idx < len(char2.inventory)):
                 print("Некоректний вибір!")
                 return
-            item1 = char1.inventory.pop(item1_idx)
-            item2 = char2.inventory.pop(item2_idx)
-            char1.inventory.append(item2)
-            char2.inventory.append(item1)
-            print(f"{char1.nickname} і {char2.nickname} обмінялися предметами: {item1.name} ↔ {item2.name}")
+            self.swap_items(char1, item1_idx, char2, item2_idx)
         except (ValueError, EOFError):
             print("Помилка введення. Торгівля скасована.")
 
+    def swap_items(self, char1: Character, item1_idx: int, char2: Character, item2_idx: int):
+        item1 = char1.inventory.pop(item1_idx)
+        item2 = char2.inventory.pop(item2_idx)
+        char1.inventory.append(item2)
+        char2.inventory.append(item1)
+        self.report("trade", "{actor} і {target} обмінялися предметами: {item} ↔ {other_item}", actor=char1.nickname,
+                    target=char2.nickname, item=item1.name, other_item=item2.name)
+        self.journal("trade", characters=[char1.nickname, char2.nickname], items=[item1.name, item2.name])
+
     def set_difficulty(self):
         try:
-            difficulty = int(input("Введіть рівень складності (1-10): "))
-            if 1 <= difficulty <= 10:
-                self.difficulty = difficulty
-                print(f"Рівень складності встановлено: {self.difficulty}")
-            else:
-                print("Складність має бути від 1 до 10!")
+            self.change_difficulty(int(input("Введіть рівень складності (1-10): ")))
         except (ValueError, EOFError):
             print("Помилка введення. Складність не змінено.")
 
+    def change_difficulty(self, difficulty: int) -> bool:
+        if not 1 <= difficulty <= 10:
+            self.report("difficulty_invalid", "Складність має бути від 1 до 10!")
+            return False
+        self.difficulty = difficulty
+        self.report("difficulty", "Рівень складності встановлено: {difficulty}", difficulty=self.difficulty)
+        self.journal("difficulty", difficulty=difficulty)
+        return True
+
     def set_location(self):
         print("\nДоступні локації:")
         for i, location in enumerate(self.locations, 1):
@@ -1250,13 +3649,17 @@ class Game:
         try:
             choice = int(input("Виберіть локацію: ")) - 1
             if 0 <= choice < len(self.locations):
-                self.current_location = self.locations[choice]
-                print(f"Поточна локація: {self.current_location.name}")
+                self.change_location(self.locations[choice])
             else:
                 print("Некоректний вибір!")
         except (ValueError, EOFError):
             print("Помилка введення. Локація не змінена.")
 
+    def change_location(self, location: Location):
+        self.current_location = location
+        self.report("location", "Поточна локація: {location}", location=self.current_location.name)
+        self.journal("location", location=self.current_location.name)
+
     def manage_guilds(self):
         print("\nУправління гільдіями:")
         print("1. Створити гільдію")
@@ -1267,12 +3670,7 @@ class Game:
         try:
             choice = int(input("Виберіть дію: "))
             if choice == 1:
-                name = input("Введіть назву гільдії: ")
-                if name.strip():
-                    self.guilds.append(Guild(name))
-                    print(f"Гільдію {name} створено!")
-                else:
-                    print("Назва не може бути порожньою!")
+                self.create_guild(input("Введіть назву гільдії: "))
             elif choice == 2:
                 if not self.characters:
                     print("Немає персонажів!")
@@ -1289,12 +3687,12 @@ class Game:
                     return
                 guild = self.guilds[guild_idx]
                 print("\nВибір персонажа:")
-                available_chars = [c for c in self.characters if c not in guild.members]
+                available_chars = [c for c in self.characters if not guild.has_member(c)]
                 for i, char in enumerate(available_chars, 1):
                     print(f"{i}. {char.nickname}")
                 char_idx = int(input("Виберіть персонажа: ")) - 1
                 if 0 <= char_idx < len(available_chars):
-                    guild.add_member(available_chars[char_idx])
+                    self.join_guild(guild, available_chars[char_idx])
                 else:
                     print("Некоректний вибір!")
             elif choice == 3:
@@ -1317,7 +3715,7 @@ class Game:
                     print(f"{i}. {char.nickname}")
                 char_idx = int(input("Виберіть персонажа: ")) - 1
                 if 0 <= char_idx < len(guild.members):
-                    guild.remove_member(guild.members[char_idx])
+                    self.leave_guild(guild, guild.members[char_idx])
                 else:
                     print("Некоректний вибір!")
             elif choice == 4:
@@ -1332,6 +3730,35 @@ class Game:
         except (ValueError, EOFError):
             print("Помилка введення. Управління гільдіями скасовано.")
 
+    def create_guild(self, name: str) -> bool:
+        if any(guild.name == name for guild in self.guilds):
+            self.report("guild_exists", "Гільдія {guild} уже існує!", guild=name)
+            return False
+        if not name.strip():
+            self.report("guild_name_empty", "Назва не може бути порожньою!")
+            return False
+        self.add_guild(Guild(name))
+        self.report("guild_create", "Гільдію {guild} створено!", guild=name)
+        self.journal("guild_create", guild=name)
+        return True
+
+    def join_guild(self, guild: Guild, character: Character) -> bool:
+        if guild.has_member(character):
+            self.report("guild_already_member", "{actor} уже в гільдії {guild}!", actor=character.nickname, guild=guild.name)
+            return False
+        guild.add_member(character, self.event_sink)
+        self.journal("guild_join", guild=guild.name, character=character.nickname)
+        return True
+
+    def leave_guild(self, guild: Guild, character: Character) -> bool:
+        if not guild.has_member(character):
+            self.report("guild_not_member", "{actor} не є членом гільдії {guild}!", actor=character.nickname,
+                        guild=guild.name)
+            return False
+        guild.remove_member(character, self.event_sink)
+        self.journal("guild_leave", guild=guild.name, character=character.nickname)
+        return True
+
     def show_reputation(self):
         if not self.characters:
             print("Немає персонажів!")
@@ -1382,12 +3809,7 @@ class Game:
                 if not (0 <= other_idx < len(self.factions) and self.factions[other_idx] != faction):
                     print("Некоректний вибір!")
                     return
-                faction.update_relations(self.factions[other_idx].name, 0.2)
-                self.factions[other_idx].update_relations(faction.name, 0.2)
-                for char in self.characters:
-                    for quest in char.active_quests:
-                        if "max_relations" in quest.objectives and faction.relations[self.factions[other_idx].name] >= 1.0:
-                            quest.update_progress("max_relations")
+                self.change_relations(faction, self.factions[other_idx], 0.2)
             elif choice == 3:
                 print("\nВибір фракції:")
                 for i, faction in enumerate(self.factions, 1):
@@ -1405,8 +3827,7 @@ class Game:
                 if not (0 <= other_idx < len(self.factions) and self.factions[other_idx] != faction):
                     print("Некоректний вибір!")
                     return
-                faction.update_relations(self.factions[other_idx].name, -0.3)
-                self.factions[other_idx].update_relations(faction.name, -0.3)
+                self.change_relations(faction, self.factions[other_idx], -0.3)
             elif choice == 0:
                 return
             else:
@@ -1414,6 +3835,13 @@ class Game:
         except (ValueError, EOFError):
             print("Помилка введення. Управління фракціями скасовано.")
 
+    def change_relations(self, faction: Faction, other: Faction, change: float):
+        faction.update_relations(other.name, change, self.event_sink)
+        other.update_relations(faction.name, change, self.event_sink)
+        if change > 0 and faction.relations[other.name] >= 1.0:
+            self.broadcast_quest_event("max_relations")
+        self.journal("faction_relation", factions=[faction.name, other.name], change=change)
+
     def start_guild_war(self):
         if len(self.guilds) < 2:
             print("Потрібно щонайменше 2 гільдії для війни!")
@@ -1441,36 +3869,74 @@ class Game:
                 "exp": float(input("Введіть ставку досвіду: ")),
                 "reputation": float(input("Введіть ставку репутації: "))
             }
-            war = GuildWar(guild1, guild2, stakes)
-            self.guild_wars.append(war)
-            war.resolve_war(self)
+            self.declare_guild_war(guild1, guild2, stakes)
         except (ValueError, EOFError):
             print("Помилка введення. Війна скасована.")
 
-    def apply_elemental_combo(self, character: Character, targets: List[Character], used_elements: List[DamageType]):
-        for effect in self.elemental_effects:
-            if all(elem in used_elements for elem in effect.elements):
-                for target in targets:
-                    target.apply_effect(effect.effect)
-                    print(f"Комбінація стихій: {effect.name} на {target.nickname}!")
+    def declare_guild_war(self, guild1: Guild, guild2: Guild, stakes: Dict[str, float]) -> GuildWar:
+        war = GuildWar(guild1, guild2, stakes)
+        self.guild_wars.append(war)
+        war.resolve_war(self)
+        self.journal("guild_war", guilds=[guild1.name, guild2.name])
+        return war
+
+    def elemental_combos(self) -> ElementalComboIndex:
+        index = self._combo_index
+        combos = self.elemental_effects
+        if index is None or index.combos is not combos or index.version != combos.version:
+            index = self._combo_index = ElementalComboIndex(combos)
+        return index
+
+    def apply_elemental_combo(self, character: Character, targets: List[Character], used_elements: List[DamageType], log=None):
+        for combo in self.elemental_combos().matching(used_elements):
+            for target in targets:
+                target.apply_effect(combo.effect.copy())
+                _report(log, "combo", "Комбінація стихій: {combo} на {target}!", combo=combo.name, target=target.nickname)
 
     def trigger_event(self):
-        if random.random() < 0.3:
-            event = random.choice(self.events)
-            print(f"\nПодія: {event.name}")
-            print(event.description)
+        rng = self.rng.events
+        if rng.random() < 0.3:
+            event = rng.choice(self.events)
+            self.report("event", "\nПодія: {name}\n{description}", name=event.name, description=event.description)
             event.effect(self)
-        if random.random() < 0.2:
+            self.journal("event", name=event.name)
+        if rng.random() < 0.2:
             self.trigger_dynamic_event()
 
+    def event_scheduler(self) -> DynamicEventScheduler:
+        scheduler = self._event_scheduler
+        events = self.dynamic_events
+        if scheduler is None or scheduler.events is not events or scheduler.version != events.version:
+            scheduler = self._event_scheduler = DynamicEventScheduler(events)
+        return scheduler
+
     def trigger_dynamic_event(self):
-        valid_events = [event for event in self.dynamic_events if event.can_trigger(self)]
+        valid_events = self.event_scheduler().valid(self)
         if not valid_events:
             return
-        event = random.choice(valid_events)
-        print(f"\nПодія: {event.name}")
-        print(event.description)
+        event = self.rng.events.choice(valid_events)
+        self.report("event", "\nПодія: {name}\n{description}", name=event.name, description=event.description)
         event.effect(self)
+        self.journal("dynamic_event", name=event.name)
+
+    def crafting_planner(self) -> CraftingPlanner:
+        planner = self._crafting_planner
+        if planner is None or len(planner.recipes) != len(self.crafting_recipes) or \
+                any(a is not b for a, b in zip(planner.recipes, self.crafting_recipes)):
+            planner = self._crafting_planner = CraftingPlanner(self.crafting_recipes)
+        return planner
+
+    def craft_with_plan(self, character: Character, recipe_name: str, count: int = 1) -> bool:
+        planner = self.crafting_planner()
+        steps = planner.plan(character.inventory, recipe_name, count)
+        if steps is None:
+            return False
+        recipes = {recipe.name: recipe for recipe in planner.recipes}
+        for step_name, step_count in steps:
+            for _ in range(step_count):
+                recipes[step_name].craft(character, self.event_sink)
+        self.journal("craft", character=character.nickname, recipe=recipe_name, count=count)
+        return True
 
     def craft_item(self):
         if not self.characters:
@@ -1485,25 +3951,80 @@ class Game:
                 print("Некоректний вибір!")
                 return
             character = self.characters[char_idx]
+            planner = self.crafting_planner()
+            direct = planner.craftable(character.inventory)
+            chained = planner.craftable_with_chains(character.inventory)
             print("\nДоступні рецепти:")
             for i, recipe in enumerate(self.crafting_recipes, 1):
-                print(f"{i}. {recipe.name} (Потрібно: {', '.join(f'{k}: {v}' for k, v in recipe.required_items.items())})")
+                if recipe.name in direct:
+                    status = f"можна створити: {direct[recipe.name]}"
+                elif recipe.name in chained:
+                    status = f"через проміжні рецепти: {chained[recipe.name]}"
+                else:
+                    status = "бракує матеріалів"
+                print(f"{i}. {recipe.name} (Потрібно: {', '.join(f'{k}: {v}' for k, v in recipe.required_items.items())}; {status})")
             recipe_idx = int(input("Виберіть рецепт: ")) - 1
             if not (0 <= recipe_idx < len(self.crafting_recipes)):
                 print("Некоректний вибір!")
                 return
-            recipe = self.crafting_recipes[recipe_idx]
-            if recipe.can_craft(character.inventory):
-                recipe.craft(character)
-            else:
-                print("Недостатньо матеріалів!")
+            self.craft_recipe(character, self.crafting_recipes[recipe_idx])
         except (ValueError, EOFError):
             print("Помилка введення. Крафт скасовано.")
 
+    def craft_recipe(self, character: Character, recipe: CraftingRecipe, count: int = 1) -> bool:
+        if count < 1:
+            raise ValueError(f"Кількість має бути додатною: {count}")
+        if count == 1 and recipe.can_craft(character.inventory):
+            recipe.craft(character, self.event_sink)
+            self.journal("craft", character=character.nickname, recipe=recipe.name, count=1)
+            return True
+        if not self.craft_with_plan(character, recipe.name, count):
+            self.report("craft_no_materials", "Недостатньо матеріалів!")
+            return False
+        return True
+
+    def manage_quests(self):
+        if not self.characters:
+            print("Немає персонажів!")
+            return
+        print("\nВибір персонажа:")
+        for i, char in enumerate(self.characters, 1):
+            print(f"{i}. {char.nickname}")
+        try:
+            char_idx = int(input("Виберіть персонажа: ")) - 1
+            if not (0 <= char_idx < len(self.characters)):
+                print("Некоректний вибір!")
+                return
+            character = self.characters[char_idx]
+            print("\nКвести:")
+            for i, quest in enumerate(self.quests, 1):
+                status = "виконано" if quest.is_completed() else "активний" if quest in character.active_quests else "доступний"
+                progress = ", ".join(f"{obj}: {quest.progress[obj]}/{goal}" for obj, goal in quest.objectives.items())
+                print(f"{i}. {quest.title} — {quest.description} ({progress}; {status})")
+            quest_idx = int(input("Виберіть квест, щоб узяти його (0 для скасування): ")) - 1
+            if quest_idx == -1:
+                return
+            if not (0 <= quest_idx < len(self.quests)):
+                print("Некоректний вибір!")
+                return
+            self.take_quest(character, self.quests[quest_idx])
+        except (ValueError, EOFError):
+            print("Помилка введення. Вибір квесту скасовано.")
+
+    def take_quest(self, character: Character, quest: Quest) -> bool:
+        if not self.accept_quest(character, quest):
+            self.report("quest_unavailable", "Цей квест уже взято або виконано!")
+            return False
+        self.report("quest_accept", "{actor} бере квест '{quest}'!", actor=character.nickname, quest=quest.title)
+        self.journal("quest_accept", character=character.nickname, quest=quest.id)
+        return True
+
     def execute_multiple_commands(self):
         print("\nВиконання кількох команд:")
         commands = []
-        print("Введіть команди (наприклад: shop 1, battle, exit). Введіть порожній рядок для завершення:")
+        print("Введіть команди (наприклад: shop 1 2, battle, exit). Введіть порожній рядок для завершення:")
+        for usage in SCRIPT_COMMANDS:
+            print(f"  {usage}")
         while True:
             try:
                 cmd = input("Команда: ").strip()
@@ -1515,71 +4036,175 @@ class Game:
                 break
 
         for cmd in commands:
-            try:
-                parts = cmd.split()
-                if not parts:
-                    continue
-                command = parts[0].lower()
-                args = parts[1:]
+            if self.execute_command(cmd) == "exit":
+                break
 
-                if command == "shop" and len(args) == 1:
-                    char_idx = int(args[0]) - 1
-                    if 0 <= char_idx < len(self.characters):
-                        self.shop(self.characters[char_idx])
-                    else:
-                        print(f"Некоректний індекс персонажа: {args[0]}")
-                elif command == "battle":
-                    if len(self.teams) >= 2 and all(len(team) > 0 for team in self.teams.values()):
+    def _character(self, token: str) -> Character:
+        if token.isdigit() and 0 < int(token) <= len(self.characters):
+            return self.characters[int(token) - 1]
+        character = self.registry.character(token)
+        if character is None:
+            raise ValueError(f"Персонажа {token} не знайдено")
+        return character
+
+    @staticmethod
+    def _pick(entries: List, token: str, name=lambda entry: entry.name):
+        if token.isdigit() and 0 < int(token) <= len(entries):
+            return entries[int(token) - 1]
+        for entry in entries:
+            if name(entry) == token:
+                return entry
+        raise ValueError(f"{token} не знайдено")
+
+    @staticmethod
+    def _item_index(character: Character, token: str) -> int:
+        if token.isdigit() and 0 < int(token) <= len(character.inventory):
+            return int(token) - 1
+        for i, item in enumerate(character.inventory):
+            if item.name == token:
+                return i
+        raise ValueError(f"У {character.nickname} немає предмета {token}")
+
+    # Спільний диспетчер команд для меню і для сценаріїв. Повертає "ok", "error" або "exit".
+    # Команди з повними аргументами ніколи не викликають input(); без аргументів в інтерактивному
+    # режимі відкривається відповідне меню, а в сценарії (interactive=False) це помилка
+    def execute_command(self, cmd: str, interactive: bool = True, out=None) -> str:
+        try:
+            parts = shlex.split(cmd)
+        except ValueError:
+            print(f"Помилка обробки команди: {cmd}", file=out)
+            return "error"
+        if not parts:
+            return "ok"
+        command = parts[0].lower()
+        args = parts[1:]
+        ok = True
+        try:
+            if command == "exit":
+                print("Вихід із виконання команд.", file=out)
+                return "exit"
+            elif command == "create" and len(args) == 2:
+                char_class = CharacterClass.__members__.get(args[1]) or \
+                    self._pick(list(CharacterClass), args[1], lambda c: c.value)
+                ok = self.new_character(args[0], char_class)
+            elif command == "status" and len(args) == 1:
+                self.show_character_status(self._character(args[0]), out)
+            elif command == "shop" and len(args) == 1 and interactive:
+                self.shop(self._character(args[0]))
+            elif command == "shop" and len(args) == 2:
+                character = self._character(args[0])
+                items, prices, _ = self.shop_offer(character)
+                choice = int(args[1])
+                if not 0 <= choice <= len(items):
+                    raise ValueError(f"Некоректний номер товару: {args[1]}")
+                if choice:
+                    ok = self.buy_item(character, items[choice - 1], prices[choice - 1])
+            elif command == "teams" and len(args) >= 2:
+                self.set_teams([[self._character(token) for token in arg.split(",")] for arg in args])
+            elif command == "battle" and len(args) <= 1:
+                if len(self.teams) >= 2 and all(len(team) > 0 for team in self.teams.values()):
+                    if interactive and not args:
                         self.battle()
                     else:
-                        print("Недостатньо команд для битви!")
-                elif command == "create":
-                    self.create_character()
-                elif command == "status" and len(args) == 1:
-                    char_idx = int(args[0]) - 1
-                    if 0 <= char_idx < len(self.characters):
-                        self.show_character_status(self.characters[char_idx])
-                    else:
-                        print(f"Некоректний індекс персонажа: {args[0]}")
-                elif command == "trade":
-                    self.trade()
-                elif command == "difficulty" and len(args) == 1:
-                    difficulty = int(args[0])
-                    if 1 <= difficulty <= 10:
-                        self.difficulty = difficulty
-                        print(f"Рівень складності встановлено: {self.difficulty}")
-                    else:
-                        print("Складність має бути від 1 до 10!")
-                elif command == "location" and len(args) == 1:
-                    loc_idx = int(args[0]) - 1
-                    if 0 <= loc_idx < len(self.locations):
-                        self.current_location = self.locations[loc_idx]
-                        print(f"Поточна локація: {self.current_location.name}")
-                    else:
-                        print(f"Некоректний індекс локації: {args[0]}")
-                elif command == "guild":
-                    self.manage_guilds()
-                elif command == "reputation":
-                    self.show_reputation()
-                elif command == "faction":
-                    self.manage_factions()
-                elif command == "war":
-                    self.start_guild_war()
-                elif command == "event":
-                    self.trigger_dynamic_event()
-                elif command == "craft":
-                    self.craft_item()
-                elif command == "save":
-                    self.save_game()
-                elif command == "load":
-                    self.load_game()
-                elif command == "exit":
-                    print("Вихід із виконання команд.")
-                    break
+                        self.battle(random_policy, random_policy, max_rounds=SCRIPT_BATTLE_ROUNDS)
                 else:
-                    print(f"Невідома команда: {cmd}")
-            except (ValueError, EOFError):
-                print(f"Помилка обробки команди: {cmd}")
+                    print("Недостатньо команд для битви!", file=out)
+                    ok = False
+            elif command == "trade" and len(args) == 4:
+                char1, char2 = self._character(args[0]), self._character(args[2])
+                if char1 is char2:
+                    raise ValueError("Персонаж не може торгувати сам із собою")
+                self.swap_items(char1, self._item_index(char1, args[1]), char2, self._item_index(char2, args[3]))
+            elif command == "difficulty" and len(args) == 1:
+                ok = self.change_difficulty(int(args[0]))
+            elif command == "location" and len(args) == 1:
+                self.change_location(self._pick(self.locations, args[0]))
+            elif command == "guild" and len(args) == 2 and args[0] == "create":
+                ok = self.create_guild(args[1])
+            elif command == "guild" and len(args) == 3 and args[0] in ("join", "leave"):
+                guild = self._pick(self.guilds, args[1])
+                character = self._character(args[2])
+                ok = self.join_guild(guild, character) if args[0] == "join" else self.leave_guild(guild, character)
+            elif command == "reputation" and len(args) == 1:
+                character = self._character(args[0])
+                print(f"\nРепутація {character.nickname}:", file=out)
+                for faction, value in character.reputation.items():
+                    print(f"  {faction}: {value}", file=out)
+            elif command == "faction" and len(args) == 3 and args[0] in ("ally", "war"):
+                faction = self._pick(self.factions, args[1])
+                other = self._pick(self.factions, args[2])
+                if faction is other:
+                    raise ValueError("Фракція не може змінити відносини сама з собою")
+                self.change_relations(faction, other, 0.2 if args[0] == "ally" else -0.3)
+            elif command == "war" and len(args) == 5:
+                guild1, guild2 = self._pick(self.guilds, args[0]), self._pick(self.guilds, args[1])
+                if guild1 is guild2:
+                    raise ValueError("Гільдія не може воювати сама з собою")
+                self.declare_guild_war(guild1, guild2, {"gold": float(args[2]), "exp": float(args[3]),
+                                                        "reputation": float(args[4])})
+            elif command == "event" and not args:
+                self.trigger_dynamic_event()
+            elif command == "craft" and len(args) in (2, 3):
+                count = int(args[2]) if len(args) == 3 else 1
+                ok = self.craft_recipe(self._character(args[0]), self._pick(self.crafting_recipes, args[1]), count)
+            elif command == "quest" and len(args) == 2:
+                quest = self._pick(self.quests, args[1], lambda q: q.id if q.id == args[1] else q.title)
+                ok = self.take_quest(self._character(args[0]), quest)
+            elif command == "simulate" and len(args) == 1:
+                teams = list(self.teams.values())
+                if len(teams) >= 2 and all(len(team) > 0 for team in teams[:2]):
+                    summary = self.simulate_summary(teams[0], teams[1], int(args[0]), max_rounds=SCRIPT_BATTLE_ROUNDS)
+                    print(f"Симуляція {summary['samples']} битв: перемоги команди 1 {summary['team1_win_rate']:.1%}, "
+                          f"команди 2 {summary['team2_win_rate']:.1%}, нічиї {summary['draw_rate']:.1%}, "
+                          f"у середньому {summary['avg_rounds']:.1f} раундів", file=out)
+                else:
+                    print("Недостатньо команд для симуляції!", file=out)
+                    ok = False
+            elif command in ("save", "load") and len(args) <= 2:
+                if command == "save":
+                    ok = self.save_game(*args)
+                else:
+                    ok = self.load_game(*args)
+            elif interactive and not args and command in INTERACTIVE_COMMANDS:
+                getattr(self, INTERACTIVE_COMMANDS[command])()
+            else:
+                print(f"Невідома команда: {cmd}", file=out)
+                ok = False
+        except (ValueError, IndexError, EOFError) as e:
+            print(f"Помилка обробки команди: {cmd} ({e})", file=out)
+            ok = False
+        return "ok" if ok else "error"
+
+    # Прогін сценарію без підказок: вивід гри приглушується, для кожного рядка записується час виконання
+    def run_script(self, lines, quiet: bool = True) -> List[Dict]:
+        timings = []
+        sink = self.event_sink
+        if quiet and sink is CONSOLE_SINK:
+            # Події в консоль не потрапили б однаково, тож їх навіть не створюємо
+            self.event_sink = NULL_SINK
+        try:
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+                    contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+                for number, line in enumerate(lines, 1):
+                    cmd = line.strip()
+                    if not cmd or cmd.startswith("#"):
+                        continue
+                    started = time.perf_counter()
+                    try:
+                        status = self.profiled(f"script_{number}_{cmd.split()[0].lower()}",
+                                               self.execute_command, cmd, False)
+                    except Exception as e:
+                        # Непередбачена помилка однієї команди не зупиняє сценарій
+                        print(f"Помилка виконання команди: {cmd} ({e!r})")
+                        status = "error"
+                    self.metrics.tick()
+                    timings.append({"line": number, "command": cmd, "status": status,
+                                    "ms": round((time.perf_counter() - started) * 1000, 3)})
+                    if status == "exit":
+                        break
+        finally:
+            self.event_sink = sink
+        return timings
 
     def main_menu(self):
         while True:
@@ -1601,83 +4226,629 @@ class Game:
             print("15. Виконати кілька команд")
             print("16. Зберегти гру")
             print("17. Завантажити гру")
+            print("18. Квести")
             print("0. Вийти")
             try:
                 choice = int(input("Виберіть опцію: "))
                 if choice == 0:
                     print("Вихід з гри.")
                     break
-                elif choice == 1:
-                    self.create_character()
-                elif choice == 2:
-                    if not self.characters:
-                        print("Немає створених персонажів!")
-                        continue
-                    print("\nСписок персонажів:")
-                    for i, character in enumerate(self.characters, 1):
-                        print(f"{i}. {character}")
-                    try:
-                        char_choice = int(input("Виберіть персонажа для деталей (0 для скасування): ")) - 1
-                        if 0 <= char_choice < len(self.characters):
-                            self.show_character_status(self.characters[char_choice])
-                    except (ValueError, EOFError):
-                        print("Помилка введення. Пропуск.")
-                elif choice == 3:
-                    if not self.characters:
-                        print("Спочатку створіть персонажа!")
-                        continue
-                    print("\nВибір персонажа для магазину:")
-                    for i, character in enumerate(self.characters, 1):
-                        print(f"{i}. {character.nickname} ({character.gold} золота)")
-                    try:
-                        char_choice = int(input("Виберіть персонажа (0 для скасування): ")) - 1
-                        if 0 <= char_choice < len(self.characters):
-                            self.shop(self.characters[char_choice])
-                    except (ValueError, EOFError):
-                        print("Помилка введення. Пропуск.")
-                elif choice == 4:
-                    if len(self.characters) < 2:
-                        print("Потрібно мінімум 2 персонажа!")
-                        continue
-                    self.team_selection()
-                elif choice == 5:
-                    if len(self.teams) < 2 or any(len(team) < 1 for team in self.teams.values()):
-                        print("Сформуйте щонайменше 2 команди з персонажами!")
-                        continue
-                    self.battle()
-                elif choice == 6:
-                    self.trade()
-                elif choice == 7:
-                    self.set_difficulty()
-                elif choice == 8:
-                    self.set_location()
-                elif choice == 9:
-                    self.manage_guilds()
-                elif choice == 10:
-                    self.show_reputation()
-                elif choice == 11:
-                    self.manage_factions()
-                elif choice == 12:
-                    self.start_guild_war()
-                elif choice == 13:
-                    self.trigger_dynamic_event()
-                elif choice == 14:
-                    self.craft_item()
-                elif choice == 15:
-                    self.execute_multiple_commands()
-                elif choice == 16:
-                    self.save_game()
-                elif choice == 17:
-                    self.load_game()
-                else:
-                    print("Некоректний вибір!")
+                self.profiled(f"menu_{choice}", self._menu_action, choice)
+                self.metrics.tick()
             except (ValueError, EOFError):
                 print("Помилка введення. Спробуйте ще раз.")
 
+    def _menu_action(self, choice: int):
+        if choice == 1:
+            self.create_character()
+        elif choice == 2:
+            if not self.characters:
+                print("Немає створених персонажів!")
+                return
+            print("\nСписок персонажів:")
+            for i, character in enumerate(self.characters, 1):
+                print(f"{i}. {character}")
+            try:
+                char_choice = int(input("Виберіть персонажа для деталей (0 для скасування): ")) - 1
+                if 0 <= char_choice < len(self.characters):
+                    self.show_character_status(self.characters[char_choice])
+            except (ValueError, EOFError):
+                print("Помилка введення. Пропуск.")
+        elif choice == 3:
+            if not self.characters:
+                print("Спочатку створіть персонажа!")
+                return
+            print("\nВибір персонажа для магазину:")
+            for i, character in enumerate(self.characters, 1):
+                print(f"{i}. {character.nickname} ({character.gold} золота)")
+            try:
+                char_choice = int(input("Виберіть персонажа (0 для скасування): ")) - 1
+                if 0 <= char_choice < len(self.characters):
+                    self.shop(self.characters[char_choice])
+            except (ValueError, EOFError):
+                print("Помилка введення. Пропуск.")
+        elif choice == 4:
+            if len(self.characters) < 2:
+                print("Потрібно мінімум 2 персонажа!")
+                return
+            self.team_selection()
+        elif choice == 5:
+            if len(self.teams) < 2 or any(len(team) < 1 for team in self.teams.values()):
+                print("Сформуйте щонайменше 2 команди з персонажами!")
+                return
+            self.battle()
+        elif choice == 6:
+            self.trade()
+        elif choice == 7:
+            self.set_difficulty()
+        elif choice == 8:
+            self.set_location()
+        elif choice == 9:
+            self.manage_guilds()
+        elif choice == 10:
+            self.show_reputation()
+        elif choice == 11:
+            self.manage_factions()
+        elif choice == 12:
+            self.start_guild_war()
+        elif choice == 13:
+            self.trigger_dynamic_event()
+        elif choice == 14:
+            self.craft_item()
+        elif choice == 15:
+            self.execute_multiple_commands()
+        elif choice == 16:
+            self.save_game()
+        elif choice == 17:
+            self.load_game()
+        elif choice == 18:
+            self.manage_quests()
+        else:
+            print("Некоректний вибір!")
+
     def run(self):
         print("Ласкаво просимо до гри!")
         self.main_menu()
 
+# Прогін балансу по сітці клас × локація × погода × складність
+def _sweep_teams(char_class: CharacterClass, difficulty: int):
+    # Загін гравця — три персонажі одного класу 1-го рівня;
+    # вороги — по одному персонажу кожного класу рівня, що дорівнює складності
+    party = [Character(f"{char_class.value} {i}", char_class) for i in range(1, 4)]
+    enemies = []
+    for enemy_class in CharacterClass:
+        enemy = Character(f"Ворог-{enemy_class.value}", enemy_class)
+        for _ in range(difficulty - 1):
+            enemy.level_up()
+        enemy.hp = enemy.max_hp
+        enemy.mana = enemy.max_mana
+        enemies.append(enemy)
+    return party, enemies
+
+def _run_sweep_cell(cell) -> Dict:
+    char_class, location_name, weather, difficulty, samples, seed, max_rounds = cell
+    game = Game(seed=seed)
+    game.difficulty = difficulty
+    game.current_location = next(loc for loc in game.locations if loc.name == location_name)
+    game.weather_system.current_weather = weather
+    party, enemies = _sweep_teams(char_class, difficulty)
+    fighters = party + enemies
+    game.apply_weather_effects(fighters, verbose=False)
+    game.apply_battle_modifiers(fighters)
+
+    summary = game.simulate_summary(party, enemies, samples, seed=seed, max_rounds=max_rounds)
+    return {
+        "char_class": char_class.name,
+        "location": location_name,
+        "weather": weather.name,
+        "difficulty": difficulty,
+        "samples": samples,
+        "seed": seed,
+        "win_rate": summary["team1_win_rate"],
+        "draw_rate": summary["draw_rate"],
+        "avg_rounds": summary["avg_rounds"]
+    }
+
+class BalanceSweep:
+    def __init__(self, samples: int = 1000, seed: int = 0, workers: Optional[int] = None,
+                 difficulties=range(1, 11), max_rounds: int = 100):
+        self.samples = samples
+        self.seed = seed
+        self.workers = workers
+        self.difficulties = list(difficulties)
+        self.max_rounds = max_rounds
+
+    def cells(self):
+        locations = [loc.name for loc in Game().locations]
+        for char_class in CharacterClass:
+            for location_name in locations:
+                for weather in WeatherType:
+                    for difficulty in self.difficulties:
+                        # Зерно залежить лише від клітинки, тому результат не залежить від кількості процесів
+                        seed = _derive_seed(self.seed, char_class.name, location_name, weather.name, difficulty)
+                        yield (char_class, location_name, weather, difficulty, self.samples, seed, self.max_rounds)
+
+    def run(self) -> List[Dict]:
+        cells = list(self.cells())
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(_run_sweep_cell, cells, chunksize=max(1, len(cells) // 64)))
+
+    @staticmethod
+    def write(rows: List[Dict], filename: str):
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            if filename.endswith(".json"):
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            else:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else [])
+                writer.writeheader()
+                writer.writerows(rows)
+
+# Порівняння пам'яті на предмет: старі класи з __dict__ і окремим класом набору проти шаблонів зі __slots__
+def item_memory_benchmark(count: int = 1_000_000, seed: int = 0) -> Dict:
+    class LegacyEnchantment:
+        def __init__(self, name, effect_type, power):
+            self.name = name
+            self.effect_type = effect_type
+            self.power = power
+
+    class LegacyItem:
+        def __init__(self, name, item_type, power, value, quality, item_set=None, enchantment=None, damage_type=None):
+            self.name = name
+            self.item_type = item_type
+            self.power = power
+            self.value = value
+            self.quality = quality
+            self.item_set = item_set
+            self.enchantment = enchantment
+            self.damage_type = damage_type
+
+        @classmethod
+        def from_dict(cls, data):
+            item_set = type("ItemSet", (), {"name": data["item_set"]})() if data["item_set"] else None
+            enchantment = None
+            if data["enchantment"]:
+                enchantment = LegacyEnchantment(data["enchantment"]["name"],
+                                                EffectType[data["enchantment"]["effect_type"]],
+                                                data["enchantment"]["power"])
+            return cls(data["name"], ItemType[data["item_type"]], data["power"], data["value"],
+                       ItemQuality[data["quality"]], item_set, enchantment,
+                       DamageType[data["damage_type"]] if data["damage_type"] else None)
+
+    game = Game(seed=seed)
+    saved = [game.generate_loot(i % 10 + 1).to_dict() for i in range(count)]
+    results = {"items": count}
+    for label, factory in (("legacy", LegacyItem.from_dict), ("slotted", Item.from_dict)):
+        tracemalloc.start()
+        items = [factory(data) for data in saved]
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = {"bytes": current, "bytes_per_item": round(current / count, 1), "peak": peak}
+        del items
+    results["templates"] = len(ItemTemplate._interned)
+    results["ratio"] = round(results["legacy"]["bytes"] / max(results["slotted"]["bytes"], 1), 2)
+    return results
+
+# Набір бенчмарків. Кожен кейс — (назва, кількість операцій, підготовка, прогін):
+# підготовка не входить у вимір, прогін отримує її результат і міряється perf_counter
+class BenchmarkSuite:
+    REPORT_VERSION = 1
+
+    def __init__(self, quick: bool = False, repeat: int = 3, seed: int = 0):
+        self.quick = quick
+        self.repeat = repeat
+        self.seed = seed
+
+    def _game(self) -> Game:
+        return Game(seed=self.seed, sink=NULL_SINK)
+
+    @staticmethod
+    def _fighters(count: int, prefix: str) -> List[Character]:
+        return [Character(f"{prefix}{i}", CharacterClass.WARRIOR) for i in range(count)]
+
+    # Кейси: (назва, кількість операцій, підготовка, тіло); файли збережень пишуться у workdir
+    def cases(self, workdir: str):
+        game = self._game()
+        scale = 10 if self.quick else 1
+
+        def duel():
+            attacker, defender = self._fighters(2, "Бенч")
+            attacker.mana = defender.hp = 10 ** 12
+            return attacker, defender
+
+        def attacks(pair):
+            attacker, defender = pair
+            attack = attacker.attack
+            for _ in range(100_000 // scale):
+                attack(defender, NULL_SINK)
+        yield "attack", 100_000 // scale, duel, attacks
+
+        def skills(pair):
+            attacker, defender = pair
+            targets = [defender]
+            use_skill = attacker.use_skill
+            for _ in range(100_000 // scale):
+                use_skill("Сильний удар", targets, game, NULL_SINK)
+        yield "use_skill", 100_000 // scale, duel, skills
+
+        def stacked():
+            character = self._fighters(1, "Ефекти")[0]
+            character.hp = 10 ** 12
+            effect_types = [EffectType.BURN, EffectType.POISON, EffectType.REGEN, EffectType.STUN]
+            character.active_effects = [Effect(effect_types[i % len(effect_types)], 10 ** 9, 1) for i in range(1000)]
+            return character
+
+        def ticks(character):
+            log = BattleLog()
+            for _ in range(10_000 // scale):
+                character.update_effects(log)
+        yield "update_effects_1000_stack", 10_000 // scale, stacked, ticks
+
+        for members in (10, 1000 // scale, 10_000 // scale):
+            def armies(members=members):
+                return GuildWar(Guild("Бенч-А", self._fighters(members // 2, "А")),
+                                Guild("Бенч-Б", self._fighters(members - members // 2, "Б")),
+                                {"gold": 1, "exp": 1, "reputation": 1})
+            yield f"resolve_war_{members}", members, armies, lambda war: war.resolve_war(game)
+
+        def loot(_):
+            generate = game.generate_loot
+            for i in range(100_000 // scale):
+                generate(i % 10 + 1)
+        yield "generate_loot", 100_000 // scale, lambda: None, loot
+        yield "generate_loot_batch", 100_000 // scale, lambda: None, lambda _: game.generate_loot_batch(100_000 // scale, 5)
+
+        def inventory():
+            items = game.generate_loot_batch(100_000 // scale, 3)
+            items += [Item(name, ItemType.ARMOR, 5, 50, ItemQuality.COMMON)
+                      for name in ("Шкіряна броня", "Меч лицаря", "Щит воїна", "Зілля здоров'я")]
+            return Inventory(items)
+
+        def can_craft(items):
+            for _ in range(1000):
+                for recipe in game.crafting_recipes:
+                    recipe.can_craft(items)
+        yield "can_craft_large_inventory", 1000 * len(game.crafting_recipes), inventory, can_craft
+
+        for count in (1000, 100_000 // scale):
+            for save_format in ("json", "binary"):
+                def world(count=count):
+                    source = self._game()
+                    for character in self._fighters(count, "Збереження"):
+                        source.add_character(character)
+                    return source
+
+                path = os.path.join(workdir, f"bench_{count}.{save_format}")
+
+                def save(source, path=path, save_format=save_format):
+                    if not source.save_game(path, save_format):
+                        raise RuntimeError(f"Не вдалося зберегти {path}")
+                yield f"save_{save_format}_{count}", count, world, save
+
+                # Файл готується поза виміром, тож кейс завантаження не залежить від кейсу збереження
+                def saved(world=world, save=save, path=path):
+                    if not os.path.exists(path):
+                        save(world())
+
+                def load(_, path=path, save_format=save_format):
+                    if not self._game().load_game(path, save_format):
+                        raise RuntimeError(f"Не вдалося завантажити {path}")
+                yield f"load_{save_format}_{count}", count, saved, load
+
+    def run(self, only: Optional[str] = None) -> Dict:
+        results = []
+        with tempfile.TemporaryDirectory() as workdir, \
+                open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            for name, ops, setup, body in self.cases(workdir):
+                if only and only not in name:
+                    continue
+                times = []
+                for _ in range(self.repeat):
+                    state = setup()
+                    started = time.perf_counter()
+                    body(state)
+                    times.append(time.perf_counter() - started)
+                best = min(times)
+                results.append({"name": name, "ops": ops, "best_s": round(best, 6),
+                                "median_s": round(statistics.median(times), 6),
+                                "ops_per_s": round(ops / best, 1) if best > 0 else None})
+        return {
+            "version": self.REPORT_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np is not None,
+            "quick": self.quick,
+            "repeat": self.repeat,
+            "results": results
+        }
+
+    # Порівнюються найкращі часи однойменних кейсів; регресія — повільніше більш ніж на tolerance
+    @staticmethod
+    def compare(report: Dict, baseline: Dict, tolerance: float = 0.1) -> List[Dict]:
+        previous = {row["name"]: row for row in baseline["results"]}
+        rows = []
+        for row in report["results"]:
+            base = previous.get(row["name"])
+            if base is None or base["ops"] != row["ops"] or not base["best_s"]:
+                continue
+            ratio = row["best_s"] / base["best_s"]
+            rows.append({"name": row["name"], "baseline_s": base["best_s"], "best_s": row["best_s"],
+                         "ratio": round(ratio, 3), "regression": ratio > 1 + tolerance})
+        return rows
+
+# Багатокористувацький сервер: кожне TCP-з'єднання — окрема сесія Game зі своїм зерном.
+# Протокол рядковий (UTF-8): клієнт надсилає команду сценарію, сервер відповідає рядками виводу
+# з префіксом "| " і завершальним рядком "= ok", "= error" або "= exit".
+# Кожна команда виконується в пулі потоків, тож повільна сесія не блокує інші; команди однієї сесії
+# йдуть послідовно. Кожна сесія має власний StringIO: у нього пише її ConsoleSink, і він же передається
+# як out у execute_command, тож відповідь збирається без глобального sys.stdout
+class GameServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, seed: Optional[int] = None,
+                 workers: Optional[int] = None, save_dir: str = "sessions"):
+        self.host = host
+        self.port = port
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.save_dir = save_dir
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session")
+        self.sessions = 0
+        self.active = 0
+        self.server = None
+
+    async def start(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        self.executor.shutdown(wait=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Сервер гри слухає {self.host}:{self.port} (збереження у {self.save_dir})")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    def session_dir(self, session: int) -> str:
+        return os.path.join(self.save_dir, f"session_{session}")
+
+    # Файли збережень сесії лежать у save_dir/session_<n>/; клієнт обирає лише ім'я файлу
+    def _sandbox(self, session: int, cmd: str) -> str:
+        parts = shlex.split(cmd)
+        if not parts or parts[0].lower() not in ("save", "load"):
+            return cmd
+        name = parts[1] if len(parts) > 1 else "game_save.json"
+        if name in ("", ".", "..") or "/" in name or "\\" in name or os.path.basename(name) != name:
+            raise ValueError(f"Некоректне ім'я файлу збереження: {name!r}")
+        directory = self.session_dir(session)
+        os.makedirs(directory, exist_ok=True)
+        parts[1:2] = [os.path.join(directory, name)]
+        return shlex.join(parts)
+
+    def _execute(self, game: 'Game', output: io.StringIO, cmd: str):
+        try:
+            status = game.execute_command(cmd, interactive=False, out=output)
+        except Exception as e:
+            print(f"Внутрішня помилка: {e!r}", file=output)
+            status = "error"
+        text = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return status, text
+
+    async def _reply(self, writer, status: str, text: str):
+        lines = [f"| {line}" for line in text.splitlines()]
+        lines.append(f"= {status}")
+        writer.write(("\n".join(lines) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        self.sessions += 1
+        self.active += 1
+        session = self.sessions
+        loop = asyncio.get_running_loop()
+        output = io.StringIO()
+        game = Game(seed=_derive_seed(self.seed, "session", session), sink=ConsoleSink(output))
+        try:
+            await self._reply(writer, "ok", "\n".join([f"Сесія {session}. Команди:"] + SCRIPT_COMMANDS))
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                cmd = line.decode("utf-8", errors="replace").strip()
+                if not cmd or cmd.startswith("#"):
+                    continue
+                try:
+                    cmd = self._sandbox(session, cmd)
+                except ValueError as e:
+                    await self._reply(writer, "error", f"Помилка обробки команди: {cmd} ({e})")
+                    continue
+                status, text = await loop.run_in_executor(self.executor, self._execute, game, output, cmd)
+                await self._reply(writer, status, text)
+                if status == "exit":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+# Сценарій однієї сесії навантажувального тесту
+LOAD_TEST_SCRIPT = [
+    "create Воїн WARRIOR",
+    "create Маг MAGE",
+    "shop 1 0",
+    "teams 1 2",
+    "simulate 20",
+    "battle",
+    "save",
+    "exit"
+]
+
+# Навантажувальний клієнт: sessions сесій, не більше concurrency одночасно, кожна проганяє script.
+# Затримка команди — від надсилання рядка до завершального рядка відповіді
+async def load_test(host: str, port: int, sessions: int = 100, concurrency: int = 20,
+                    script: Optional[List[str]] = None) -> Dict:
+    script = script or LOAD_TEST_SCRIPT
+    latencies = []
+    errors = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def read_reply(reader) -> str:
+        while True:
+            line = (await reader.readline()).decode("utf-8")
+            if not line:
+                raise ConnectionError("сервер закрив з'єднання")
+            if line.startswith("= "):
+                return line[2:].strip()
+
+    async def session():
+        nonlocal errors
+        async with limit:
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                await read_reply(reader)
+                for cmd in script:
+                    started = time.perf_counter()
+                    writer.write((cmd + "\n").encode("utf-8"))
+                    await writer.drain()
+                    status = await read_reply(reader)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    errors += status == "error"
+                    if status == "exit":
+                        break
+            finally:
+                writer.close()
+                await writer.wait_closed()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "commands": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(sessions / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": round(percentiles[49], 3) if latencies else None,
+        "p99_ms": round(percentiles[98], 3) if latencies else None,
+        "max_ms": round(latencies[-1], 3) if latencies else None
+    }
+
+# Навантажувальний тест проти вбудованого сервера на вільному порту
+async def local_load_test(sessions: int = 100, concurrency: int = 20, seed: Optional[int] = None,
+                          workers: Optional[int] = None) -> Dict:
+    with tempfile.TemporaryDirectory() as save_dir:
+        server = GameServer(port=0, seed=seed, workers=workers, save_dir=save_dir)
+        await server.start()
+        try:
+            return await load_test(server.host, server.port, sessions, concurrency)
+        finally:
+            await server.stop()
+
+def _address(text: str, default_host: str = "127.0.0.1"):
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+# Гра з командного рядка: сценарій (--script) або інтерактивне меню, з однаковими профілюванням і метриками
+def _run_game(args, event_sink):
+    game = Game(seed=args.seed, sink=event_sink)
+    if args.profile or args.battle_timers:
+        game.enable_profiling(args.battle_timers, args.profile)
+    if args.metrics:
+        game.enable_metrics(args.metrics)
+    if args.script:
+        if args.script == "-":
+            timings = game.run_script(sys.stdin, quiet=not args.script_output)
+        else:
+            with open(args.script, 'r', encoding='utf-8') as f:
+                timings = game.run_script(f, quiet=not args.script_output)
+        if args.timings:
+            BalanceSweep.write(timings, args.timings)
+        total = sum(row["ms"] for row in timings)
+        errors = sum(row["status"] == "error" for row in timings)
+        print(f"Виконано команд: {len(timings)} (помилок: {errors}) за {total:.1f} мс")
+        for entry in _script_summary(timings):
+            print(f"  {entry['command']:<12} {entry['count']:>7} разів  усього {entry['total_ms']:>10.1f} мс  "
+                  f"середнє {entry['mean_ms']:>8.3f} мс  макс {entry['max_ms']:>8.3f} мс  помилок {entry['errors']}")
+    else:
+        game.run()
+    if game.battle_timer is not None:
+        print(json.dumps(game.battle_timer.report(), ensure_ascii=False, indent=2))
+    if args.metrics:
+        game.metrics.write()
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    parser = argparse.ArgumentParser(description="Консольна RPG-гра")
+    parser.add_argument("--sweep", metavar="FILE", help="прогнати баланс по всій сітці і записати таблицю у CSV або JSON")
+    parser.add_argument("--samples", type=int, default=1000, help="кількість битв на клітинку сітки")
+    parser.add_argument("--workers", type=int, default=None, help="кількість процесів")
+    parser.add_argument("--seed", type=int, default=None, help="базове зерно генераторів (однакове зерно і ввід дають однакову гру)")
+    parser.add_argument("--memory-bench", type=int, metavar="N", help="виміряти пам'ять на предмет для світу з N предметів")
+    parser.add_argument("--script", metavar="FILE", help="виконати команди з файлу (або '-' для stdin) без підказок")
+    parser.add_argument("--script-output", action="store_true", help="не приглушувати вивід гри під час сценарію")
+    parser.add_argument("--timings", metavar="FILE", help="записати час виконання кожної команди сценарію у CSV або JSON")
+    parser.add_argument("--events", metavar="FILE", help="записувати події гри у файл JSON Lines замість консолі")
+    parser.add_argument("--quiet", action="store_true", help="не виводити події гри (битви, квести, нагороди)")
+    parser.add_argument("--profile", metavar="DIR", help="записувати cProfile (.prof) кожної дії меню або команди сценарію у DIR")
+    parser.add_argument("--battle-timers", action="store_true", help="міряти час кожної фази битви і вивести звіт наприкінці")
+    parser.add_argument("--metrics", metavar="FILE", help="збирати метрики і періодично записувати знімок (.json або текст Prometheus)")
+    parser.add_argument("--bench", metavar="REPORT", help="прогнати набір бенчмарків і записати звіт JSON")
+    parser.add_argument("--bench-quick", action="store_true", help="зменшені розміри бенчмарків для швидкої перевірки")
+    parser.add_argument("--bench-filter", metavar="TEXT", help="запускати лише кейси, назва яких містить TEXT")
+    parser.add_argument("--baseline", metavar="FILE", help="порівняти звіт бенчмарків зі збереженим базовим")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="допустиме сповільнення відносно базового звіту")
+    parser.add_argument("--serve", metavar="[HOST:]PORT", help="запустити багатокористувацький сервер гри на TCP-порту")
+    parser.add_argument("--save-dir", default="sessions", help="тека збережень сесій сервера")
+    parser.add_argument("--load-test", metavar="[HOST:]PORT", help="навантажити сервер гри ('local' — вбудований сервер)")
+    parser.add_argument("--sessions", type=int, default=100, help="кількість сесій навантажувального тесту")
+    parser.add_argument("--concurrency", type=int, default=20, help="кількість одночасних сесій навантажувального тесту")
+    args = parser.parse_args()
+
+    if args.sweep:
+        sweep = BalanceSweep(samples=args.samples, seed=args.seed or 0, workers=args.workers)
+        BalanceSweep.write(sweep.run(), args.sweep)
+        print(f"Таблицю балансу записано у файл {args.sweep}")
+    elif args.memory_bench:
+        print(json.dumps(item_memory_benchmark(args.memory_bench, args.seed or 0), ensure_ascii=False, indent=2))
+    elif args.bench:
+        report = BenchmarkSuite(quick=args.bench_quick, seed=args.seed or 0).run(args.bench_filter)
+        with open(args.bench, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        for row in report["results"]:
+            print(f"  {row['name']:<28} {row['ops']:>8} оп.  {row['best_s'] * 1000:>10.2f} мс  {row['ops_per_s']:>14} оп./с")
+        print(f"Звіт бенчмарків записано у файл {args.bench}")
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                comparison = BenchmarkSuite.compare(report, json.load(f), args.tolerance)
+            for row in comparison:
+                mark = "РЕГРЕСІЯ" if row["regression"] else "ok"
+                print(f"  {row['name']:<28} {row['baseline_s'] * 1000:>10.2f} → {row['best_s'] * 1000:>10.2f} мс  ×{row['ratio']:<6} {mark}")
+            if any(row["regression"] for row in comparison):
+                sys.exit(1)
+    elif args.serve:
+        host, port = _address(args.serve)
+        try:
+            asyncio.run(GameServer(host, port, args.seed, args.workers, args.save_dir).serve_forever())
+        except KeyboardInterrupt:
+            print("Сервер зупинено")
+    elif args.load_test:
+        if args.load_test == "local":
+            report = asyncio.run(local_load_test(args.sessions, args.concurrency, args.seed, args.workers))
+        else:
+            report = asyncio.run(load_test(*_address(args.load_test), args.sessions, args.concurrency))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.events:
+        # Файл подій закривається й тоді, коли гру перервано винятком чи Ctrl+C
+        with JsonLinesSink(args.events) as event_sink:
+            _run_game(args, event_sink)
+    else:
+        _run_game(args, NULL_SINK if args.quiet else None)
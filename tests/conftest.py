@@ -0,0 +1,35 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Гра — один файл із дужками в назві, тому імпортується за шляхом під іменем rpg
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location("rpg", os.path.join(ROOT, "mini_project(update).py"))
+rpg = importlib.util.module_from_spec(_spec)
+sys.modules["rpg"] = rpg
+_spec.loader.exec_module(rpg)
+
+# Невеликий світ: три персонажі, дві команди, гільдія і взятий квест
+WORLD_SCRIPT = [
+    "create Артур WARRIOR",
+    "create Мерлін MAGE",
+    "create Робін ROGUE",
+    "teams Артур,Робін Мерлін",
+    "guild create Орден",
+    "guild join Орден Артур",
+    "quest Артур 1",
+    "difficulty 3"
+]
+
+
+def run_commands(game, commands):
+    return [game.execute_command(cmd, interactive=False) for cmd in commands]
+
+
+@pytest.fixture
+def world():
+    game = rpg.Game(seed=42)
+    assert run_commands(game, WORLD_SCRIPT) == ["ok"] * len(WORLD_SCRIPT)
+    return game
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, rpg
+
+
+def test_failed_save_is_not_timed_as_success(monkeypatch):
+    monkeypatch.setattr(rpg.Game, "save_game", lambda self, filename, save_format="json": False)
+    with pytest.raises(RuntimeError):
+        rpg.BenchmarkSuite(quick=True, repeat=1).run("save_json_1000")
+
+
+def test_load_case_runs_on_its_own():
+    report = rpg.BenchmarkSuite(quick=True, repeat=1).run("load_binary_1000")
+    assert [row["name"] for row in report["results"]] == ["load_binary_1000", "load_binary_10000"]
+
+
+def report(*rows):
+    return {"results": [{"name": name, "ops": ops, "best_s": best} for name, ops, best in rows]}
+
+
+def test_compare_flags_only_slowdowns_beyond_tolerance():
+    baseline = report(("attack", 100, 1.0), ("use_skill", 100, 1.0), ("loot", 100, 1.0))
+    current = report(("attack", 100, 1.05), ("use_skill", 100, 1.2), ("loot", 100, 0.5))
+    rows = {row["name"]: row for row in rpg.BenchmarkSuite.compare(current, baseline, tolerance=0.1)}
+    assert {name: row["regression"] for name, row in rows.items()} == \
+        {"attack": False, "use_skill": True, "loot": False}
+    assert rows["use_skill"]["ratio"] == 1.2
+    assert not rpg.BenchmarkSuite.compare(current, baseline, tolerance=0.5)[1]["regression"]
+
+
+def test_compare_skips_new_resized_and_zero_time_cases():
+    baseline = report(("attack", 100, 1.0), ("use_skill", 100, 0.0))
+    current = report(("attack", 1000, 5.0), ("use_skill", 100, 5.0), ("loot", 100, 5.0))
+    assert rpg.BenchmarkSuite.compare(current, baseline) == []
+
+
+def test_report_shape():
+    result = rpg.BenchmarkSuite(quick=True, repeat=2).run("use_skill")
+    assert {"version", "python", "platform", "numpy", "quick", "repeat", "results"} <= set(result)
+    assert result["version"] == rpg.BenchmarkSuite.REPORT_VERSION
+    assert result["quick"] is True and result["repeat"] == 2
+    [row] = result["results"]
+    assert set(row) == {"name", "ops", "best_s", "median_s", "ops_per_s"}
+    assert row["name"] == "use_skill" and row["ops"] == 10_000
+    assert 0 < row["best_s"] <= row["median_s"]
+    json.dumps(result)
+
+
+@pytest.mark.parametrize("baseline_s, code", [(10.0, 0), (1e-9, 1)])
+def test_baseline_regression_sets_exit_code(tmp_path, baseline_s, code):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report(("use_skill", 10_000, baseline_s))), encoding="utf-8")
+    out = tmp_path / "report.json"
+    process = subprocess.run([sys.executable, os.path.join(ROOT, "mini_project(update).py"), "--bench", str(out),
+                              "--bench-quick", "--bench-filter", "use_skill", "--baseline", str(baseline)],
+                             capture_output=True, text=True, encoding="utf-8", cwd=tmp_path)
+    assert process.returncode == code
+    assert ("РЕГРЕСІЯ" in process.stdout) == bool(code)
+    assert json.loads(out.read_text(encoding="utf-8"))["results"][0]["name"] == "use_skill"
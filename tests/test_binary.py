@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import rpg
+
+
+@pytest.fixture
+def loaded(world, tmp_path):
+    for i in range(5):
+        assert world.new_character(f"Герой{i}", rpg.CharacterClass.ROGUE)
+    path = str(tmp_path / "save.bin")
+    assert world.save_game(path, "binary")
+    game = rpg.Game()
+    assert game.load_game(path, "binary")
+    return game, path
+
+
+def test_lookup_after_deleting_from_lazy_list(loaded):
+    game, _ = loaded
+    last = game.characters.nickname(len(game.characters) - 1)
+    del game.characters[0]
+    assert game.registry.character(last).nickname == last
+    game.characters.insert(0, rpg.Character("Новачок", rpg.CharacterClass.MAGE))
+    game.characters[1] = rpg.Character("Заміна", rpg.CharacterClass.MAGE)
+    assert game.characters.by_nickname(last).nickname == last
+
+
+def test_battle_decodes_only_fighters(loaded):
+    game, _ = loaded
+    game.trigger_event = lambda: None
+    # Під час завантаження декодуються лише учасники команд і гільдій
+    decoded = {c.nickname for c in game.characters.loaded()}
+    assert game.execute_command("battle", interactive=False) == "ok"
+    assert {c.nickname for c in game.characters.loaded()} == decoded
+    assert not any(nickname.startswith("Герой") for nickname in decoded)
+
+
+def test_save_over_loaded_file_keeps_lazy_records(loaded):
+    game, path = loaded
+    game.registry.character("Артур").gold = 999
+    expected = game._game_state()
+    game2 = rpg.Game()
+    assert game2.load_game(path, "binary")
+    assert game.save_game(path, "binary")
+    assert game.characters.nickname(len(game.characters) - 1) == "Герой4"
+    assert game._game_state() == expected
+
+    reloaded = rpg.Game()
+    assert reloaded.load_game(path, "binary")
+    assert reloaded._game_state() == expected
+
+
+def test_reload_closes_previous_source(loaded, tmp_path):
+    game, path = loaded
+    previous = game.characters
+    assert game.load_game(path, "binary")
+    assert previous._source._file.closed
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"X" * 64)
+    assert not game.load_game(str(bad), "binary")
+
+
+def test_save_file_closes_as_a_context_manager(loaded):
+    _, path = loaded
+    with rpg.BinarySaveFile(path) as source:
+        character, _ = source.decode(source.find("Герой3"))
+        assert character.nickname == "Герой3"
+    assert source._map.closed and source._file.closed
+    source.close()
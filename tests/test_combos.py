@@ -0,0 +1,61 @@
+import itertools
+
+from conftest import rpg
+
+DamageType = rpg.DamageType
+EffectType = rpg.EffectType
+
+
+def combo(name, elements, effect_type=EffectType.STUN):
+    return rpg.ElementalEffect(name, list(elements), rpg.Effect(effect_type, 2, 3))
+
+
+def brute_force(combos, used):
+    return [c for c in combos if all(element in used for element in c.elements)]
+
+
+def test_index_matches_a_scan_over_every_combo():
+    combos = [combo(f"К{i}", elements) for i, elements in
+              enumerate(itertools.chain.from_iterable(itertools.combinations(DamageType, k) for k in (1, 2, 3)))]
+    index = rpg.ElementalComboIndex(combos)
+    for k in range(len(DamageType) + 1):
+        for used in itertools.combinations(DamageType, k):
+            assert index.matching(list(used)) == brute_force(combos, used)
+    assert index.matching([None]) == []
+
+
+def test_every_target_gets_its_own_effect():
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    game.elemental_effects = [combo("Буря", [DamageType.FIRE])]
+    caster = rpg.Character("Мерлін", rpg.CharacterClass.MAGE)
+    targets = [rpg.Character(name, rpg.CharacterClass.WARRIOR) for name in ("Артур", "Робін")]
+    game.apply_elemental_combo(caster, targets, [DamageType.FIRE], rpg.NULL_SINK)
+    first, second = (next(iter(target.effects)) for target in targets)
+    assert first is not second
+    assert first is not game.elemental_effects[0].effect
+    for _ in range(2):
+        targets[0].update_effects()
+    assert not targets[0].effects.has(EffectType.STUN)
+    assert targets[1].effects.has(EffectType.STUN)
+
+
+def test_in_place_changes_rebuild_the_index():
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    game.elemental_effects = [combo("Вогонь", [DamageType.FIRE])]
+    assert [c.name for c in game.elemental_combos().matching([DamageType.FIRE])] == ["Вогонь"]
+
+    game.elemental_effects[0] = combo("Лід", [DamageType.ICE])
+    assert game.elemental_combos().matching([DamageType.FIRE]) == []
+    assert [c.name for c in game.elemental_combos().matching([DamageType.ICE])] == ["Лід"]
+
+    game.elemental_effects.append(combo("Пара", [DamageType.ICE, DamageType.FIRE]))
+    assert [c.name for c in game.elemental_combos().matching([DamageType.ICE, DamageType.FIRE])] == ["Лід", "Пара"]
+
+    del game.elemental_effects[:]
+    assert game.elemental_combos().matching([DamageType.ICE]) == []
+
+
+def test_unchanged_list_reuses_the_index():
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    assert game.elemental_combos() is game.elemental_combos()
+    assert isinstance(game.elemental_effects, rpg.VersionedList)
@@ -0,0 +1,38 @@
+from conftest import rpg
+
+
+def materials(*names):
+    return [rpg.Item(name, rpg.ItemType.ARMOR, 1, 1, rpg.ItemQuality.COMMON) for name in names]
+
+
+def test_crafted_items_are_separate_instances(world):
+    character = world.registry.character("Артур")
+    character.inventory.extend(materials("Шкіряна броня", "Меч лицаря") * 2)
+    recipe = world.crafting_recipes[0]
+    assert world.craft_recipe(character, recipe, 2)
+
+    swords = character.inventory.of_type(rpg.ItemType.WEAPON)
+    assert len(swords) == 2
+    assert swords[0] is not swords[1]
+    assert all(sword is not recipe.result for sword in swords)
+    swords[0].power += 100
+    assert swords[1].power == recipe.result.power == 15
+
+
+def test_zero_requirement_does_not_break_planner():
+    result = rpg.Item("Амулет", rpg.ItemType.ACCESSORY, 1, 1, rpg.ItemQuality.RARE)
+    recipe = rpg.CraftingRecipe("Амулет", {"Камінь": 0, "Нитка": 2}, result)
+    planner = rpg.CraftingPlanner([recipe])
+    inventory = rpg.Inventory(materials("Нитка", "Нитка", "Нитка", "Нитка", "Нитка"))
+    assert planner.craftable(inventory) == {"Амулет": 2}
+    assert planner.craftable_with_chains(inventory) == {"Амулет": 2}
+
+
+def test_chain_counts_follow_inventory_changes(world):
+    planner = world.crafting_planner()
+    inventory = rpg.Inventory(materials("Шкіряна броня", "Меч лицаря"))
+    assert planner.craftable_with_chains(inventory) == {"Вогняний меч": 1}
+    inventory.extend(materials("Шкіряна броня", "Меч лицаря"))
+    assert planner.craftable_with_chains(inventory) == {"Вогняний меч": 2}
+    inventory.clear()
+    assert planner.craftable_with_chains(inventory) == {}
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+from conftest import WORLD_SCRIPT, rpg, run_commands
+
+
+def battle_log(seed):
+    game = rpg.Game(seed=seed)
+    team1 = [rpg.Character("Артур", rpg.CharacterClass.WARRIOR), rpg.Character("Робін", rpg.CharacterClass.ROGUE)]
+    team2 = [rpg.Character("Мерлін", rpg.CharacterClass.MAGE), rpg.Character("Моргана", rpg.CharacterClass.MAGE)]
+    return game.simulate_battle(team1, team2).to_dict()
+
+
+def test_same_seed_gives_same_battle_log():
+    assert battle_log(11) == battle_log(11)
+    assert battle_log(11)["damage_log"]
+
+
+def test_different_seeds_give_different_battle_logs():
+    assert battle_log(11)["damage_log"] != battle_log(12)["damage_log"]
+
+
+def test_same_seed_gives_same_scripted_game(capsys):
+    outputs = []
+    for _ in range(2):
+        game = rpg.Game(seed=5)
+        run_commands(game, WORLD_SCRIPT + ["battle", "event", "shop Артур 0"])
+        outputs.append((capsys.readouterr().out, game._game_state()))
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.skipif(rpg.np is None, reason="пакетна симуляція потребує NumPy")
+def test_batch_simulator_matches_scalar_win_rate():
+    game = rpg.Game(seed=3)
+    team1 = [rpg.Character("Артур", rpg.CharacterClass.WARRIOR)]
+    team2 = [rpg.Character("Мерлін", rpg.CharacterClass.MAGE)]
+    samples = 2000
+    batch = game.simulate_battles(team1, team2, samples, seed=3).summary()
+    wins = sum(game.simulate_battle(copy.deepcopy(team1), copy.deepcopy(team2)).winner == 1 for _ in range(samples))
+    # Дві незалежні вибірки по 2000 битв: розбіжність понад 5 п.п. — це вже помилка, а не шум
+    assert batch["team1_win_rate"] == pytest.approx(wins / samples, abs=0.05)
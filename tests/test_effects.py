@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from conftest import rpg
+
+EffectType = rpg.EffectType
+
+
+# Цикл update_effects до появи EffectScheduler: список ефектів, кожен такт проходиться повністю
+def list_loop_tick(hp, effects):
+    for effect in effects[:]:
+        effect.duration -= 1
+        if effect.effect_type in (EffectType.BURN, EffectType.POISON):
+            hp -= effect.power
+        elif effect.effect_type == EffectType.REGEN:
+            hp += effect.power
+        if effect.duration <= 0:
+            effects.remove(effect)
+    return hp
+
+
+def random_effect(rng):
+    return rpg.Effect(rng.choice(list(EffectType)), rng.randint(0, 6), rng.randint(1, 10))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_scheduler_ticks_match_list_loop(seed):
+    rng = random.Random(seed)
+    character = rpg.Character("Тест", rpg.CharacterClass.WARRIOR)
+    character.hp = hp = 1000
+    effects = []
+    for _ in range(40):
+        for _ in range(rng.randint(0, 3)):
+            effect = random_effect(rng)
+            effects.append(rpg.Effect(effect.effect_type, effect.duration, effect.power))
+            character.apply_effect(effect)
+        hp = list_loop_tick(hp, effects)
+        character.update_effects()
+        assert character.hp == pytest.approx(hp)
+        assert sorted((e.effect_type.name, e.duration, e.power) for e in character.effects) == \
+            sorted((e.effect_type.name, e.duration, e.power) for e in effects)
+        for effect_type in EffectType:
+            assert character.effects.has(effect_type) == any(e.effect_type == effect_type for e in effects)
@@ -0,0 +1,96 @@
+import pytest
+
+from conftest import rpg
+
+ItemType = rpg.ItemType
+
+
+class FixedRoll:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+def piece(name, item_type, power, item_set=None, enchantment=None):
+    return rpg.Item(name, item_type, power, 10, rpg.ItemQuality.RARE, item_set, enchantment)
+
+
+def equip(character, item):
+    character.inventory.append(item)
+    character.equip_item(item, rpg.NULL_SINK)
+
+
+@pytest.fixture
+def warrior_set():
+    return rpg.Game(seed=0, sink=rpg.NULL_SINK).warrior_set
+
+
+def test_warrior_set_thresholds(warrior_set):
+    character = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    attack, defense = character.attack_power, character.defense
+
+    equip(character, piece("Меч", ItemType.WEAPON, 5, warrior_set))
+    assert (character.attack_power, character.defense) == (attack + 5, defense)
+
+    equip(character, piece("Обладунок", ItemType.ARMOR, 4, warrior_set))
+    assert character.attack_power == attack + 5
+    assert character.defense == pytest.approx((defense + 4) * 1.1)
+
+    equip(character, piece("Амулет", ItemType.ACCESSORY, 3, warrior_set))
+    assert character.attack_power == pytest.approx((attack + 5) * 1.1)
+    assert character.defense == pytest.approx((defense + 7) * 1.1 * 1.1)
+
+
+def test_unequip_undoes_set_bonuses(warrior_set):
+    character = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    attack, defense = character.attack_power, character.defense
+    for item in (piece("Меч", ItemType.WEAPON, 5, warrior_set), piece("Обладунок", ItemType.ARMOR, 4, warrior_set),
+                 piece("Амулет", ItemType.ACCESSORY, 3, warrior_set)):
+        equip(character, item)
+
+    amulet = character.unequip_item(ItemType.ACCESSORY, rpg.NULL_SINK)
+    assert amulet in character.inventory
+    assert character.attack_power == attack + 5
+    assert character.defense == pytest.approx((defense + 4) * 1.1)
+
+    character.unequip_item(ItemType.ARMOR, rpg.NULL_SINK)
+    character.unequip_item(ItemType.WEAPON, rpg.NULL_SINK)
+    assert (character.attack_power, character.defense) == (attack, defense)
+    assert character.unequip_item(ItemType.WEAPON, rpg.NULL_SINK) is None
+
+
+def test_replacing_a_piece_keeps_one_set_count(warrior_set):
+    character = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    defense = character.defense
+    equip(character, piece("Обладунок", ItemType.ARMOR, 4, warrior_set))
+    equip(character, piece("Обладунок+", ItemType.ARMOR, 6, warrior_set))
+    assert character.defense == defense + 6
+    assert [item.name for item in character.inventory] == ["Обладунок"]
+
+
+def test_mage_set_lowers_mana_cost():
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    character = rpg.Character("Мерлін", rpg.CharacterClass.MAGE)
+    equip(character, piece("Посох", ItemType.WEAPON, 2, game.mage_set))
+    assert character.mana_cost_multiplier == 1.0
+    equip(character, piece("Мантія", ItemType.ARMOR, 2, game.mage_set))
+    assert character.mana_cost_multiplier == pytest.approx(0.9)
+
+
+def test_weapon_enchantment_procs_on_hit():
+    attacker = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    target = rpg.Character("Мерлін", rpg.CharacterClass.MAGE)
+    enchantment = rpg.Enchantment("Вогняні руни", rpg.EffectType.BURN, 0.3)
+    equip(attacker, piece("Меч", ItemType.WEAPON, 50, enchantment=enchantment))
+
+    attacker.attack(target, rpg.NULL_SINK, FixedRoll(0.5))
+    assert not target.effects.has(rpg.EffectType.BURN)
+    attacker.attack(target, rpg.NULL_SINK, FixedRoll(0.1))
+    assert target.effects.has(rpg.EffectType.BURN)
+
+    attacker.unequip_item(ItemType.WEAPON, rpg.NULL_SINK)
+    fresh = rpg.Character("Робін", rpg.CharacterClass.ROGUE)
+    assert attacker.attack(fresh, rpg.NULL_SINK, FixedRoll(0.0)) > 0
+    assert not fresh.effects.has(rpg.EffectType.BURN)
@@ -0,0 +1,35 @@
+from conftest import rpg
+
+
+def test_event_with_callable_effect_is_not_saved_silently(world, tmp_path):
+    world.dynamic_events.append(rpg.DynamicEvent("Комета", "Падає комета.", {}, lambda game: None))
+    path = str(tmp_path / "save.json")
+    assert not world.save_game(path)
+    assert not (tmp_path / "save.json").exists()
+
+
+def test_described_effects_survive_reload(world, tmp_path):
+    world.dynamic_events.append(rpg.DynamicEvent("Скарб", "Знайдено скарб.", {"day_mod": 3}, {"gold": 30}))
+    path = str(tmp_path / "save.json")
+    assert world.save_game(path)
+    loaded = rpg.Game()
+    assert loaded.load_game(path)
+    event = next(event for event in loaded.dynamic_events if event.name == "Скарб")
+    assert event.to_dict() == world.dynamic_events[-1].to_dict()
+
+
+def test_in_place_changes_rebuild_the_scheduler():
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    game.dynamic_events = [rpg.DynamicEvent("Ярмарок", "Ярмарок у місті.", {}, {"gold": 5})]
+
+    def valid():
+        return [event.name for event in game.event_scheduler().valid(game)]
+
+    assert valid() == ["Ярмарок"]
+    assert game.event_scheduler() is game.event_scheduler()
+    game.dynamic_events[0] = rpg.DynamicEvent("Свято", "Свято врожаю.", {}, {"exp": 5})
+    assert valid() == ["Свято"]
+    game.dynamic_events[0] = rpg.DynamicEvent("Затемнення", "Темніє.", {"day_gte": 99}, {"exp": 5})
+    assert valid() == []
+    game.dynamic_events.insert(0, rpg.DynamicEvent("Ярмарок", "Ярмарок у місті.", {}, {"gold": 5}))
+    assert valid() == ["Ярмарок"]
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import rpg
+
+ItemType = rpg.ItemType
+
+
+def item(name, item_type=ItemType.ACCESSORY):
+    return rpg.Item(name, item_type, 1, 5, rpg.ItemQuality.COMMON)
+
+
+def test_counts_and_types_follow_every_change():
+    iron, wood, sword = item("Залізо"), item("Деревина"), item("Меч", ItemType.WEAPON)
+    inventory = rpg.Inventory([iron, wood, item("Залізо"), sword])
+    assert inventory.counts() == {"Залізо": 2, "Деревина": 1, "Меч": 1}
+    assert inventory.of_type(ItemType.WEAPON) == [sword]
+    inventory.remove(wood)
+    assert "Деревина" not in inventory.counts()
+    assert inventory.quantity("Залізо") == 2 and inventory.quantity("Деревина") == 0
+    assert inventory.take("Залізо", 2)[0] is iron
+    assert inventory.counts() == {"Меч": 1}
+    assert inventory.of_type(ItemType.ACCESSORY) == []
+    with pytest.raises(ValueError):
+        inventory.take("Залізо")
+    with pytest.raises(ValueError):
+        inventory.remove(iron)
+
+
+def test_order_and_indexing_match_a_list():
+    items = [item(f"П{i}") for i in range(6)]
+    inventory, expected = rpg.Inventory(items), list(items)
+    inventory.remove(items[2])
+    expected.remove(items[2])
+    assert inventory.pop(1) is expected.pop(1)
+    assert inventory.pop() is expected.pop()
+    inventory.append(items[2])
+    expected.append(items[2])
+    assert list(inventory) == expected
+    assert [inventory[i] for i in range(-len(expected), len(expected))] == expected + expected
+    assert inventory[1:3] == expected[1:3]
+    with pytest.raises(IndexError):
+        inventory[len(expected)]
+
+
+def test_same_object_twice_is_removed_one_slot_at_a_time():
+    potion = item("Зілля", ItemType.POTION)
+    inventory = rpg.Inventory([potion, potion])
+    inventory.remove(potion)
+    assert potion in inventory and len(inventory) == 1
+    inventory.remove(potion)
+    assert potion not in inventory and len(inventory) == 0
+
+
+def test_changes_mark_the_owner_dirty():
+    character = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    tracker = rpg.ChangeTracker()
+    character.attach_tracker(tracker)
+    tracker.drain("test")
+    character.inventory.append(item("Залізо"))
+    assert character in tracker.drain("test")
+    character.inventory.take("Залізо")
+    assert character in tracker.drain("test")
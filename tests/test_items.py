@@ -0,0 +1,57 @@
+import copy
+import pickle
+
+from conftest import rpg
+
+
+def sword(power=5, enchantment=None):
+    return rpg.Item("Меч", rpg.ItemType.WEAPON, power, 10, rpg.ItemQuality.RARE,
+                    rpg.ItemSet.get("Набір воїна"), enchantment)
+
+
+def test_items_and_effects_carry_no_instance_dict():
+    enchantment = rpg.Enchantment("Руни", rpg.EffectType.BURN, 0.3)
+    for value in (sword(enchantment=enchantment), enchantment, rpg.Effect(rpg.EffectType.STUN, 2, 0),
+                  sword().template, rpg.ItemSet.get("Набір воїна")):
+        assert not hasattr(value, "__dict__")
+
+
+def test_same_kind_of_item_shares_one_template():
+    first, second = sword(5), sword(9, rpg.Enchantment("Руни", rpg.EffectType.BURN, 0.3))
+    assert first.template is second.template
+    assert (first.power, second.power) == (5, 9)
+    other = rpg.Item("Меч", rpg.ItemType.WEAPON, 5, 10, rpg.ItemQuality.COMMON)
+    assert other.template is not first.template
+
+
+def test_copy_keeps_the_template_but_not_the_enchantment():
+    original = sword(enchantment=rpg.Enchantment("Руни", rpg.EffectType.BURN, 0.3))
+    duplicate = original.copy()
+    assert duplicate.template is original.template
+    duplicate.enchantment.power = 1.0
+    duplicate.power = 99
+    assert (original.enchantment.power, original.power) == (0.3, 5)
+
+
+def test_saved_items_come_back_interned():
+    original = sword(enchantment=rpg.Enchantment("Руни", rpg.EffectType.BURN, 0.3))
+    restored = rpg.Item.from_dict(original.to_dict())
+    assert restored.to_dict() == original.to_dict()
+    for clone in (restored, pickle.loads(pickle.dumps(original)), copy.deepcopy(original)):
+        assert clone.template is original.template
+        assert clone.item_set is rpg.ItemSet.get("Набір воїна")
+
+
+def test_loot_uses_the_shared_item_class():
+    game = rpg.Game(seed=3, sink=rpg.NULL_SINK)
+    loot = [game.generate_loot(level) for level in range(1, 11)]
+    assert {type(item) for item in loot} == {rpg.Item}
+    assert all(item.item_set is None or isinstance(item.item_set, rpg.ItemSet) for item in loot)
+
+
+def test_memory_benchmark_favours_slotted_items():
+    result = rpg.item_memory_benchmark(count=2000, seed=1)
+    assert result["items"] == 2000
+    assert result["slotted"]["bytes"] < result["legacy"]["bytes"]
+    assert result["ratio"] > 1
+    assert 0 < result["templates"] < 2000
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from conftest import rpg, run_commands
+
+# Дії після завантаження, які пишуться в журнал
+JOURNALED = [
+    "create Ланселот WARRIOR",
+    "guild join Орден Ланселот",
+    "teams Артур,Ланселот Мерлін,Робін",
+    "battle",
+    "difficulty 5",
+    "faction ally 1 2"
+]
+
+
+@pytest.mark.parametrize("save_format", ["json", "segments", "binary"])
+def test_recover_after_crash_matches_last_journaled_state(world, tmp_path, save_format):
+    save_path = str(tmp_path / f"save.{save_format}")
+    journal_dir = str(tmp_path / "journal")
+    assert world.save_game(save_path, save_format)
+
+    game = rpg.Game(seed=7)
+    assert game.load_game(save_path, save_format)
+    game.enable_journal(journal_dir, snapshot_every=4)
+    assert run_commands(game, JOURNALED) == ["ok"] * len(JOURNALED)
+    expected = game._game_state()
+
+    # «Вбиваємо» процес: журнал не закривається, а останній запис обірвано посередині
+    with open(os.path.join(journal_dir, rpg.GameJournal.JOURNAL_FILE), 'a', encoding='utf-8') as f:
+        f.write('{"seq": 999, "op": "battle", "wor')
+
+    recovered = rpg.Game(seed=7)
+    assert recovered.recover(journal_dir)
+    assert recovered._game_state() == expected
+
+
+def test_recover_without_journal_uses_snapshot(world, tmp_path):
+    journal_dir = str(tmp_path / "journal")
+    world.enable_journal(journal_dir)
+    os.remove(os.path.join(journal_dir, rpg.GameJournal.JOURNAL_FILE))
+
+    recovered = rpg.Game()
+    assert recovered.recover(journal_dir)
+    assert recovered._game_state() == world._game_state()
+
+
+@pytest.mark.parametrize("save_format", ["json", "segments", "binary"])
+def test_save_load_round_trip(world, tmp_path, save_format):
+    save_path = str(tmp_path / f"save.{save_format}")
+    assert world.save_game(save_path, save_format)
+
+    loaded = rpg.Game()
+    assert loaded.load_game(save_path, save_format)
+    assert loaded._game_state() == world._game_state()
+
+
+def test_battle_damage_reaches_segment_deltas(world, tmp_path):
+    directory = str(tmp_path / "segments")
+    assert world.save_game(directory, "segments")
+    assert world.execute_command("battle", interactive=False) == "ok"
+    assert world.save_game(directory, "segments")
+
+    loaded = rpg.Game()
+    assert loaded.load_game(directory, "segments")
+    assert loaded._game_state() == world._game_state()
+
+
+def test_segments_channel_only_while_synced(world, tmp_path):
+    assert "segments" not in world.changes._channels
+    assert world.save_game(str(tmp_path / "segments"), "segments")
+    assert "segments" in world.changes._channels
+    assert world.load_game(str(tmp_path / "segments"), "segments")
+    assert "segments" in world.changes._channels
+
+    assert world.save_game(str(tmp_path / "save.json"))
+    assert world.load_game(str(tmp_path / "save.json"))
+    assert "segments" not in world.changes._channels
@@ -0,0 +1,74 @@
+from collections import Counter
+
+import pytest
+
+from conftest import rpg
+
+ItemQuality = rpg.ItemQuality
+
+
+class ScriptedRng:
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def random(self):
+        return self.values.pop(0)
+
+    def randrange(self, n):
+        return 0
+
+    def randint(self, a, b):
+        return a
+
+
+@pytest.fixture(params=["numpy", "random"])
+def generator(request, monkeypatch):
+    if request.param == "numpy" and rpg.np is None:
+        pytest.skip("пакетний шлях потребує NumPy")
+    if request.param == "random":
+        monkeypatch.setattr(rpg, "np", None)
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    return game.loot, (game.warrior_set, game.mage_set)
+
+
+def test_quality_thresholds_match_the_old_comparisons():
+    table = rpg.LootTable(2, [])
+    # Старий generate_loot порівнював строго «більше», тож кидок на самому порозі дає нижчу якість
+    for roll, quality in ((0.4, ItemQuality.COMMON), (0.41, ItemQuality.RARE), (0.7, ItemQuality.RARE),
+                          (0.71, ItemQuality.EPIC), (0.85, ItemQuality.EPIC), (0.86, ItemQuality.LEGENDARY)):
+        assert table.roll(ScriptedRng(roll, 0.0, 0.0)).quality == quality
+
+
+def test_batch_is_reproducible_for_a_seed(generator):
+    loot, _ = generator
+    first = [item.to_dict() for item in loot.generate_batch(200, 4, 11)]
+    assert first == [item.to_dict() for item in loot.generate_batch(200, 4, 11)]
+    assert first != [item.to_dict() for item in loot.generate_batch(200, 4, 12)]
+
+
+def test_batch_follows_the_loot_rules(generator):
+    loot, item_sets = generator
+    difficulty, n = 3, 20000
+    items = loot.generate_batch(n, difficulty, 5)
+    qualities = Counter(item.quality for item in items)
+    expected = {ItemQuality.COMMON: 0.35, ItemQuality.RARE: 0.3, ItemQuality.EPIC: 0.15, ItemQuality.LEGENDARY: 0.2}
+    for quality, share in expected.items():
+        assert qualities[quality] / n == pytest.approx(share, abs=0.02)
+    assert sum(item.enchantment is not None for item in items) / n == pytest.approx(0.3, abs=0.02)
+    assert sum(item.item_set is not None for item in items) / n == pytest.approx(0.1, abs=0.02)
+    for item in items:
+        assert item.power % difficulty == 0 and 5 * difficulty <= item.power <= 15 * difficulty
+        assert item.value == item.power * 10
+        assert item.item_set is None or item.item_set in item_sets
+        prefix = rpg.LootTable.PREFIXES[item.damage_type]
+        assert item.name == (prefix + " " + item.item_type.value.lower()).strip()
+        if item.enchantment is not None:
+            assert 0.1 <= item.enchantment.power <= 0.3
+
+
+def test_seeded_game_batches_repeat():
+    batches = []
+    for _ in range(2):
+        game = rpg.Game(seed=9, sink=rpg.NULL_SINK)
+        batches.append([item.to_dict() for item in game.generate_loot_batch(50, 2)])
+    assert batches[0] == batches[1]
@@ -0,0 +1,81 @@
+import json
+import os
+
+from conftest import rpg
+
+
+def registry():
+    return rpg.MetricsRegistry([
+        ("counter", "hits_total", "Влучання", ("damage_type",)),
+        ("counter", "spent_total", "Витрачено", ()),
+        ("histogram", "rounds", "Раунди", (), (1, 5, 10))
+    ])
+
+
+def values(game, name):
+    return {labels: value for _, labels, value in game.metrics.metrics[name].samples()}
+
+
+def test_prometheus_text():
+    metrics = registry()
+    metrics.inc("hits_total", 3, "FIRE")
+    metrics.inc("hits_total", 2, "FIRE")
+    metrics.inc("spent_total", 7)
+    for value in (1, 3, 30):
+        metrics.observe("rounds", value)
+    lines = metrics.to_prometheus().splitlines()
+    assert lines[:3] == ["# HELP hits_total Влучання", "# TYPE hits_total counter", 'hits_total{damage_type="FIRE"} 5']
+    assert "spent_total 7" in lines
+    assert "# TYPE rounds histogram" in lines
+    assert [line for line in lines if line.startswith("rounds")] == [
+        'rounds_bucket{le="1"} 1', 'rounds_bucket{le="5"} 2', 'rounds_bucket{le="10"} 2',
+        'rounds_bucket{le="+Inf"} 3', "rounds_sum 34.0", "rounds_count 3"]
+
+
+def test_snapshot_files_in_both_formats(tmp_path):
+    metrics = registry()
+    metrics.inc("hits_total", 4, "ICE")
+    metrics.observe("rounds", 7)
+    metrics.write(str(tmp_path / "metrics.json"))
+    metrics.write(str(tmp_path / "metrics.prom"))
+    snapshot = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))["metrics"]
+    assert snapshot["hits_total"] == {"type": "counter", "help": "Влучання",
+                                      "values": [{"labels": {"damage_type": "ICE"}, "value": 4}]}
+    assert snapshot["rounds"]["values"] == [{"labels": {}, "buckets": {"1": 0, "5": 0, "10": 1, "+Inf": 0},
+                                             "sum": 7.0, "count": 1}]
+    assert (tmp_path / "metrics.prom").read_text(encoding="utf-8") == metrics.to_prometheus()
+    assert sorted(os.listdir(tmp_path)) == ["metrics.json", "metrics.prom"]
+
+
+def test_disabled_metrics_are_a_no_op(world):
+    assert world.metrics is rpg.NULL_METRICS
+    world.execute_command("battle", interactive=False)
+
+
+def test_battle_and_gold_counters(world):
+    world.enable_metrics()
+    character = world.registry.character("Артур")
+    character.gold = 10 ** 6
+    gold = character.gold
+    assert world.execute_command("shop Артур 1", interactive=False) == "ok"
+    assert values(world, "rpg_gold_spent_total") == {(): gold - character.gold}
+    assert world.execute_command("battle", interactive=False) == "ok"
+    [(outcome,)] = values(world, "rpg_battles_total")
+    assert values(world, "rpg_battle_rounds")[("+Inf",)] == 1
+    assert sum(values(world, "rpg_damage_total").values()) > 0
+    teams = {"team1": 2, "team2": 1, "draw": 0}
+    minted = values(world, "rpg_gold_minted_total").get(("battle",), 0)
+    assert minted == 100 * world.difficulty * teams[outcome]
+
+
+def test_segment_bytes_count_only_what_was_written_and_read(world, tmp_path):
+    world.enable_metrics()
+    directory = str(tmp_path / "світ")
+    for _ in range(3):
+        assert world.save_game(directory, "segments")
+        world.registry.character("Артур").gold += 1
+    on_disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    assert len(os.listdir(directory)) == 3
+    assert values(world, "rpg_save_bytes_total") == {("segments",): on_disk}
+    assert world.load_game(directory, "segments")
+    assert values(world, "rpg_load_bytes_total") == {("segments",): on_disk}
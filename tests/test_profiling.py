@@ -0,0 +1,55 @@
+import io
+import os
+import pstats
+
+import pytest
+
+from conftest import WORLD_SCRIPT, rpg
+
+
+def test_laps_add_up_per_phase(monkeypatch):
+    clock = iter([0.0, 1.0, 1.5, 4.0])
+    monkeypatch.setattr(rpg.time, "perf_counter", lambda: next(clock))
+    timer = rpg.PhaseTimer()
+    timer.mark()
+    timer.lap("player_turns")
+    timer.lap("sweeps")
+    timer.lap("player_turns")
+    report = timer.report()
+    assert report["total_s"] == 4.0
+    assert report["phases"]["player_turns"] == {"seconds": 3.5, "calls": 2, "share": 0.875}
+    assert report["phases"]["sweeps"] == {"seconds": 0.5, "calls": 1, "share": 0.125}
+    assert report["phases"]["rewards"] == {"seconds": 0.0, "calls": 0, "share": 0.0}
+
+
+def test_battle_fills_the_phase_timer(world):
+    world.enable_profiling()
+    assert world.execute_command("battle", interactive=False) == "ok"
+    report = world.battle_timer.report()
+    assert report["battles"] == 1
+    phases = report["phases"]
+    assert phases["modifiers"]["calls"] == 1
+    for phase in ("player_turns", "enemy_turns", "sweeps", "effects"):
+        assert phases[phase]["calls"] > 0
+    assert sum(phase["share"] for phase in phases.values()) == pytest.approx(1, abs=1e-3)
+
+
+def test_script_commands_are_dumped_one_file_each(tmp_path):
+    game = rpg.Game(seed=42, sink=rpg.NULL_SINK)
+    game.enable_profiling(battle_timers=False, profile_dir=str(tmp_path / "prof"))
+    timings = game.run_script(io.StringIO("\n".join(["# світ"] + WORLD_SCRIPT + ["battle"])))
+    files = sorted(os.listdir(tmp_path / "prof"))
+    assert len(files) == len(timings) == len(WORLD_SCRIPT) + 1
+    assert files[0] == "00001_script_2_create.prof" and files[-1].endswith("_battle.prof")
+    stats = pstats.Stats(str(tmp_path / "prof" / files[-1]))
+    assert any(name == "battle" for _, _, name in stats.stats)
+
+
+def test_profiling_does_not_change_the_game(tmp_path):
+    states = []
+    for profile_dir in (None, str(tmp_path / "prof")):
+        game = rpg.Game(seed=42, sink=rpg.NULL_SINK)
+        game.enable_profiling(profile_dir=profile_dir)
+        game.run_script(io.StringIO("\n".join(WORLD_SCRIPT + ["battle", "battle"])))
+        states.append(game._game_state())
+    assert states[0] == states[1]
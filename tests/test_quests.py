@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from conftest import rpg
+
+
+def quest(game, quest_id):
+    return game.registry.quests[quest_id]
+
+
+def test_event_reaches_only_quests_subscribed_to_the_objective(world):
+    arthur, robin = world.registry.character("Артур"), world.registry.character("Робін")
+    assert world.accept_quest(arthur, quest(world, "item_collector"))
+    world.quest_event(arthur, "rare_items")
+    world.quest_event(robin, "enemies_defeated")
+    world.quest_event(arthur, "boss_defeated")
+    assert quest(world, "item_collector").progress == {"rare_items": 1}
+    assert quest(world, "first_blood").progress == {"enemies_defeated": 0}
+    assert quest(world, "boss_hunter").progress == {"boss_defeated": 0}
+    assert world.quest_bus.subscribers("rare_items") == [arthur]
+    assert world.quest_bus.subscribers("boss_defeated") == []
+
+
+def test_reward_is_paid_once_and_the_quest_leaves_every_holder(world):
+    arthur, robin = world.registry.character("Артур"), world.registry.character("Робін")
+    first_blood = quest(world, "first_blood")
+    assert world.accept_quest(robin, first_blood)
+    gold = {character: character.gold for character in (arthur, robin)}
+    world.quest_event(arthur, "enemies_defeated", 5)
+    assert arthur.gold == gold[arthur] + 100
+    assert first_blood not in arthur.active_quests and first_blood not in robin.active_quests
+    world.quest_event(arthur, "enemies_defeated", 5)
+    world.quest_event(robin, "enemies_defeated", 5)
+    assert (arthur.gold, robin.gold) == (gold[arthur] + 100, gold[robin])
+    assert not world.accept_quest(robin, first_blood)
+
+
+def test_item_reward_is_a_fresh_copy(world):
+    arthur = world.registry.character("Артур")
+    boss_hunter = quest(world, "boss_hunter")
+    assert world.accept_quest(arthur, boss_hunter)
+    world.quest_event(arthur, "boss_defeated")
+    [item] = [item for item in arthur.inventory if item.name == "Меч дракона"]
+    assert item is not boss_hunter.rewards["item"]
+
+
+@pytest.mark.parametrize("save_format", ["json", "segments", "binary"])
+def test_subscriptions_survive_save_and_load(world, tmp_path, save_format):
+    arthur = world.registry.character("Артур")
+    world.quest_event(arthur, "enemies_defeated", 2)
+    path = os.path.join(tmp_path, "світ")
+    assert world.save_game(path, save_format)
+
+    loaded = rpg.Game(seed=1, sink=rpg.NULL_SINK)
+    assert loaded.load_game(path, save_format)
+    arthur = loaded.registry.character("Артур")
+    first_blood = quest(loaded, "first_blood")
+    assert first_blood.progress == {"enemies_defeated": 2}
+    assert loaded.quest_bus.subscribers("enemies_defeated") == [arthur]
+    gold = arthur.gold
+    loaded.quest_event(arthur, "enemies_defeated", 3)
+    assert arthur.gold == gold + 100
+    assert first_blood not in arthur.active_quests
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from conftest import rpg, run_commands
+
+
+def guild(game, name):
+    return next(guild for guild in game.guilds if guild.name == name)
+
+
+def assert_consistent(game):
+    characters = [game.registry.character(nickname) for nickname in ("Артур", "Мерлін", "Робін")]
+    for character in characters:
+        assert game.registry.guilds_of(character) == [g for g in game.guilds if character in g.members]
+        for g in game.guilds:
+            assert g.has_member(character) == (character in g.members)
+
+
+def test_lookups_follow_creation(world):
+    arthur = world.registry.character("Артур")
+    assert arthur is next(c for c in world.characters if c.nickname == "Артур")
+    assert world.registry.character("Нікого") is None
+    assert not world.new_character("Артур", rpg.CharacterClass.MAGE)
+    assert len(world.characters) == 3
+    assert world.registry.quest("first_blood") in arthur.active_quests
+
+
+def test_memberships_follow_join_and_leave(world):
+    run_commands(world, ["guild create Варта", "guild join Варта Артур", "guild join Варта Мерлін",
+                         "guild leave Орден Артур"])
+    assert_consistent(world)
+    merlin = world.registry.character("Мерлін")
+    assert world.registry.guilds_of(merlin) == [guild(world, "Варта")]
+    assert not world.leave_guild(guild(world, "Орден"), merlin)
+    assert not world.join_guild(guild(world, "Варта"), merlin)
+    assert guild(world, "Варта").members.count(merlin) == 1
+
+
+@pytest.mark.parametrize("save_format", ["json", "segments", "binary"])
+def test_registry_is_rebuilt_on_load(world, tmp_path, save_format):
+    run_commands(world, ["guild create Варта", "guild join Варта Робін"])
+    path = os.path.join(tmp_path, "світ")
+    assert world.save_game(path, save_format)
+
+    loaded = rpg.Game(seed=1, sink=rpg.NULL_SINK)
+    run_commands(loaded, ["create Чужий MAGE", "guild create Чужа", "guild join Чужа Чужий"])
+    assert loaded.load_game(path, save_format)
+    assert loaded.registry.character("Чужий") is None
+    assert_consistent(loaded)
+    robin = loaded.registry.character("Робін")
+    assert loaded.registry.guilds_of(robin) == [guild(loaded, "Варта")]
+    assert loaded.execute_command("guild leave Варта Робін", interactive=False) == "ok"
+    assert loaded.registry.guilds_of(robin) == []
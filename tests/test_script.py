@@ -0,0 +1,41 @@
+import sys
+
+from conftest import rpg
+
+
+def test_failing_command_is_an_error_and_does_not_mute_the_game(world, monkeypatch):
+    def broken(*args):
+        raise KeyError("зламано")
+
+    monkeypatch.setattr(world, "trigger_dynamic_event", broken)
+    stdout = sys.stdout
+    timings = world.run_script(["event", "status Артур"])
+    assert [row["status"] for row in timings] == ["error", "ok"]
+    assert world.event_sink is rpg.CONSOLE_SINK
+    assert sys.stdout is stdout
+
+
+def test_teams_reject_repeated_characters(world):
+    teams = dict(world.teams)
+    for cmd in ("teams Артур Артур", "teams Артур,Артур Мерлін", "teams Артур,Робін Робін,Мерлін"):
+        assert world.execute_command(cmd, interactive=False) == "error"
+    assert world.teams == teams
+
+
+def test_craft_rejects_non_positive_counts(world):
+    for count in ("0", "-2"):
+        assert world.execute_command(f"craft Артур 1 {count}", interactive=False) == "error"
+
+
+def test_successful_purchase_is_ok(world):
+    character = world.registry.character("Артур")
+    character.gold = 10 ** 6
+    assert world.execute_command("shop Артур 1", interactive=False) == "ok"
+    assert len(character.inventory) == 1
+
+
+def test_failed_save_and_load_are_errors(world, tmp_path):
+    unwritable = tmp_path / "немає" / "світ.json"
+    timings = world.run_script([f"save '{unwritable}'", f"load '{tmp_path / 'світ.json'}'",
+                                f"save '{tmp_path / 'світ.json'}'"])
+    assert [row["status"] for row in timings] == ["error", "error", "ok"]
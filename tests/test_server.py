@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import threading
+
+from conftest import rpg
+
+
+async def _open(server):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+
+    async def send(cmd):
+        if cmd is not None:
+            writer.write((cmd + "\n").encode("utf-8"))
+            await writer.drain()
+        lines = []
+        while True:
+            line = (await reader.readline()).decode("utf-8")
+            if line.startswith("= "):
+                return line[2:].strip(), lines
+            lines.append(line[2:].rstrip("\n"))
+
+    await send(None)
+    return writer, send
+
+
+def _serve(save_dir, scenario, **kwargs):
+    async def main():
+        server = rpg.GameServer(port=0, seed=7, save_dir=str(save_dir), **kwargs)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_stdout_is_not_replaced(tmp_path):
+    original = sys.stdout
+
+    async def scenario(server):
+        assert sys.stdout is original
+        writer, send = await _open(server)
+        status, lines = await send("create Артур WARRIOR")
+        writer.close()
+        return status, lines
+
+    status, lines = _serve(tmp_path, scenario)
+    assert status == "ok"
+    assert any("Артур" in line for line in lines)
+    assert sys.stdout is original
+
+
+def test_status_and_errors_reach_the_client(tmp_path):
+    async def scenario(server):
+        writer, send = await _open(server)
+        await send("create Артур WARRIOR")
+        replies = [await send("status Артур"), await send("bogus")]
+        writer.close()
+        return replies
+
+    (status, lines), (error, error_lines) = _serve(tmp_path, scenario)
+    assert status == "ok" and any("Статус персонажа Артур" in line for line in lines)
+    assert error == "error" and any("Невідома команда" in line for line in error_lines)
+
+
+def test_slow_command_does_not_block_other_sessions(tmp_path):
+    async def scenario(server):
+        slow_writer, slow = await _open(server)
+        for cmd in ("create A WARRIOR", "create B MAGE", "teams A B"):
+            await slow(cmd)
+        slow_task = asyncio.create_task(slow("simulate 20000"))
+        await asyncio.sleep(0.05)
+        fast_writer, fast = await _open(server)
+        status, _ = await fast("create C ROGUE")
+        finished_first = not slow_task.done()
+        await slow_task
+        slow_writer.close()
+        fast_writer.close()
+        return status, finished_first
+
+    status, finished_first = _serve(tmp_path, scenario, workers=2)
+    assert status == "ok"
+    assert finished_first
+
+
+def test_every_command_runs_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    execute = rpg.Game.execute_command
+
+    def recording(game, cmd, *args, **kwargs):
+        threads.append(threading.current_thread())
+        return execute(game, cmd, *args, **kwargs)
+
+    monkeypatch.setattr(rpg.Game, "execute_command", recording)
+
+    async def scenario(server):
+        writer, send = await _open(server)
+        for cmd in ("create A WARRIOR", "create B MAGE", "teams A B", "battle", "status A"):
+            await send(cmd)
+        writer.close()
+
+    _serve(tmp_path, scenario)
+    assert len(threads) == 5
+    assert threading.main_thread() not in threads
+
+
+def test_saves_are_namespaced_per_session(tmp_path):
+    async def scenario(server):
+        writer1, first = await _open(server)
+        writer2, second = await _open(server)
+        await first("create Артур WARRIOR")
+        saved = await first("save world.json")
+        loaded = await second("load world.json")
+        writer1.close()
+        writer2.close()
+        return saved, loaded
+
+    saved, loaded = _serve(tmp_path, scenario)
+    assert saved[0] == "ok"
+    assert os.path.exists(tmp_path / "session_1" / "world.json")
+    assert not os.path.exists(tmp_path / "world.json")
+    assert not any("Артур" in line for line in loaded[1])
+
+
+def test_sandbox_rejects_escaping_names(tmp_path):
+    async def scenario(server):
+        writer, send = await _open(server)
+        await send("create Артур WARRIOR")
+        replies = [await send(cmd) for cmd in ("save ..", "save .", "save ''", "save ../x.json",
+                                               "load /etc/passwd")]
+        writer.close()
+        return replies
+
+    replies = _serve(tmp_path, scenario)
+    assert [status for status, _ in replies] == ["error"] * 5
+    assert os.listdir(tmp_path) in ([], ["session_1"])
+    assert not os.path.exists(tmp_path.parent / "x.json")
+
+
+def test_local_load_test_runs_without_errors():
+    result = asyncio.run(rpg.local_load_test(sessions=4, concurrency=2, seed=1))
+    assert result["errors"] == 0
+    assert result["commands"] == 4 * len(rpg.LOAD_TEST_SCRIPT)
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, WORLD_SCRIPT, rpg, run_commands
+
+
+def test_game_outcomes_go_to_the_event_sink(tmp_path, capsys):
+    sink = rpg.BufferedSink()
+    game = rpg.Game(seed=1, sink=sink)
+    path = str(tmp_path / "save.json")
+    statuses = run_commands(game, WORLD_SCRIPT + [
+        "guild leave Орден Артур",
+        "faction ally 1 2",
+        "craft Артур 1",
+        f"save {path}",
+        f"load {path}"
+    ])
+    assert capsys.readouterr().out == ""
+    kinds = [event.kind for event in sink.events]
+    for kind in ("character_create", "guild_create", "guild_join", "guild_leave", "quest_accept", "difficulty",
+                 "relations", "craft_no_materials", "save", "load"):
+        assert kind in kinds
+    assert statuses.count("error") == 1  # крафт без матеріалів
+
+
+def test_console_messages_are_unchanged(capsys):
+    game = rpg.Game(seed=1)
+    run_commands(game, ["create Артур WARRIOR", "guild create Орден", "guild join Орден Артур", "faction ally 1 2"])
+    assert capsys.readouterr().out.splitlines() == [
+        "Персонаж Артур (Воїн) створений!",
+        "Гільдію Орден створено!",
+        "Артур приєднався до гільдії Орден",
+        "Відносини з Маги оновлено до 0.70",
+        "Відносини з Лицарі оновлено до 0.70"
+    ]
+
+
+def test_json_lines_sink_closes_its_file(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    with rpg.JsonLinesSink(path) as sink:
+        sink.emit(rpg.GameEvent("save", "Гру збережено", {}))
+    assert sink._file.closed
+    sink.close()
+    assert [json.loads(line)["kind"] for line in open(path, encoding="utf-8")] == ["save"]
+
+
+def test_events_file_is_complete_after_a_script(tmp_path):
+    events = tmp_path / "events.jsonl"
+    script = "\n".join(WORLD_SCRIPT + ["battle"]) + "\n"
+    process = subprocess.run([sys.executable, os.path.join(ROOT, "mini_project(update).py"), "--seed", "1",
+                              "--script", "-", "--events", str(events)],
+                             input=script, capture_output=True, text=True, encoding="utf-8", cwd=tmp_path)
+    assert process.returncode == 0, process.stderr
+    kinds = [json.loads(line)["kind"] for line in events.read_text(encoding="utf-8").splitlines()]
+    assert kinds.count("character_create") == 3
+    assert "battle_end" in kinds
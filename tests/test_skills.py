@@ -0,0 +1,105 @@
+import pytest
+
+from conftest import rpg
+
+EffectType = rpg.EffectType
+
+# Числа use_skill до реєстру навичок: множник від сили атаки, ефект на ціль і приріст захисту; мана — завжди 10
+OLD_USE_SKILL = {
+    "Сильний удар": (1.5, None, 0),
+    "Вогняна куля": (2, EffectType.BURN, 0),
+    "Постріл у спину": (2.5, None, 0),
+    "Отруєне лезо": (1.2, EffectType.POISON, 0),
+    "Захист": (None, None, 10),
+    "Магічний щит": (None, None, 15)
+}
+
+
+def duel(skill, level=1):
+    game = rpg.Game(seed=0, sink=rpg.NULL_SINK)
+    caster = rpg.Character("Артур", rpg.CharacterClass.WARRIOR)
+    target = rpg.Character("Мерлін", rpg.CharacterClass.MAGE)
+    caster.stats.set_base("attack_power", 40)
+    caster.skills = [skill]
+    caster.skill_levels = {skill: level}
+    return game, caster, target
+
+
+@pytest.mark.parametrize("skill", sorted(OLD_USE_SKILL))
+def test_level_one_matches_old_use_skill(skill):
+    multiplier, effect, buff = OLD_USE_SKILL[skill]
+    game, caster, target = duel(skill)
+    hp, mana, defense = target.hp, caster.mana, caster.defense
+    caster.use_skill(skill, [target], game, rpg.NULL_SINK)
+    assert caster.mana == mana - 10
+    if multiplier is not None:
+        assert target.hp == pytest.approx(hp - (40 * multiplier - target.defense))
+    else:
+        assert target.hp == hp
+    assert caster.defense == defense + buff
+    for effect_type in (EffectType.BURN, EffectType.POISON):
+        assert target.effects.has(effect_type) == (effect_type == effect)
+
+
+def test_no_damage_below_defense():
+    game, caster, target = duel("Сильний удар")
+    caster.stats.set_base("attack_power", 1)
+    hp = target.hp
+    caster.use_skill("Сильний удар", [target], game, rpg.NULL_SINK)
+    assert target.hp == hp
+
+
+def test_level_scaling():
+    game, caster, target = duel("Постріл у спину", level=3)
+    hp = target.hp
+    caster.use_skill("Постріл у спину", [target], game, rpg.NULL_SINK)
+    assert target.hp == pytest.approx(hp - (40 * 2.5 * 1.2 - target.defense))
+
+    game, caster, _ = duel("Магічний щит", level=2)
+    defense = caster.defense
+    caster.use_skill("Магічний щит", [], game, rpg.NULL_SINK)
+    assert caster.defense == pytest.approx(defense + 15 * 1.1)
+
+
+@pytest.mark.parametrize("mult, cost", [(0.1, 11), (-0.1, 9), (-0.5, 5)])
+def test_mana_cost_follows_the_multiplier(mult, cost):
+    game, caster, target = duel("Сильний удар")
+    caster.stats.add("location", "mana_cost_multiplier", mult=mult)
+    mana = caster.mana
+    caster.use_skill("Сильний удар", [target], game, rpg.NULL_SINK)
+    assert caster.mana == mana - cost
+
+
+def test_not_enough_mana_does_nothing():
+    game, caster, target = duel("Сильний удар")
+    caster.mana = 9
+    hp = target.hp
+    caster.use_skill("Сильний удар", [target], game, rpg.NULL_SINK)
+    assert (caster.mana, target.hp) == (9, hp)
+
+
+def test_registered_skill_needs_no_code_changes():
+    game, caster, target = duel("Крижаний спис")
+    game.skill_registry.register({"name": "Крижаний спис", "cost": 4, "multiplier": 1.0,
+                                  "effect": ["FREEZE", 1, 0], "verb": "заморожує"})
+    mana, hp = caster.mana, target.hp
+    caster.use_skill("Крижаний спис", [target], game, rpg.NULL_SINK)
+    assert caster.mana == mana - 4
+    assert target.hp == pytest.approx(hp - (40 - target.defense))
+    assert target.effects.has(EffectType.FREEZE)
+
+
+@pytest.mark.skipif(rpg.np is None, reason="пакетний шлях потребує NumPy")
+@pytest.mark.parametrize("level", [1, 3])
+@pytest.mark.parametrize("skill", sorted(OLD_USE_SKILL))
+def test_batch_path_matches_scalar(skill, level):
+    np = rpg.np
+    game, caster, target = duel(skill, level)
+    me, foe = rpg._BatchSide([caster], 4), rpg._BatchSide([target], 4)
+    rows = np.array([0, 2])
+    handler = game.skill_registry.get(skill)
+    handler.apply_batch(caster, me, foe, 0, rows, np.zeros(2, dtype=int), level)
+    caster.use_skill(skill, [target], game, rpg.NULL_SINK)
+    assert foe.hp[rows, 0] == pytest.approx([target.hp] * 2)
+    assert me.defense[rows, 0] == pytest.approx([caster.defense] * 2)
+    assert foe.hp[[1, 3], 0] == pytest.approx([rpg.Character("Мерлін", rpg.CharacterClass.MAGE).hp] * 2)
@@ -0,0 +1,35 @@
+import csv
+import json
+
+from conftest import rpg
+
+
+def sweep(workers):
+    return rpg.BalanceSweep(samples=4, seed=7, workers=workers, difficulties=[1, 5], max_rounds=15)
+
+
+def test_rows_do_not_depend_on_the_worker_count():
+    rows = sweep(1).run()
+    locations = len(rpg.Game().locations)
+    assert len(rows) == len(rpg.CharacterClass) * locations * len(rpg.WeatherType) * 2
+    assert rows == sweep(3).run()
+    assert len({row["seed"] for row in rows}) == len(rows)
+    for row in rows:
+        assert 0 <= row["win_rate"] + row["draw_rate"] <= 1
+
+
+def test_cell_seeds_follow_the_base_seed():
+    first = [cell[5] for cell in sweep(1).cells()]
+    assert first == [cell[5] for cell in sweep(2).cells()]
+    assert first != [cell[5] for cell in rpg.BalanceSweep(seed=8, difficulties=[1, 5]).cells()]
+
+
+def test_write_csv_and_json(tmp_path):
+    rows = [rpg._run_sweep_cell(cell) for cell in list(sweep(1).cells())[:3]]
+    rpg.BalanceSweep.write(rows, str(tmp_path / "sweep.json"))
+    rpg.BalanceSweep.write(rows, str(tmp_path / "sweep.csv"))
+    assert json.loads((tmp_path / "sweep.json").read_text(encoding="utf-8")) == rows
+    with open(tmp_path / "sweep.csv", encoding="utf-8", newline="") as f:
+        table = list(csv.DictReader(f))
+    assert [row["char_class"] for row in table] == [row["char_class"] for row in rows]
+    assert [float(row["win_rate"]) for row in table] == [row["win_rate"] for row in rows]
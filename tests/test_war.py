@@ -0,0 +1,49 @@
+from conftest import rpg
+
+
+def war(team1, team2):
+    return rpg.GuildWar(rpg.Guild("А", team1), rpg.Guild("Б", team2), {"gold": 10, "exp": 10, "reputation": 1})
+
+
+def fighters(count, prefix):
+    return [rpg.Character(f"{prefix}{i}", rpg.CharacterClass.WARRIOR) for i in range(count)]
+
+
+def test_empty_guilds_are_a_draw():
+    guild_war = war([], [])
+    guild_war.resolve_war(rpg.Game(seed=1, sink=rpg.NULL_SINK))
+    assert guild_war.winner is None
+
+
+def test_empty_guild_loses_without_crashing():
+    guild_war = war(fighters(2, "А"), [])
+    guild_war.resolve_war(rpg.Game(seed=1, sink=rpg.NULL_SINK))
+    assert guild_war.winner is guild_war.guild1
+
+
+def test_dead_members_do_not_fight():
+    dead = fighters(2, "Б")
+    for character in dead:
+        character.hp = 0
+    guild_war = war(dead, [])
+    guild_war.resolve_war(rpg.Game(seed=1, sink=rpg.NULL_SINK))
+    assert guild_war.winner is None
+    assert all(character.hp == 0 for character in dead)
+
+
+def test_stalemate_stops_at_round_cap():
+    team1, team2 = fighters(1, "А"), fighters(1, "Б")
+    for character in team1 + team2:
+        character.stats.set_base("defense", 100)
+    guild_war = war(team1, team2)
+    guild_war.resolve_war(rpg.Game(seed=1, sink=rpg.NULL_SINK), max_rounds=5)
+    assert guild_war.winner is None
+
+
+def test_survivors_of_the_winning_guild_are_rewarded():
+    strong = fighters(1, "А")
+    strong[0].stats.set_base("attack_power", 1000)
+    guild_war = war(strong, fighters(2, "Б"))
+    guild_war.resolve_war(rpg.Game(seed=1, sink=rpg.NULL_SINK))
+    assert guild_war.winner is guild_war.guild1
+    assert strong[0].gold == 110